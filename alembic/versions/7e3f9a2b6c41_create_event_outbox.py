@@ -0,0 +1,48 @@
+"""create event outbox table
+
+Revision ID: 7e3f9a2b6c41
+Revises: 5ba4be585eee
+Create Date: 2026-10-19 09:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7e3f9a2b6c41"
+down_revision: Union[str, Sequence[str], None] = "5ba4be585eee"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the event_outbox table."""
+    op.create_table(
+        "event_outbox",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("routing_key", sa.String(length=255), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column(
+            "content_type",
+            sa.String(length=100),
+            nullable=False,
+            server_default="application/json",
+        ),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "ix_event_outbox_sent_at_created_at",
+        "event_outbox",
+        ["sent_at", "created_at"],
+    )
+
+
+def downgrade() -> None:
+    """Drop the event_outbox table."""
+    op.drop_index("ix_event_outbox_sent_at_created_at", table_name="event_outbox")
+    op.drop_table("event_outbox")
@@ -0,0 +1,227 @@
+"""Compare a benchmark run against a stored baseline and gate regressions.
+
+Both files use the format of ``benchmarks/results.py``. For every benchmark
+present in both, the raw samples are resampled with replacement to build a
+bootstrap confidence interval for ``current / baseline`` of the chosen
+statistic (the median by default, which is robust to the long tail of
+request latencies). A benchmark is a regression when the whole interval
+lies above ``1 + threshold``: the slowdown is both larger than the
+tolerance and unlikely to be noise. Endpoint runs that returned errors also
+fail the gate, since their timings are not comparable.
+
+The bootstrap uses a fixed seed so the same two files always give the same
+verdict. Baselines only make sense on the machine that recorded them;
+record one with ``--output`` on the reference runner and commit it::
+
+    python -m benchmarks.endpoints --output benchmarks/baselines/endpoints.json
+    python -m benchmarks.endpoints --output current.json
+    python -m benchmarks.compare benchmarks/baselines/endpoints.json current.json
+
+The command exits with status 1 when any benchmark regressed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+from benchmarks.results import format_ms, load_results
+
+STATISTICS: dict[str, Callable[[Sequence[float]], float]] = {
+    "median": statistics.median,
+    "mean": statistics.fmean,
+}
+
+REGRESSION = "regression"
+IMPROVEMENT = "improvement"
+UNCHANGED = "unchanged"
+ERRORS = "errors"
+MISSING = "missing"
+NEW = "new"
+
+FAILING = {REGRESSION, ERRORS}
+
+
+@dataclass
+class Comparison:
+    name: str
+    status: str
+    baseline: float | None = None
+    current: float | None = None
+    ratio: float | None = None
+    low: float | None = None
+    high: float | None = None
+
+
+def bootstrap_ratio(
+    baseline: Sequence[float],
+    current: Sequence[float],
+    *,
+    statistic: Callable[[Sequence[float]], float] = statistics.median,
+    confidence: float = 0.95,
+    resamples: int = 2000,
+    rng: random.Random | None = None,
+) -> tuple[float, float]:
+    """Return a percentile bootstrap interval for ``stat(current)/stat(baseline)``."""
+    rng = rng or random.Random(0)
+    ratios = sorted(
+        statistic(rng.choices(current, k=len(current)))
+        / statistic(rng.choices(baseline, k=len(baseline)))
+        for _ in range(resamples)
+    )
+    tail = (1 - confidence) / 2
+    low = ratios[int(tail * resamples)]
+    high = ratios[min(resamples - 1, int((1 - tail) * resamples))]
+    return low, high
+
+
+def compare(
+    baseline: dict,
+    current: dict,
+    *,
+    threshold: float = 0.05,
+    statistic: str = "median",
+    confidence: float = 0.95,
+    resamples: int = 2000,
+    seed: int = 0,
+) -> list[Comparison]:
+    """Compare the ``benchmarks`` sections of two results documents."""
+    stat = STATISTICS[statistic]
+    rng = random.Random(seed)
+    base_entries = baseline["benchmarks"]
+    current_entries = current["benchmarks"]
+    comparisons = []
+    for name, base in base_entries.items():
+        entry = current_entries.get(name)
+        base_value = stat(base["samples"])
+        if entry is None:
+            comparisons.append(Comparison(name, MISSING, baseline=base_value))
+            continue
+        current_value = stat(entry["samples"])
+        ratio = current_value / base_value
+        if len(base["samples"]) > 1 and len(entry["samples"]) > 1:
+            low, high = bootstrap_ratio(
+                base["samples"],
+                entry["samples"],
+                statistic=stat,
+                confidence=confidence,
+                resamples=resamples,
+                rng=rng,
+            )
+        else:
+            # A single sample has no spread to resample
+            low = high = ratio
+        if entry.get("errors"):
+            status = ERRORS
+        elif low > 1 + threshold:
+            status = REGRESSION
+        elif high < 1 - threshold:
+            status = IMPROVEMENT
+        else:
+            status = UNCHANGED
+        comparisons.append(
+            Comparison(name, status, base_value, current_value, ratio, low, high)
+        )
+    for name, entry in current_entries.items():
+        if name not in base_entries:
+            comparisons.append(Comparison(name, NEW, current=stat(entry["samples"])))
+    return comparisons
+
+
+def _percent(ratio: float | None) -> str:
+    return "" if ratio is None else f"{(ratio - 1) * 100:+.1f}%"
+
+
+def format_table(comparisons: list[Comparison], statistic: str = "median") -> str:
+    """Return the comparison as an aligned text table (times in ms)."""
+    rows = [
+        (
+            "benchmark",
+            f"base {statistic} ms",
+            f"current {statistic} ms",
+            "change",
+            "CI",
+            "status",
+        )
+    ]
+    for item in comparisons:
+        interval = (
+            f"[{_percent(item.low)}, {_percent(item.high)}]"
+            if item.low is not None
+            else ""
+        )
+        rows.append(
+            (
+                item.name,
+                format_ms(item.baseline) if item.baseline is not None else "-",
+                format_ms(item.current) if item.current is not None else "-",
+                _percent(item.ratio),
+                interval,
+                item.status.upper() if item.status in FAILING else item.status,
+            )
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = []
+    for row in rows:
+        cells = [row[0].ljust(widths[0])]
+        cells += [cell.rjust(width) for cell, width in zip(row[1:-1], widths[1:-1])]
+        cells.append(row[-1])
+        lines.append("  ".join(cells))
+    return "\n".join(lines)
+
+
+def _environment_warnings(baseline: dict, current: dict) -> list[str]:
+    base_meta = baseline.get("meta", {})
+    current_meta = current.get("meta", {})
+    return [
+        f"warning: {key} differs ({base_meta.get(key)} vs {current_meta.get(key)})"
+        for key in ("suite", "python", "implementation", "machine", "platform")
+        if base_meta.get(key) != current_meta.get(key)
+    ]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.05,
+        help="tolerated slowdown as a fraction (0.05 = 5%%)",
+    )
+    parser.add_argument("--statistic", choices=sorted(STATISTICS), default="median")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--resamples", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    for warning in _environment_warnings(baseline, current):
+        print(warning, file=sys.stderr)
+    comparisons = compare(
+        baseline,
+        current,
+        threshold=args.threshold,
+        statistic=args.statistic,
+        confidence=args.confidence,
+        resamples=args.resamples,
+        seed=args.seed,
+    )
+    print(format_table(comparisons, args.statistic))
+    failed = [item.name for item in comparisons if item.status in FAILING]
+    if failed:
+        print(
+            f"\n{len(failed)} benchmark(s) failed the gate: {', '.join(failed)}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
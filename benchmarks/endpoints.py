@@ -0,0 +1,415 @@
+"""Drive every route of ``routers/auth.py`` through an in-process ASGI client.
+
+The application runs with its real lifespan against local stand-ins: one
+fakeredis server (shared by the async rate limiter client and the sync
+token store), a SQLite database (or any URL passed with
+``--database-url``, e.g. a local Postgres), the in-memory RabbitMQ broker
+and a stub OAuth provider. Single-use inputs such as verification, 2FA,
+reset and refresh tokens are created before the timed phase.
+
+Rate limiters are bypassed by default so every request reaches the
+handler; ``--keep-rate-limits`` measures them too (login and request-reset
+then need the optional ``lupa`` package for fakeredis Lua scripts). The
+outbox relay stays disabled, so events remain in the outbox table.
+
+Run from the repository root::
+
+    python -m benchmarks.endpoints --requests 300 --output endpoints.json
+    python -m benchmarks.endpoints --only login --only validate
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+import fakeredis
+import httpx
+import pyotp
+from fakeredis import aioredis
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.results import print_summary, summarize, write_results
+from database import Base
+from events import rabbitmq
+from events.channel_pool import ChannelPool
+from events.memory_broker import MemoryBroker
+from models import User
+from services import auth as auth_service
+from services import jwt as jwt_service
+from services import social as social_service
+from utils import hash_password, token_store
+from utils.settings import settings
+
+PASSWORD = "Secret123!"
+PREFIX = "/v1/auth"
+
+
+@dataclass
+class Request:
+    method: str
+    url: str
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+
+class LocalStack:
+    """Application, database and fakes shared by all scenarios."""
+
+    def __init__(self, database_url: str, keep_rate_limits: bool) -> None:
+        self.database_url = database_url
+        self.keep_rate_limits = keep_rate_limits
+        self._ids = itertools.count()
+
+    async def __aenter__(self) -> LocalStack:
+        settings.outbox_relay_enabled = False
+        settings.google_client_id = "bench-client"
+        settings.google_client_secret = "bench-secret"
+        settings.google_redirect_uri = "http://localhost/callback"
+
+        server = fakeredis.FakeServer()
+        token_store._redis_client = fakeredis.FakeRedis(
+            server=server, decode_responses=True
+        )
+        broker = MemoryBroker()
+        rabbitmq._pool = ChannelPool("memory://", connect=broker.connect)
+        social_service.set_async_transport(
+            "google", httpx.MockTransport(_oauth_provider)
+        )
+
+        connect_args = (
+            {"check_same_thread": False}
+            if self.database_url.startswith("sqlite")
+            else {}
+        )
+        self.engine = create_engine(self.database_url, connect_args=connect_args)
+        Base.metadata.drop_all(self.engine)
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(
+            bind=self.engine, autoflush=False, expire_on_commit=False
+        )
+
+        import main
+        from routers import auth as auth_router
+
+        main.redis.from_url = lambda *a, **k: aioredis.FakeRedis(
+            server=server, decode_responses=True
+        )
+        self.app = main.app
+
+        def get_db():
+            db = self.Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        self.app.dependency_overrides[auth_router.get_db] = get_db
+        if not self.keep_rate_limits:
+            for limiter in _rate_limiters(self.app):
+                self.app.dependency_overrides[limiter] = _no_limit
+
+        self._lifespan = self.app.router.lifespan_context(self.app)
+        await self._lifespan.__aenter__()
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=self.app, client=("127.0.0.1", 40000)),
+            base_url="http://bench",
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.client.aclose()
+        await self._lifespan.__aexit__(*exc_info)
+        self.app.dependency_overrides.clear()
+        self.engine.dispose()
+
+    def email(self, label: str) -> str:
+        return f"{label}{next(self._ids)}@bench.example.com"
+
+    def create_user(self, label: str, **fields) -> User:
+        fields.setdefault("is_email_verified", True)
+        with self.Session() as db:
+            user = User(
+                email=self.email(label),
+                hashed_password=hash_password(PASSWORD),
+                **fields,
+            )
+            db.add(user)
+            db.commit()
+            return user
+
+    def access_token(self, user: User) -> str:
+        return jwt_service.create_token(
+            user_id=str(user.id),
+            email=user.email,
+            role=user.role.value,
+            provider="local",
+        )
+
+
+def _rate_limiters(app) -> set:
+    from fastapi_limiter.depends import RateLimiter
+
+    from utils.rate_limit import MultiRuleRateLimiter
+
+    limiters = set()
+    for route in app.routes:
+        dependant = getattr(route, "dependant", None)
+        for dependency in dependant.dependencies if dependant else ():
+            if isinstance(dependency.call, (RateLimiter, MultiRuleRateLimiter)):
+                limiters.add(dependency.call)
+    return limiters
+
+
+async def _no_limit() -> None:
+    return None
+
+
+def _oauth_provider(request: httpx.Request) -> httpx.Response:
+    if request.method == "POST":
+        return httpx.Response(
+            200,
+            json={"access_token": "bench", "token_type": "Bearer", "expires_in": 3600},
+        )
+    return httpx.Response(
+        200,
+        json={
+            "sub": "bench-social",
+            "email": "social@bench.example.com",
+            "name": "Bench",
+            "picture": "http://avatar",
+        },
+    )
+
+
+def _bearer(token: str) -> dict:
+    return {"headers": {"Authorization": f"Bearer {token}"}}
+
+
+# Each scenario returns ``count`` requests, creating their inputs first
+
+
+def register(stack: LocalStack, count: int) -> list[Request]:
+    return [
+        Request(
+            "POST",
+            f"{PREFIX}/register",
+            {"json": {"email": stack.email("register"), "password": PASSWORD}},
+        )
+        for _ in range(count)
+    ]
+
+
+def login(stack: LocalStack, count: int) -> list[Request]:
+    user = stack.create_user("login")
+    body = {"email": user.email, "password": PASSWORD}
+    return [Request("POST", f"{PREFIX}/login", {"json": body})] * count
+
+
+def social_login(stack: LocalStack, count: int) -> list[Request]:
+    params = {"provider": "google"}
+    return [Request("GET", f"{PREFIX}/social/login", {"params": params})] * count
+
+
+def social_callback(stack: LocalStack, count: int) -> list[Request]:
+    body = {"provider": "google", "token": "bench-code"}
+    return [Request("POST", f"{PREFIX}/social/callback", {"json": body})] * count
+
+
+def verify_email(stack: LocalStack, count: int) -> list[Request]:
+    user = stack.create_user("verify", is_email_verified=False)
+    with stack.Session() as db:
+        tokens = [
+            auth_service.create_email_verification(db, user).token
+            for _ in range(count)
+        ]
+    return [
+        Request("GET", f"{PREFIX}/verify-email", {"params": {"token": token}})
+        for token in tokens
+    ]
+
+
+def verify_twofa(stack: LocalStack, count: int) -> list[Request]:
+    user = stack.create_user("twofa", totp_secret=pyotp.random_base32())
+    with stack.Session() as db:
+        tokens = [
+            auth_service.create_twofa_token(db, user).token for _ in range(count)
+        ]
+    totp = pyotp.TOTP(user.totp_secret)
+    return [
+        Request(
+            "POST",
+            f"{PREFIX}/verify-2fa",
+            {"json": {"twofa_token": token, "totp_code": totp.now()}},
+        )
+        for token in tokens
+    ]
+
+
+def request_reset(stack: LocalStack, count: int) -> list[Request]:
+    user = stack.create_user("reset")
+    body = {"email": user.email}
+    return [Request("POST", f"{PREFIX}/request-reset", {"json": body})] * count
+
+
+def reset_password(stack: LocalStack, count: int) -> list[Request]:
+    user = stack.create_user("newpass")
+    with stack.Session() as db:
+        tokens = [
+            auth_service.create_password_reset_token(db, user).token
+            for _ in range(count)
+        ]
+    return [
+        Request(
+            "POST",
+            f"{PREFIX}/reset-password",
+            {"json": {"token": token, "new_password": PASSWORD}},
+        )
+        for token in tokens
+    ]
+
+
+def validate(stack: LocalStack, count: int) -> list[Request]:
+    token = stack.access_token(stack.create_user("validate"))
+    return [Request("GET", f"{PREFIX}/validate", _bearer(token))] * count
+
+
+def me(stack: LocalStack, count: int) -> list[Request]:
+    token = stack.access_token(stack.create_user("me"))
+    return [Request("GET", f"{PREFIX}/me", _bearer(token))] * count
+
+
+def setup_twofa(stack: LocalStack, count: int) -> list[Request]:
+    token = stack.access_token(stack.create_user("setup"))
+    return [Request("POST", f"{PREFIX}/setup-2fa", _bearer(token))] * count
+
+
+def _refresh_tokens(stack: LocalStack, label: str, count: int) -> list[str]:
+    user = stack.create_user(label)
+    return [
+        jwt_service.create_refresh_token(
+            user_id=str(user.id),
+            email=user.email,
+            role=user.role.value,
+            provider="local",
+        )
+        for _ in range(count)
+    ]
+
+
+def refresh(stack: LocalStack, count: int) -> list[Request]:
+    (token,) = _refresh_tokens(stack, "refresh", 1)
+    body = {"refresh_token": token}
+    return [Request("POST", f"{PREFIX}/refresh", {"json": body})] * count
+
+
+def logout(stack: LocalStack, count: int) -> list[Request]:
+    return [
+        Request("POST", f"{PREFIX}/logout", {"json": {"refresh_token": token}})
+        for token in _refresh_tokens(stack, "logout", count)
+    ]
+
+
+SCENARIOS: dict[str, Callable[[LocalStack, int], list[Request]]] = {
+    "POST /register": register,
+    "POST /login": login,
+    "GET /social/login": social_login,
+    "POST /social/callback": social_callback,
+    "GET /verify-email": verify_email,
+    "POST /verify-2fa": verify_twofa,
+    "POST /request-reset": request_reset,
+    "POST /reset-password": reset_password,
+    "GET /validate": validate,
+    "GET /me": me,
+    "POST /setup-2fa": setup_twofa,
+    "POST /refresh": refresh,
+    "POST /logout": logout,
+}
+
+
+async def run_scenario(
+    stack: LocalStack, build, requests: int, warmup: int, concurrency: int
+) -> dict:
+    planned = build(stack, warmup + requests)
+    for request in planned[:warmup]:
+        await stack.client.request(request.method, request.url, **request.kwargs)
+
+    pending = iter(planned[warmup:])
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+
+    async def worker() -> None:
+        for request in pending:
+            start = time.perf_counter()
+            response = await stack.client.request(
+                request.method, request.url, **request.kwargs
+            )
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    return summarize(
+        latencies,
+        ops_per_sec=len(latencies) / elapsed,
+        concurrency=concurrency,
+        errors=errors,
+        statuses={str(status): count for status, count in sorted(statuses.items())},
+    )
+
+
+async def run(args: argparse.Namespace) -> dict:
+    selected = {
+        name: build
+        for name, build in SCENARIOS.items()
+        if not args.only or any(part in name for part in args.only)
+    }
+    results = {}
+    async with LocalStack(args.database_url, args.keep_rate_limits) as stack:
+        for name, build in selected.items():
+            results[name] = await run_scenario(
+                stack, build, args.requests, args.warmup, args.concurrency
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="requests in flight at once; SQLite serializes writers",
+    )
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--keep-rate-limits", action="store_true")
+    parser.add_argument(
+        "--only", action="append", help="run scenarios whose name contains this"
+    )
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.database_url is None:
+            args.database_url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        results = asyncio.run(run(args))
+    print_summary(results)
+    for name, entry in results.items():
+        if entry["errors"]:
+            print(f"warning: {name} returned {entry['statuses']}")
+    if args.output:
+        write_results(args.output, "endpoints", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
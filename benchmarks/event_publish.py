@@ -0,0 +1,115 @@
+"""Drive concurrent ``emit_event`` calls against the in-memory broker.
+
+Reports events/sec, publish latency percentiles (from ``emit_event`` until
+the broker confirms) and memory use, without a running RabbitMQ.
+
+Run from the repository root::
+
+    python -m benchmarks.event_publish --events 20000 --concurrency 500 \
+        --latency 0.002 --nack-rate 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+import uuid
+
+from events import rabbitmq
+from events.channel_pool import ChannelPool
+from events.memory_broker import MemoryBroker
+from schemas.event import UserLoggedInEvent
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def run(args: argparse.Namespace) -> dict:
+    broker = MemoryBroker(
+        latency=args.latency,
+        jitter=args.jitter,
+        nack_rate=args.nack_rate,
+        close_rate=args.close_rate,
+        seed=args.seed,
+    )
+    pool = ChannelPool("memory://", args.channels, connect=broker.connect)
+    rabbitmq._pool = pool
+    publisher = rabbitmq.publisher
+    publisher.channels = args.channels
+    publisher._scheduler.base_delay = args.retry_delay
+
+    started: dict[str, float] = {}
+    latencies: list[float] = []
+    done = asyncio.Event()
+
+    def on_publish(record) -> None:
+        event_id = json.loads(record.message.body)["event_id"]
+        latencies.append(record.confirmed_at - started.pop(event_id))
+        if len(latencies) == args.events:
+            done.set()
+
+    broker.on_publish = on_publish
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def emit() -> None:
+        event = UserLoggedInEvent(user_id=uuid.uuid4())
+        async with semaphore:
+            started[str(event.event_id)] = time.perf_counter()
+            await rabbitmq.emit_event("user.logged_in", event)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    await publisher.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(emit() for _ in range(args.events)))
+    try:
+        await asyncio.wait_for(done.wait(), args.timeout)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - start
+    await publisher.stop()
+    await pool.close()
+    peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+    tracemalloc.stop()
+
+    return {
+        "events": args.events,
+        "delivered": len(latencies),
+        "seconds": round(elapsed, 3),
+        "events_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "peak_memory_kib": round(peak / 1024, 1) if peak is not None else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.001)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--nack-rate", type=float, default=0.0)
+    parser.add_argument("--close-rate", type=float, default=0.0)
+    parser.add_argument("--retry-delay", type=float, default=0.01)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="report peak allocations with tracemalloc (slows the run)",
+    )
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
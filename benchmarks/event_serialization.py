@@ -0,0 +1,63 @@
+"""Measure event serialization throughput.
+
+Compares the previous ``json.dumps(event.model_dump(mode="json"))`` path with
+``serialize_event``, which encodes models straight to bytes with
+pydantic-core.
+
+Run from the repository root::
+
+    python -m benchmarks.event_serialization --events 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import uuid
+from typing import Callable
+
+from events.serialization import serialize_event
+from schemas.event import UserRegisteredEvent
+
+
+def _stdlib(event: UserRegisteredEvent) -> bytes:
+    return json.dumps(event.model_dump(mode="json")).encode()
+
+
+def _model_dump_json(event: UserRegisteredEvent) -> bytes:
+    return event.model_dump_json().encode()
+
+
+CANDIDATES: dict[str, Callable[[UserRegisteredEvent], bytes]] = {
+    "json.dumps(model_dump)": _stdlib,
+    "model_dump_json().encode()": _model_dump_json,
+    "serialize_event": serialize_event,
+}
+
+
+def measure(fn: Callable[[UserRegisteredEvent], bytes], events: list) -> float:
+    """Return events serialized per second."""
+    start = time.perf_counter()
+    for event in events:
+        fn(event)
+    return len(events) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    events = [
+        UserRegisteredEvent(user_id=uuid.uuid4(), email=f"user{i}@example.com")
+        for i in range(args.events)
+    ]
+    for name, fn in CANDIDATES.items():
+        best = max(measure(fn, events) for _ in range(args.repeat))
+        print(f"{name:<28} {best:>12,.0f} events/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Per-operation cost of the crypto and token primitives.
+
+Covers bcrypt hashing and verification, JWT creation and decoding with
+HS256 and RS256 (decoding both as a Redis cache hit and as a miss that
+verifies the signature), the token cache key hash, TOTP verification and
+event serialization.
+
+Each benchmark runs ``--repeat`` timed batches after a warmup; the batch
+size is calibrated so one batch takes about ``--min-time`` seconds. Inputs
+such as fresh tokens for cache misses are built outside the timed region.
+The token cache is an in-process fakeredis, so cache costs exclude the
+network round trip to a real Redis. RS256 uses a 2048-bit key generated
+for the run.
+
+Run from the repository root::
+
+    python -m benchmarks.primitives --output primitives.json
+    python -m benchmarks.primitives --only jwt
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import math
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import fakeredis
+import pyotp
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from benchmarks.results import print_summary, summarize, write_results
+from events.serialization import MSGPACK_CONTENT_TYPE, msgpack, serialize_event
+from models import User
+from schemas.event import UserRegisteredEvent
+from services import auth as auth_service
+from services import jwt as jwt_service
+from utils import token_store
+from utils.security import hash_password, verify_password
+
+PASSWORD = "Secret123!"
+
+
+@dataclass
+class Benchmark:
+    """``fn`` is timed once per element of ``inputs(count)``.
+
+    ``setup`` runs before the benchmark's inputs are built.
+    """
+
+    fn: Callable[[Any], Any]
+    inputs: Callable[[int], list]
+    setup: Callable[[], None] | None = None
+
+
+def _same(value) -> Callable[[int], list]:
+    return lambda count: [value] * count
+
+
+def measure(benchmark: Benchmark, repeat: int, min_time: float) -> dict:
+    """Return the stored entry with one seconds-per-op sample per batch."""
+    if benchmark.setup is not None:
+        benchmark.setup()
+    fn = benchmark.fn
+    warmup = benchmark.inputs(3)
+    start = time.perf_counter()
+    for value in warmup:
+        fn(value)
+    per_op = (time.perf_counter() - start) / len(warmup)
+    number = max(1, math.ceil(min_time / per_op)) if per_op else 1000
+
+    samples = []
+    for _ in range(repeat):
+        inputs = benchmark.inputs(number)
+        start = time.perf_counter()
+        for value in inputs:
+            fn(value)
+        samples.append((time.perf_counter() - start) / number)
+    return summarize(samples, number=number)
+
+
+def _rsa_keys() -> tuple[bytes, bytes]:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public = key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    return private, public
+
+
+_subjects = itertools.count()
+
+
+def _claims() -> dict:
+    return {
+        "user_id": f"user-{next(_subjects)}",
+        "email": "bench@example.com",
+        "role": "client",
+        "provider": "local",
+    }
+
+
+def _jwt_benchmarks(algorithm: str, keys: tuple) -> dict[str, Benchmark]:
+    def use_algorithm() -> None:
+        jwt_service.JWT_ALGORITHM = algorithm
+        jwt_service.PRIVATE_KEY, jwt_service.PUBLIC_KEY = keys
+
+    def fresh_tokens(count: int) -> list[str]:
+        # Signed but never cached, so every decode verifies the signature
+        now = int(time.time())
+        return [
+            jwt_service._sign(
+                {"sub": claims["user_id"], "iat": now, "exp": now + 3600, **claims}
+            )
+            for claims in (_claims() for _ in range(count))
+        ]
+
+    def cached_token(count: int) -> list[str]:
+        return [jwt_service.create_token(**_claims())] * count
+
+    return {
+        f"jwt {algorithm} create_token": Benchmark(
+            lambda claims: jwt_service.create_token(**claims),
+            lambda count: [_claims() for _ in range(count)],
+            use_algorithm,
+        ),
+        f"jwt {algorithm} decode_token cache hit": Benchmark(
+            jwt_service.decode_token, cached_token, use_algorithm
+        ),
+        f"jwt {algorithm} decode_token cache miss": Benchmark(
+            jwt_service.decode_token, fresh_tokens, use_algorithm
+        ),
+    }
+
+
+def build_benchmarks() -> dict[str, Benchmark]:
+    keys = {
+        "HS256": (jwt_service.SECRET_KEY, jwt_service.SECRET_KEY),
+        "RS256": _rsa_keys(),
+    }
+    hashed = hash_password(PASSWORD)
+    totp_user = User(email="bench@example.com", totp_secret=pyotp.random_base32())
+    code = pyotp.TOTP(totp_user.totp_secret).now()
+    event = UserRegisteredEvent(user_id=uuid.uuid4(), email="bench@example.com")
+
+    benchmarks = {
+        "bcrypt hash_password": Benchmark(hash_password, _same(PASSWORD)),
+        "bcrypt verify_password": Benchmark(
+            lambda h: verify_password(PASSWORD, h), _same(hashed)
+        ),
+    }
+    for algorithm, pair in keys.items():
+        benchmarks.update(_jwt_benchmarks(algorithm, pair))
+    benchmarks.update(
+        {
+            "token_store._hash": Benchmark(
+                token_store._hash, _same(jwt_service.create_token(**_claims()))
+            ),
+            "verify_totp": Benchmark(
+                lambda c: auth_service.verify_totp(totp_user, c), _same(code)
+            ),
+            "serialize_event json": Benchmark(serialize_event, _same(event)),
+        }
+    )
+    if msgpack is not None:
+        benchmarks["serialize_event msgpack"] = Benchmark(
+            lambda e: serialize_event(e, MSGPACK_CONTENT_TYPE), _same(event)
+        )
+    return benchmarks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="seconds per timed batch"
+    )
+    parser.add_argument(
+        "--only", action="append", help="run benchmarks whose name contains this"
+    )
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    token_store._redis_client = fakeredis.FakeRedis(decode_responses=True)
+    algorithm = jwt_service.JWT_ALGORITHM
+    keys = (jwt_service.PRIVATE_KEY, jwt_service.PUBLIC_KEY)
+    results = {}
+    try:
+        for name, benchmark in build_benchmarks().items():
+            if args.only and not any(part in name for part in args.only):
+                continue
+            results[name] = measure(benchmark, args.repeat, args.min_time)
+    finally:
+        jwt_service.JWT_ALGORITHM = algorithm
+        jwt_service.PRIVATE_KEY, jwt_service.PUBLIC_KEY = keys
+    print_summary(results)
+    if args.output:
+        write_results(args.output, "primitives", results, vars(args))
+
+
+if __name__ == "__main__":
+    main()
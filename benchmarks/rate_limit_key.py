@@ -0,0 +1,114 @@
+"""Per-request overhead of the rate limit key derivation.
+
+Compares the previous ``user_rate_limit_key`` (JWT decoded through the Redis
+token cache) with the current one (local JWT verification, key cached on
+the request). JSON bodies come from the request cache in both versions.
+Redis is emulated with ``fakeredis`` so the numbers exclude network
+latency; against a real server every legacy call adds a round trip.
+
+Run from the repository root::
+
+    python -m benchmarks.rate_limit_key --requests 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable
+
+import fakeredis
+from starlette.requests import Request
+
+from services import jwt as jwt_service
+from utils import token_store
+from utils.rate_limit import user_rate_limit_key
+
+
+async def legacy_rate_limit_key(request: Request) -> str:
+    """The key derivation as it was before local JWT verification."""
+    user_part = None
+    auth = request.headers.get("Authorization")
+    if auth and auth.startswith("Bearer "):
+        try:
+            payload = jwt_service.decode_token(auth.split(" ", 1)[1])
+            user_part = payload.get("sub") or payload.get("email")
+        except Exception:
+            user_part = None
+    if user_part is None and request.method in {"POST", "PUT", "PATCH"}:
+        try:
+            data = await request.json()
+            user_part = data.get("email")
+        except Exception:
+            user_part = None
+    forwarded = request.headers.get("X-Forwarded-For")
+    ip = forwarded.split(",")[0] if forwarded else request.client.host
+    return f"{user_part or 'anon'}:{ip}"
+
+
+def _request(method: str, headers: dict[str, str], body: bytes) -> Request:
+    scope = {
+        "type": "http",
+        "path": "/login",
+        "method": method,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("127.0.0.1", 12345),
+        "state": {},
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    request = Request(scope, receive=receive)
+    if body:
+        # FastAPI has parsed the JSON body before dependencies run
+        request._body = body
+        request._json = json.loads(body)
+    return request
+
+
+async def measure(
+    key_fn: Callable[[Request], Awaitable[str]],
+    make_request: Callable[[], Request],
+    count: int,
+) -> float:
+    """Return the mean microseconds spent deriving one key."""
+    requests = [make_request() for _ in range(count)]
+    start = time.perf_counter()
+    for request in requests:
+        await key_fn(request)
+    return (time.perf_counter() - start) / count * 1_000_000
+
+
+async def run(count: int) -> None:
+    token_store._redis_client = fakeredis.FakeRedis(decode_responses=True)
+    token = jwt_service.create_token(
+        user_id="bench", email="bench@example.com", role="client", provider="local"
+    )
+    body = json.dumps({"email": "bench@example.com", "password": "x" * 12}).encode()
+    scenarios = {
+        "GET with bearer token": lambda: _request(
+            "GET", {"Authorization": f"Bearer {token}"}, b""
+        ),
+        "POST JSON body": lambda: _request(
+            "POST", {"Content-Type": "application/json"}, body
+        ),
+    }
+    print(f"{'scenario':<24} {'legacy us':>10} {'current us':>11}")
+    for name, make_request in scenarios.items():
+        legacy = await measure(legacy_rate_limit_key, make_request, count)
+        current = await measure(user_rate_limit_key, make_request, count)
+        print(f"{name:<24} {legacy:>10.1f} {current:>11.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Shared result format for the benchmark suites.
+
+A results file is JSON with a ``meta`` block describing the run and one
+entry per benchmark under ``benchmarks``::
+
+    {
+      "meta": {"suite": "endpoints", "created": "...", "python": "3.12.1",
+               "platform": "...", "git_commit": "...", "args": {...}},
+      "benchmarks": {
+        "POST /v1/auth/login": {
+          "unit": "seconds", "samples": [...], "count": 500,
+          "mean": ..., "p50": ..., "p95": ..., "p99": ..., "ops_per_sec": ...
+        }
+      }
+    }
+
+``samples`` holds the raw timings in seconds per operation (one per
+request for endpoint runs, one per repetition for micro-benchmarks) so two
+files can be compared statistically later, not only by their summaries.
+"""
+
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """Return the ``pct`` percentile of ``values`` (nearest rank)."""
+    ordered = sorted(values)
+    if not ordered:
+        raise ValueError("percentile of an empty sequence")
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(
+    samples: list[float], *, ops_per_sec: float | None = None, **extra
+) -> dict:
+    """Return the stored entry for one benchmark.
+
+    ``ops_per_sec`` defaults to the inverse of the mean sample, which is
+    right for sequential runs; concurrent runs pass their wall-clock rate.
+    """
+    mean = statistics.fmean(samples)
+    entry: dict[str, Any] = {
+        "unit": "seconds",
+        "count": len(samples),
+        "mean": mean,
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "ops_per_sec": ops_per_sec if ops_per_sec is not None else 1 / mean,
+    }
+    entry.update(extra)
+    entry["samples"] = samples
+    return entry
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_metadata(suite: str, args: dict[str, Any] | None = None) -> dict:
+    return {
+        "suite": suite,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "implementation": sys.implementation.name,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "git_commit": _git_commit(),
+        "args": args or {},
+    }
+
+
+def write_results(path: str | Path, suite: str, benchmarks: dict, args=None) -> None:
+    """Write ``benchmarks`` with run metadata to ``path``."""
+    document = {"meta": run_metadata(suite, args), "benchmarks": benchmarks}
+    Path(path).write_text(json.dumps(document, indent=2) + "\n")
+
+
+def load_results(path: str | Path) -> dict:
+    document = json.loads(Path(path).read_text())
+    if "benchmarks" not in document:
+        raise ValueError(f"{path} is not a benchmark results file")
+    return document
+
+
+def format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.3f}"
+
+
+def print_summary(benchmarks: dict) -> None:
+    """Print one line per benchmark with throughput and percentiles (ms)."""
+    width = max((len(name) for name in benchmarks), default=10)
+    print(
+        f"{'benchmark':<{width}} {'ops/s':>10} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'p99 ms':>9}"
+    )
+    for name, entry in benchmarks.items():
+        print(
+            f"{name:<{width}} {entry['ops_per_sec']:>10,.1f} "
+            f"{format_ms(entry['p50']):>9} {format_ms(entry['p95']):>9} "
+            f"{format_ms(entry['p99']):>9}"
+        )
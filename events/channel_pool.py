@@ -0,0 +1,114 @@
+"""Pool of publisher channels sharing one RabbitMQ connection."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+import aio_pika
+
+logger = logging.getLogger(__name__)
+
+
+def _is_closed(resource) -> bool:
+    return resource is None or getattr(resource, "is_closed", False) is not False
+
+
+class ChannelPool:
+    """Hand out exchanges bound to a fixed number of confirm-mode channels.
+
+    Exchanges are returned round-robin so concurrent publishers use
+    separate AMQP channels instead of serializing through one. Each slot is
+    health-checked when it is handed out: a closed channel is replaced on
+    its own, and the connection is only reopened once it has closed.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        size: int = 4,
+        *,
+        exchange_name: str = "bee.auth.events",
+        exchange_type: aio_pika.ExchangeType = aio_pika.ExchangeType.TOPIC,
+        connect: Callable[[str], Awaitable] | None = None,
+    ) -> None:
+        if size < 1:
+            raise ValueError("Channel pool size must be at least 1")
+        self.url = url
+        self.size = size
+        self.exchange_name = exchange_name
+        self.exchange_type = exchange_type
+        # Defaults to aio_pika.connect_robust, looked up at call time
+        self._connect = connect
+        self._connection: aio_pika.abc.AbstractRobustConnection | None = None
+        self._channels: list[aio_pika.abc.AbstractChannel | None] = [None] * size
+        self._exchanges: list[aio_pika.abc.AbstractExchange | None] = [None] * size
+        self._next = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def open_channels(self) -> int:
+        return sum(1 for channel in self._channels if not _is_closed(channel))
+
+    async def get_exchange(self) -> aio_pika.abc.AbstractExchange:
+        """Return the exchange of the next healthy channel in the pool."""
+        index = self._next
+        self._next = (index + 1) % self.size
+
+        # Fast path: avoid taking the lock while the slot is healthy
+        exchange = self._exchanges[index]
+        if exchange is not None and not _is_closed(self._channels[index]):
+            return exchange
+
+        async with self._lock:
+            exchange = self._exchanges[index]
+            if exchange is not None and not _is_closed(self._channels[index]):
+                return exchange
+
+            if _is_closed(self._connection):
+                connect = self._connect or aio_pika.connect_robust
+                self._connection = await connect(self.url)
+
+            channel = await self._connection.channel(publisher_confirms=True)
+            try:
+                exchange = await channel.declare_exchange(
+                    self.exchange_name, self.exchange_type
+                )
+            except Exception:
+                await self._close_channel(channel)
+                raise
+            self._channels[index] = channel
+            self._exchanges[index] = exchange
+            return exchange
+
+    async def reset(self) -> None:
+        """Drop broken channels, and the connection only if it has closed."""
+        async with self._lock:
+            connection_closed = _is_closed(self._connection)
+            for index, channel in enumerate(self._channels):
+                if connection_closed or _is_closed(channel):
+                    await self._close_channel(channel)
+                    self._channels[index] = None
+                    self._exchanges[index] = None
+            if connection_closed:
+                self._connection = None
+
+    async def close(self) -> None:
+        """Close every channel and the shared connection."""
+        async with self._lock:
+            connection = self._connection
+            self._connection = None
+            self._channels = [None] * self.size
+            self._exchanges = [None] * self.size
+            if not _is_closed(connection):
+                await connection.close()
+
+    @staticmethod
+    async def _close_channel(channel) -> None:
+        if _is_closed(channel):
+            return
+        try:
+            await channel.close()
+        except Exception:  # pragma: no cover - best effort cleanup
+            logger.warning("Failed to close RabbitMQ channel", exc_info=True)
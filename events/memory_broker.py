@@ -0,0 +1,140 @@
+"""In-process stand-in for RabbitMQ used by tests and benchmarks.
+
+``MemoryBroker.connect`` mimics the parts of ``aio_pika.connect_robust``
+that the publisher relies on: connections open confirm-mode channels,
+channels declare exchanges and ``exchange.publish`` resolves once the
+message is "confirmed". Confirms can be delayed and publishes can fail or
+close their channel to exercise the retry and channel pool code paths.
+Set ``RABBITMQ_URL=memory://`` to run the service without a broker.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+import aio_pika
+
+
+@dataclass
+class PublishedMessage:
+    exchange: str
+    routing_key: str
+    message: aio_pika.Message
+    confirmed_at: float = field(default_factory=time.perf_counter)
+
+
+class MemoryExchange:
+    def __init__(self, channel: MemoryChannel, name: str) -> None:
+        self.channel = channel
+        self.name = name
+
+    async def publish(self, message: aio_pika.Message, routing_key: str) -> None:
+        broker = self.channel.connection.broker
+        if self.channel.is_closed:
+            raise aio_pika.exceptions.ChannelInvalidStateError("Channel closed")
+        delay = broker.confirm_delay()
+        if delay:
+            await asyncio.sleep(delay)
+        fault = broker.next_fault()
+        if fault == "close":
+            self.channel.is_closed = True
+            raise aio_pika.exceptions.ChannelInvalidStateError("Channel closed")
+        if fault == "nack":
+            raise aio_pika.exceptions.DeliveryError(None, None)
+        record = PublishedMessage(self.name, routing_key, message)
+        broker.published.append(record)
+        if broker.on_publish is not None:
+            broker.on_publish(record)
+
+
+class MemoryChannel:
+    def __init__(self, connection: MemoryConnection) -> None:
+        self.connection = connection
+        self.is_closed = False
+
+    async def declare_exchange(
+        self, name: str, type: aio_pika.ExchangeType = aio_pika.ExchangeType.DIRECT
+    ) -> MemoryExchange:
+        return MemoryExchange(self, name)
+
+    async def close(self) -> None:
+        self.is_closed = True
+
+
+class MemoryConnection:
+    def __init__(self, broker: MemoryBroker) -> None:
+        self.broker = broker
+        self.is_closed = False
+        self.channels: list[MemoryChannel] = []
+
+    async def channel(self, publisher_confirms: bool = True) -> MemoryChannel:
+        if self.is_closed:
+            raise aio_pika.exceptions.ChannelInvalidStateError("Connection closed")
+        channel = MemoryChannel(self)
+        self.channels.append(channel)
+        return channel
+
+    async def close(self) -> None:
+        self.is_closed = True
+        for channel in self.channels:
+            channel.is_closed = True
+
+
+class MemoryBroker:
+    """Record published messages, optionally adding latency and faults.
+
+    ``latency`` and ``jitter`` delay each confirm by ``latency`` plus up to
+    ``jitter`` seconds. ``nack_rate`` and ``close_rate`` are the fractions
+    of publishes that are nacked or close their channel; ``fail_next``
+    queues deterministic faults ahead of the random ones.
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        nack_rate: float = 0.0,
+        close_rate: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.nack_rate = nack_rate
+        self.close_rate = close_rate
+        self.published: list[PublishedMessage] = []
+        self.connections: list[MemoryConnection] = []
+        self.on_publish: Callable[[PublishedMessage], None] | None = None
+        self._faults: list[str] = []
+        self._random = random.Random(seed)
+
+    async def connect(self, url: str | None = None) -> MemoryConnection:
+        connection = MemoryConnection(self)
+        self.connections.append(connection)
+        return connection
+
+    def fail_next(self, count: int = 1, fault: str = "nack") -> None:
+        """Fail the next ``count`` publishes with ``fault`` ("nack" or "close")."""
+        self._faults.extend([fault] * count)
+
+    def confirm_delay(self) -> float:
+        if not self.jitter:
+            return self.latency
+        return self.latency + self._random.random() * self.jitter
+
+    def next_fault(self) -> str | None:
+        if self._faults:
+            return self._faults.pop(0)
+        roll = self._random.random()
+        if roll < self.close_rate:
+            return "close"
+        if roll < self.close_rate + self.nack_rate:
+            return "nack"
+        return None
+
+
+broker = MemoryBroker()
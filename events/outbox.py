@@ -0,0 +1,198 @@
+"""Transactional outbox for auth events.
+
+Events are written to ``event_outbox`` in the same database transaction as
+the business change that produced them. ``OutboxRelay`` publishes pending
+rows to RabbitMQ in batches and marks them as sent.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session, sessionmaker
+
+from database import SessionLocal
+from models import EventOutbox
+from utils.metrics import outbox_published_counter
+from utils.settings import settings
+
+from .publisher import EventPublisher, PendingEvent
+from .rabbitmq import publisher as default_publisher
+from .serialization import content_type_for, serialize_event
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL_SECONDS = 60
+
+
+def add_event(db: Session, routing_key: str, event: BaseModel) -> EventOutbox:
+    """Stage an event in the outbox; the caller commits it with its changes."""
+    content_type = content_type_for(routing_key)
+    record = EventOutbox(
+        routing_key=routing_key,
+        payload=serialize_event(event, content_type),
+        content_type=content_type,
+    )
+    db.add(record)
+    return record
+
+
+class OutboxRelay:
+    """Publish pending outbox rows in batches on a background task.
+
+    All database work runs on one dedicated thread so a session never moves
+    between threads and the event loop never blocks on the database.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        publisher: EventPublisher = default_publisher,
+        *,
+        batch_size: int = 100,
+        interval: float = 1.0,
+        retention_seconds: int = 60 * 60 * 24,
+    ) -> None:
+        self._session_factory = session_factory
+        self._publisher = publisher
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="outbox-relay"
+        )
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._last_purge = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="outbox-relay")
+
+    async def stop(self) -> None:
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+
+    async def wake(self) -> None:
+        """Ask the relay to publish now instead of waiting for the interval."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                while await self.relay_batch() == self.batch_size:
+                    pass
+                if time.monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                    await self._in_thread(self.purge_sent)
+                    self._last_purge = time.monotonic()
+            except Exception:
+                logger.exception("Outbox relay iteration failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _in_thread(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def relay_batch(self) -> int:
+        """Publish one batch of pending events and return how many were sent."""
+        db, rows = await self._in_thread(self._claim_pending)
+        if not rows:
+            return 0
+        sent: list[EventOutbox] = []
+        try:
+            outcome = await self._publisher.publish(
+                [
+                    PendingEvent(
+                        row.routing_key,
+                        row.payload,
+                        content_type=row.content_type,
+                        message_id=str(row.id),
+                    )
+                    for row in rows
+                ]
+            )
+            sent = [row for row, ok in zip(rows, outcome) if ok]
+        finally:
+            await self._in_thread(self._finish, db, sent)
+        outbox_published_counter.inc(len(sent))
+        return len(sent)
+
+    def _claim_pending(self) -> tuple[Session | None, list[EventOutbox]]:
+        db = self._session_factory()
+        try:
+            # SKIP LOCKED lets relays in several workers share the table
+            # without publishing the same row twice.
+            rows = (
+                db.query(EventOutbox)
+                .filter(EventOutbox.sent_at.is_(None))
+                .order_by(EventOutbox.created_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+        except Exception:
+            db.close()
+            raise
+        if not rows:
+            db.rollback()
+            db.close()
+            return None, []
+        return db, rows
+
+    def _finish(self, db: Session, sent: list[EventOutbox]) -> None:
+        try:
+            if sent:
+                now = datetime.now(timezone.utc)
+                for row in sent:
+                    row.sent_at = now
+                db.commit()
+            else:
+                db.rollback()
+        finally:
+            db.close()
+
+    def purge_sent(self) -> int:
+        """Delete rows sent more than ``retention_seconds`` ago."""
+        cutoff = datetime.now(timezone.utc) - timedelta(
+            seconds=self.retention_seconds
+        )
+        db = self._session_factory()
+        try:
+            deleted = (
+                db.query(EventOutbox)
+                .filter(EventOutbox.sent_at < cutoff)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+
+relay = OutboxRelay(
+    batch_size=settings.outbox_batch_size,
+    interval=settings.outbox_relay_interval,
+    retention_seconds=settings.outbox_retention_seconds,
+)
@@ -0,0 +1,367 @@
+"""Batched event publisher backed by a bounded in-memory queue."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+import aio_pika
+
+from utils.metrics import (
+    event_confirm_failures_counter,
+    event_dropped_counter,
+    event_publish_latency,
+    event_queue_depth,
+    event_spooled_counter,
+)
+
+from .retry import RetryScheduler
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .spool import EventSpool
+
+logger = logging.getLogger(__name__)
+
+ExchangeFactory = Callable[[], Awaitable[aio_pika.abc.AbstractExchange]]
+
+
+class PendingEvent:
+    """Serialized event waiting to be published."""
+
+    __slots__ = (
+        "routing_key",
+        "body",
+        "content_type",
+        "message_id",
+        "user_id",
+        "enqueued_at",
+        "attempts",
+    )
+
+    def __init__(
+        self,
+        routing_key: str,
+        body: bytes,
+        *,
+        content_type: str = "application/json",
+        message_id: str | None = None,
+        user_id: Any = None,
+    ) -> None:
+        self.routing_key = routing_key
+        self.body = body
+        self.content_type = content_type
+        self.message_id = message_id
+        self.user_id = user_id
+        self.enqueued_at = time.perf_counter()
+        self.attempts = 0
+
+    def to_message(self) -> aio_pika.Message:
+        return aio_pika.Message(
+            body=self.body,
+            content_type=self.content_type,
+            message_id=self.message_id,
+        )
+
+
+def _channel_closed(exchange: aio_pika.abc.AbstractExchange) -> bool:
+    channel = getattr(exchange, "channel", None)
+    return getattr(channel, "is_closed", False) is True
+
+
+class EventPublisher:
+    """Drain queued events to RabbitMQ in batches on a dedicated task.
+
+    Publishes within a batch are issued concurrently so broker confirms are
+    pipelined instead of awaited one message at a time. With ``channels``
+    greater than one the batch is split across that many exchanges obtained
+    from ``get_exchange``, so a channel pool can publish them in parallel.
+    Failed events go to a ``RetryScheduler`` that redelivers them with
+    exponential backoff, so neither the drain task nor the caller waits.
+    When a ``spool`` is configured, events that cannot be queued or
+    delivered are written to disk and replayed once the broker accepts
+    publishes again.
+    """
+
+    def __init__(
+        self,
+        get_exchange: ExchangeFactory,
+        reset_connection: Callable[[], Awaitable[None]],
+        *,
+        max_queue_size: int = 10000,
+        batch_size: int = 100,
+        channels: int = 1,
+        max_attempts: int = 3,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 60.0,
+        max_age: float = 300.0,
+        spool: EventSpool | None = None,
+        replay_interval: float = 5.0,
+    ) -> None:
+        self._get_exchange = get_exchange
+        self._reset_connection = reset_connection
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.channels = max(1, channels)
+        self.spool = spool
+        self.replay_interval = replay_interval
+        self._queue: asyncio.Queue[PendingEvent] | None = None
+        self._task: asyncio.Task | None = None
+        self._scheduler = RetryScheduler(
+            self._redeliver,
+            self._discard,
+            base_delay=retry_delay,
+            max_delay=max_retry_delay,
+            max_attempts=max_attempts,
+            max_age=max_age,
+        )
+        self._direct_tasks: set[asyncio.Task] = set()
+        self._replay_task: asyncio.Task | None = None
+        self._flush_task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Start the drain task on the running event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run(), name="event-publisher")
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Flush queued events for up to ``timeout`` seconds and stop."""
+        if not self._task:
+            return
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._wait_drained(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            remaining = self._scheduler.drain()
+            while not self._queue.empty():
+                remaining.append(self._queue.get_nowait())
+            if remaining:
+                logger.error(
+                    "Event publisher stopped with %s unpublished events",
+                    len(remaining),
+                    extra={"endpoint": "rabbitmq"},
+                )
+                for event in remaining:
+                    self._discard(event)
+        if self._replay_task is not None and not self._replay_task.done():
+            # Let an in-flight replay finish so confirmed events are removed
+            # from the spool instead of being delivered again on restart
+            try:
+                await asyncio.wait_for(asyncio.shield(self._replay_task), timeout)
+            except Exception:
+                pass
+        for task in (self._task, self._replay_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._replay_task = None
+        if self._flush_task is not None:
+            await self._flush_task
+            self._flush_task = None
+        if self.spool is not None:
+            await asyncio.to_thread(self.spool.close)
+        self._task = None
+        self._queue = None
+        event_queue_depth.set(0)
+
+    async def _wait_drained(self) -> None:
+        while True:
+            await self._queue.join()
+            due = self._scheduler.next_due()
+            if due is None:
+                return
+            await asyncio.sleep(max(due - asyncio.get_running_loop().time(), 0))
+
+    def enqueue(
+        self,
+        routing_key: str,
+        body: bytes,
+        user_id: Any = None,
+        *,
+        content_type: str = "application/json",
+    ) -> bool:
+        """Queue an event for publishing; return ``False`` if it was dropped."""
+        return self._put(
+            PendingEvent(
+                routing_key, body, content_type=content_type, user_id=user_id
+            )
+        )
+
+    async def publish_now(
+        self,
+        routing_key: str,
+        body: bytes,
+        user_id: Any = None,
+        *,
+        content_type: str = "application/json",
+    ) -> None:
+        """Publish one event without the queue, for use before ``start``.
+
+        A failed publish is handed to the retry scheduler instead of being
+        retried inline, so the caller returns after a single attempt.
+        """
+        await self._publish_batch(
+            [
+                PendingEvent(
+                    routing_key, body, content_type=content_type, user_id=user_id
+                )
+            ]
+        )
+
+    def _put(self, event: PendingEvent) -> bool:
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            return self._discard(event)
+        event_queue_depth.set(self._queue.qsize())
+        return True
+
+    def _discard(self, event: PendingEvent) -> bool:
+        """Spool an undeliverable event, or drop it when no spool can take it."""
+        if self.spool is not None and self.spool.append(event):
+            event_spooled_counter.inc()
+            self._schedule_flush()
+            return True
+        event_dropped_counter.inc()
+        logger.error(
+            "event_dropped",
+            extra={"endpoint": "rabbitmq", "user_id": event.user_id},
+        )
+        return False
+
+    def _schedule_flush(self) -> None:
+        # fsync spooled records off the event loop, batching appends that
+        # arrive while a flush is already running
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(
+                asyncio.to_thread(self.spool.flush)
+            )
+
+    def _maybe_replay(self) -> None:
+        if (
+            self.spool is None
+            or not self.spool.pending
+            or (self._replay_task is not None and not self._replay_task.done())
+        ):
+            return
+        self._replay_task = asyncio.get_running_loop().create_task(
+            self.spool.replay(self.publish, self.batch_size),
+            name="event-spool-replay",
+        )
+
+    async def _run(self) -> None:
+        queue = self._queue
+        self._maybe_replay()
+        while True:
+            if self.spool is not None and self.spool.pending:
+                try:
+                    first = await asyncio.wait_for(queue.get(), self.replay_interval)
+                except asyncio.TimeoutError:
+                    self._maybe_replay()
+                    continue
+            else:
+                first = await queue.get()
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            event_queue_depth.set(queue.qsize())
+            try:
+                await self._publish_batch(batch)
+            except Exception:  # pragma: no cover - defensive
+                logger.exception("Unexpected error in event publisher")
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def publish(self, batch: list[PendingEvent]) -> list[bool]:
+        """Publish ``batch`` concurrently and return per-event success."""
+        if self.channels == 1 or len(batch) == 1:
+            return await self._publish_on_channel(batch)
+        size = -(-len(batch) // self.channels)
+        chunks = [batch[i:i + size] for i in range(0, len(batch), size)]
+        results = await asyncio.gather(
+            *(self._publish_on_channel(chunk) for chunk in chunks)
+        )
+        return [ok for outcome in results for ok in outcome]
+
+    async def _publish_on_channel(self, batch: list[PendingEvent]) -> list[bool]:
+        """Publish ``batch`` on a single exchange.
+
+        The connection is reset only when the exchange cannot be obtained or
+        its channel has closed; a single nacked message leaves it untouched.
+        """
+        try:
+            exchange = await self._get_exchange()
+        except Exception:
+            logger.exception("Failed to open RabbitMQ exchange")
+            await self._reset_connection()
+            event_confirm_failures_counter.inc(len(batch))
+            return [False] * len(batch)
+
+        results = await asyncio.gather(
+            *(
+                exchange.publish(event.to_message(), routing_key=event.routing_key)
+                for event in batch
+            ),
+            return_exceptions=True,
+        )
+
+        outcome: list[bool] = []
+        now = time.perf_counter()
+        for event, result in zip(batch, results):
+            if isinstance(result, BaseException):
+                event_confirm_failures_counter.inc()
+                outcome.append(False)
+                continue
+            event_publish_latency.observe(now - event.enqueued_at)
+            logger.info(
+                "event_published",
+                extra={"endpoint": "rabbitmq", "user_id": event.user_id},
+            )
+            outcome.append(True)
+
+        failures = outcome.count(False)
+        if failures:
+            logger.error(
+                "Failed to publish %s of %s events", failures, len(batch)
+            )
+            if _channel_closed(exchange):
+                await self._reset_connection()
+        return outcome
+
+    async def _publish_batch(self, batch: list[PendingEvent]) -> None:
+        outcome = await self.publish(batch)
+        if any(outcome):
+            self._maybe_replay()
+        for event, ok in zip(batch, outcome):
+            if ok:
+                continue
+            event.attempts += 1
+            self._scheduler.schedule(event)
+
+    def _redeliver(self, events: list[PendingEvent]) -> None:
+        if self._queue is not None:
+            for event in events:
+                self._put(event)
+            return
+        # Not started: publish directly on a task tracked until it finishes
+        task = asyncio.get_running_loop().create_task(self._publish_batch(events))
+        self._direct_tasks.add(task)
+        task.add_done_callback(self._direct_tasks.discard)
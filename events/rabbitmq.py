@@ -1,84 +1,94 @@
-import json
 import logging
-import asyncio
+from typing import Any
 
 import aio_pika
+from pydantic import BaseModel
 
 from utils.settings import settings
 
+from .channel_pool import ChannelPool
+from .memory_broker import broker as memory_broker
+from .publisher import EventPublisher
+from .serialization import content_type_for, event_user_id, serialize_event
+from .spool import EventSpool
+
 RABBITMQ_URL = settings.rabbitmq_url
 
 logger = logging.getLogger(__name__)
 
-_connection_lock = asyncio.Lock()
-_connection: aio_pika.RobustConnection | None = None
-_channel: aio_pika.abc.AbstractRobustChannel | None = None
-_exchange: aio_pika.abc.AbstractRobustExchange | None = None
+_pool = ChannelPool(
+    RABBITMQ_URL,
+    settings.rabbitmq_channel_pool_size,
+    # memory:// publishes to the in-process stand-in broker
+    connect=memory_broker.connect if RABBITMQ_URL.startswith("memory://") else None,
+)
 
 
-async def _get_exchange() -> aio_pika.abc.AbstractRobustExchange:
-    """Return an open exchange, creating the connection if needed."""
+async def _get_exchange() -> aio_pika.abc.AbstractExchange:
+    """Return an open exchange from the channel pool."""
 
-    global _connection, _channel, _exchange
+    return await _pool.get_exchange()
 
-    async with _connection_lock:
-        if _exchange and getattr(_exchange, "is_closed", False) is False:
-            return _exchange
 
-        if not _connection or getattr(_connection, "is_closed", False):
-            _connection = await aio_pika.connect_robust(RABBITMQ_URL)
+async def _reset_connection() -> None:
+    """Replace closed channels, reopening the connection only if it closed."""
 
-        if not _channel or getattr(_channel, "is_closed", False):
-            _channel = await _connection.channel()
+    await _pool.reset()
 
-        _exchange = await _channel.declare_exchange(
-            "bee.auth.events", aio_pika.ExchangeType.TOPIC
-        )
-        return _exchange
 
+async def close_connection() -> None:
+    """Close the pooled channels and the RabbitMQ connection."""
 
-async def _reset_connection() -> None:
-    """Close and clear the cached connection and channel."""
+    await _pool.close()
 
-    global _connection, _channel, _exchange
 
-    if _connection and getattr(_connection, "is_closed", False) is False:
-        await _connection.close()
+spool = (
+    EventSpool(
+        settings.event_spool_dir,
+        max_bytes=settings.event_spool_max_bytes,
+        segment_bytes=settings.event_spool_segment_bytes,
+    )
+    if settings.event_spool_dir
+    else None
+)
 
-    _connection = None
-    _channel = None
-    _exchange = None
+publisher = EventPublisher(
+    _get_exchange,
+    _reset_connection,
+    max_queue_size=settings.event_queue_max_size,
+    batch_size=settings.event_batch_size,
+    channels=settings.rabbitmq_channel_pool_size,
+    max_attempts=settings.event_max_attempts,
+    retry_delay=settings.event_retry_base_delay,
+    max_retry_delay=settings.event_retry_max_delay,
+    max_age=settings.event_retry_max_age,
+    spool=spool,
+)
 
 
 async def emit_event(
     routing_key: str,
-    message: dict,
-    retries: int = 3,
-    delay: float = 1.0,
+    message: BaseModel | dict[str, Any],
 ) -> None:
-    """Publish a JSON event to RabbitMQ using a topic exchange."""
-
-    for attempt in range(1, retries + 1):
-        try:
-            exchange = await _get_exchange()
-            await exchange.publish(
-                aio_pika.Message(body=json.dumps(message).encode()),
-                routing_key=routing_key,
-            )
-            logger.info(
-                "event_published",
-                extra={
-                    "endpoint": "rabbitmq",
-                    "user_id": message.get("user_id"),
-                },
-            )
-            break
-        except Exception:  # pragma: no cover - executed in tests
-            logger.exception(
-                "Failed to publish event '%s' on attempt %s", routing_key, attempt
-            )
-            await _reset_connection()
-            if attempt == retries:
-                raise
-            await asyncio.sleep(delay)
-
+    """Publish a JSON event to RabbitMQ using a topic exchange.
+
+    ``message`` may be an event model or a dict; it is serialized once to
+    bytes with pydantic-core, so ``UUID`` and ``datetime`` values are
+    supported. Routing keys configured for msgpack are encoded as msgpack
+    and published with a matching ``content_type``.
+
+    When the batched ``publisher`` is running the event is queued and this
+    returns immediately. Otherwise it is published directly once; either
+    way failed publishes are redelivered by the publisher's retry scheduler
+    and spooled or dropped once the retry policy gives up.
+    """
+
+    content_type = content_type_for(routing_key)
+    body = serialize_event(message, content_type)
+    user_id = event_user_id(message)
+    if publisher.running:
+        publisher.enqueue(routing_key, body, user_id, content_type=content_type)
+        return
+    await publisher.publish_now(
+        routing_key, body, user_id, content_type=content_type
+    )
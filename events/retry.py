@@ -0,0 +1,120 @@
+"""Central scheduler for event redelivery with exponential backoff."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from typing import TYPE_CHECKING, Callable
+
+from utils.metrics import event_dead_lettered_counter, event_retry_pending
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .publisher import PendingEvent
+
+
+class RetryScheduler:
+    """Hold failed events in a heap ordered by their next delivery time.
+
+    A single loop timer is armed for the earliest event, so thousands of
+    pending retries cost one timer instead of one parked task each. Events
+    that exhausted ``max_attempts`` or are older than ``max_age`` seconds are
+    handed to ``dead_letter`` instead of being rescheduled.
+    """
+
+    def __init__(
+        self,
+        redeliver: Callable[[list[PendingEvent]], None],
+        dead_letter: Callable[[PendingEvent], object],
+        *,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        max_attempts: int = 5,
+        max_age: float = 300.0,
+        jitter: Callable[[], float] = random.random,
+    ) -> None:
+        self._redeliver = redeliver
+        self._dead_letter = dead_letter
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.max_age = max_age
+        self._jitter = jitter
+        self._heap: list[tuple[float, int, PendingEvent]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._timer_loop: asyncio.AbstractEventLoop | None = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def backoff(self, attempts: int) -> float:
+        """Return the delay before attempt ``attempts + 1``.
+
+        The exponential delay is capped at ``max_delay`` and half of it is
+        randomized so retries from many workers do not arrive in lockstep.
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** max(attempts - 1, 0))
+        return delay / 2 + self._jitter() * delay / 2
+
+    def schedule(self, event: PendingEvent) -> bool:
+        """Schedule ``event`` for redelivery; return ``False`` if dead-lettered."""
+        if event.attempts >= self.max_attempts:
+            self._expire(event, "attempts")
+            return False
+        if time.perf_counter() - event.enqueued_at > self.max_age:
+            self._expire(event, "max_age")
+            return False
+        loop = asyncio.get_running_loop()
+        due = loop.time() + self.backoff(event.attempts)
+        heapq.heappush(self._heap, (due, next(self._seq), event))
+        event_retry_pending.set(len(self._heap))
+        self._arm(loop)
+        return True
+
+    def next_due(self) -> float | None:
+        """Return the loop time of the earliest scheduled retry."""
+        return self._heap[0][0] if self._heap else None
+
+    def drain(self) -> list[PendingEvent]:
+        """Cancel the timer and return every event still waiting."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        events = [event for _, _, event in sorted(self._heap)]
+        self._heap.clear()
+        event_retry_pending.set(0)
+        return events
+
+    def _expire(self, event: PendingEvent, reason: str) -> None:
+        event_dead_lettered_counter.labels(reason=reason).inc()
+        self._dead_letter(event)
+
+    def _arm(self, loop: asyncio.AbstractEventLoop) -> None:
+        if not self._heap:
+            return
+        due = self._heap[0][0]
+        if self._timer is not None:
+            if self._timer_loop is loop and self._timer.when() <= due:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_at(due, self._fire)
+        self._timer_loop = loop
+
+    def _fire(self) -> None:
+        self._timer = None
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        due: list[PendingEvent] = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, event = heapq.heappop(self._heap)
+            if time.perf_counter() - event.enqueued_at > self.max_age:
+                self._expire(event, "max_age")
+            else:
+                due.append(event)
+        event_retry_pending.set(len(self._heap))
+        if due:
+            self._redeliver(due)
+        self._arm(loop)
@@ -0,0 +1,63 @@
+"""Event serialization shared by the publisher and the outbox.
+
+Events are JSON by default. Routing keys listed in
+``EVENT_MSGPACK_ROUTING_KEYS`` are encoded as msgpack instead, which needs
+the optional ``msgpack`` package; the message ``content_type`` tells
+consumers which decoder to use.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from pydantic import BaseModel
+from pydantic_core import to_json, to_jsonable_python
+
+from utils.settings import settings
+
+try:  # pragma: no cover - optional dependency
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+def content_type_for(routing_key: str) -> str:
+    """Return the content type configured for ``routing_key``."""
+    if routing_key in settings.event_msgpack_routing_keys:
+        return MSGPACK_CONTENT_TYPE
+    return JSON_CONTENT_TYPE
+
+
+def serialize_event(
+    event: BaseModel | dict[str, Any],
+    content_type: str = JSON_CONTENT_TYPE,
+) -> bytes:
+    """Encode ``event`` to bytes in ``content_type`` in a single pass.
+
+    For JSON, models are encoded by their compiled pydantic-core serializer
+    without building an intermediate dict, and plain dicts go through
+    ``pydantic_core.to_json`` so ``UUID`` and ``datetime`` values are encoded
+    the same way as model fields. msgpack payloads carry the same fields and
+    value formats as the JSON ones.
+    """
+    if content_type == MSGPACK_CONTENT_TYPE:
+        if msgpack is None:
+            raise RuntimeError(
+                "msgpack must be installed to publish msgpack encoded events"
+            )
+        return msgpack.packb(to_jsonable_python(event))
+    if content_type != JSON_CONTENT_TYPE:
+        raise ValueError(f"Unsupported event content type: {content_type}")
+    if isinstance(event, BaseModel):
+        return event.__pydantic_serializer__.to_json(event)
+    return to_json(event)
+
+
+def event_user_id(event: BaseModel | dict[str, Any]) -> Any:
+    """Return the ``user_id`` of an event for logging, if it has one."""
+    if isinstance(event, BaseModel):
+        return getattr(event, "user_id", None)
+    return event.get("user_id")
@@ -0,0 +1,299 @@
+"""Append-only disk spool for events that could not be published.
+
+Events are appended to numbered segment files as length-prefixed records
+with a CRC32 checksum. Writes are fsynced in batches via ``flush``. Replay
+reads the oldest segments first, so events are delivered in the order they
+were spooled (at least once).
+
+Gunicorn workers share ``EVENT_SPOOL_DIR``, so each ``EventSpool`` writes to
+its own subdirectory and holds an exclusive ``flock`` on it while open; no
+other process appends to, replays or counts its segments. Subdirectories
+whose lock is free belong to workers that exited: their segments are moved
+into the current worker's subdirectory when a spool opens and before each
+replay, so events left by a crashed or recycled worker are still delivered
+exactly by one process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import logging
+import os
+import socket
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Awaitable, Callable, Iterator
+
+from utils.metrics import (
+    event_spool_bytes,
+    event_spool_dropped_counter,
+    event_spool_events,
+)
+
+from .publisher import PendingEvent
+
+logger = logging.getLogger(__name__)
+
+# crc32, routing key length, content type length, body length
+_HEADER = struct.Struct(">IHHI")
+_SUFFIX = ".spool"
+_LOCK_NAME = ".lock"
+
+
+def _encode(event: PendingEvent) -> bytes:
+    routing_key = event.routing_key.encode()
+    content_type = event.content_type.encode()
+    payload = routing_key + content_type + event.body
+    crc = zlib.crc32(payload)
+    return (
+        _HEADER.pack(crc, len(routing_key), len(content_type), len(event.body))
+        + payload
+    )
+
+
+def _try_lock(path: Path):
+    """Return an open file holding an exclusive lock on ``path``, or ``None``."""
+    fh = open(path, "a+b")
+    try:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        fh.close()
+        return None
+    return fh
+
+
+def _read_records(path: Path) -> Iterator[PendingEvent]:
+    with open(path, "rb") as fh:
+        data = fh.read()
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        crc, rk_len, ct_len, body_len = _HEADER.unpack_from(data, offset)
+        start = offset + _HEADER.size
+        end = start + rk_len + ct_len + body_len
+        payload = data[start:end]
+        if len(payload) < rk_len + ct_len + body_len or zlib.crc32(payload) != crc:
+            logger.error("Truncated or corrupt record in spool segment %s", path)
+            return
+        yield PendingEvent(
+            payload[:rk_len].decode(),
+            payload[rk_len + ct_len:],
+            content_type=payload[rk_len:rk_len + ct_len].decode(),
+        )
+        offset = end
+
+
+class EventSpool:
+    """Segmented, size-capped spool directory for undeliverable events.
+
+    ``directory`` is the shared spool root; this instance owns one locked
+    subdirectory of it until ``close``.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        max_bytes: int = 256 * 1024 * 1024,
+        segment_bytes: int = 4 * 1024 * 1024,
+    ) -> None:
+        self.root = Path(directory)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.directory, self._lock = self._claim_directory()
+        # Orphans are adopted off the event loop while appends may rotate
+        self._naming = threading.Lock()
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self._active = None
+        self._active_path: Path | None = None
+        self._unsynced = False
+        self._bytes = 0
+        self._events = 0
+        for path in self._segments():
+            self._bytes += path.stat().st_size
+            self._events += sum(1 for _ in _read_records(path))
+        self._add_adopted(self._adopt_orphans())
+
+    @property
+    def pending(self) -> int:
+        return self._events
+
+    def _segments(self) -> list[Path]:
+        return sorted(self.directory.glob(f"*{_SUFFIX}"))
+
+    def _claim_directory(self):
+        base = f"{socket.gethostname()}-{os.getpid()}"
+        suffix = 0
+        while True:
+            name = base if suffix == 0 else f"{base}-{suffix}"
+            path = self.root / name
+            path.mkdir(exist_ok=True)
+            try:
+                lock = _try_lock(path / _LOCK_NAME)
+            except FileNotFoundError:
+                # Removed by a worker adopting it as an orphan; create it again
+                continue
+            if lock is not None:
+                return path, lock
+            suffix += 1
+
+    def _adopt(self, segments: list[Path], totals: list[int]) -> None:
+        for source in segments:
+            with self._naming:
+                target = self._next_segment_path()
+                os.replace(source, target)
+            totals[0] += target.stat().st_size
+            totals[1] += sum(1 for _ in _read_records(target))
+
+    def _adopt_orphans(self) -> list[int]:
+        """Move segments of exited workers here; return their bytes and events."""
+        totals = [0, 0]
+        # Segments from before per-worker directories sit in the root
+        legacy = sorted(self.root.glob(f"*{_SUFFIX}"))
+        if legacy:
+            lock = _try_lock(self.root / _LOCK_NAME)
+            if lock is not None:
+                with lock:
+                    self._adopt(sorted(self.root.glob(f"*{_SUFFIX}")), totals)
+        for path in sorted(self.root.iterdir()):
+            if not path.is_dir() or path == self.directory:
+                continue
+            lock = _try_lock(path / _LOCK_NAME)
+            if lock is None:
+                continue
+            with lock:
+                self._adopt(sorted(path.glob(f"*{_SUFFIX}")), totals)
+                (path / _LOCK_NAME).unlink(missing_ok=True)
+                try:
+                    path.rmdir()
+                except OSError:
+                    pass
+        return totals
+
+    def _add_adopted(self, totals: list[int]) -> None:
+        self._bytes += totals[0]
+        self._events += totals[1]
+        self._update_metrics()
+
+    def _update_metrics(self) -> None:
+        event_spool_bytes.set(self._bytes)
+        event_spool_events.set(self._events)
+
+    def _next_segment_path(self) -> Path:
+        segments = self._segments()
+        number = int(segments[-1].stem) + 1 if segments else 1
+        return self.directory / f"{number:020d}{_SUFFIX}"
+
+    def append(self, event: PendingEvent) -> bool:
+        """Append an event; return ``False`` if the size cap was reached."""
+        record = _encode(event)
+        if self._bytes + len(record) > self.max_bytes:
+            event_spool_dropped_counter.inc()
+            logger.error(
+                "event_spool_full",
+                extra={"endpoint": "rabbitmq", "user_id": event.user_id},
+            )
+            return False
+        if self._active is None or self._active.tell() >= self.segment_bytes:
+            self._rotate()
+        self._active.write(record)
+        self._unsynced = True
+        self._bytes += len(record)
+        self._events += 1
+        self._update_metrics()
+        return True
+
+    def flush(self) -> None:
+        """Flush and fsync records appended since the last flush."""
+        if self._active is None or not self._unsynced:
+            return
+        self._active.flush()
+        os.fsync(self._active.fileno())
+        self._unsynced = False
+
+    def _rotate(self) -> None:
+        self._close_active()
+        with self._naming:
+            self._active_path = self._next_segment_path()
+            self._active = open(self._active_path, "ab")
+
+    def _close_active(self) -> None:
+        if self._active is not None:
+            self.flush()
+            self._active.close()
+            self._active = None
+            self._active_path = None
+
+    @staticmethod
+    def _seal(fh) -> None:
+        fh.flush()
+        os.fsync(fh.fileno())
+        fh.close()
+
+    def close(self) -> None:
+        """Close the active segment and release this spool's directory."""
+        self._close_active()
+        if self._lock is None:
+            return
+        if not self._segments():
+            (self.directory / _LOCK_NAME).unlink(missing_ok=True)
+            try:
+                self.directory.rmdir()
+            except OSError:
+                pass
+        self._lock.close()
+        self._lock = None
+
+    async def replay(
+        self,
+        publish: Callable[[list[PendingEvent]], Awaitable[list[bool]]],
+        batch_size: int = 100,
+    ) -> int:
+        """Publish spooled events oldest first and return how many were sent.
+
+        Replay stops at the first batch with a failure; that segment is
+        rewritten with the events that were not confirmed.
+        """
+        # Seal the active segment; appends during replay open a new one
+        active = self._active
+        self._active = None
+        self._active_path = None
+        self._unsynced = False
+        if active is not None:
+            await asyncio.to_thread(self._seal, active)
+        self._add_adopted(await asyncio.to_thread(self._adopt_orphans))
+        segments = [p for p in self._segments() if p != self._active_path]
+
+        sent = 0
+        for path in segments:
+            size = path.stat().st_size
+            records = await asyncio.to_thread(lambda: list(_read_records(path)))
+            for start in range(0, len(records), batch_size):
+                batch = records[start:start + batch_size]
+                outcome = await publish(batch)
+                sent += outcome.count(True)
+                if not all(outcome):
+                    remaining = [
+                        event for event, ok in zip(batch, outcome) if not ok
+                    ] + records[start + batch_size:]
+                    await asyncio.to_thread(self._rewrite, path, size, remaining)
+                    self._events -= len(records) - len(remaining)
+                    self._update_metrics()
+                    return sent
+            await asyncio.to_thread(path.unlink)
+            self._bytes -= size
+            self._events -= len(records)
+            self._update_metrics()
+        return sent
+
+    def _rewrite(self, path: Path, old_size: int, events: list[PendingEvent]) -> None:
+        data = b"".join(_encode(event) for event in events)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+        self._bytes += len(data) - old_size
@@ -0,0 +1,62 @@
+"""Gunicorn settings for BeeConect Auth Service.
+
+Every worker keeps its own Prometheus values, so metrics run in
+``prometheus_client`` multiprocess mode: workers write their samples to
+``PROMETHEUS_MULTIPROC_DIR`` and scrapes merge the files of all workers.
+The directory is emptied when the master starts, the files of a worker
+are released when it exits, and the master serves the merged metrics on
+``METRICS_PORT`` so a scrape does not depend on which worker answers.
+
+Only ``prometheus_client`` is imported here: the master must not load the
+application, or it would write metric files of its own.
+"""
+
+import os
+import shutil
+
+# Must be set before prometheus_client is imported by the master or workers
+multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", "/tmp/bee_auth_prometheus"
+)
+
+from prometheus_client import CollectorRegistry, multiprocess, start_http_server  # noqa: E402
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WORKERS", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+metrics_port = int(os.environ.get("METRICS_PORT", "9100"))
+metrics_enabled = os.environ.get("ENABLE_METRICS", "false").lower() in {
+    "1",
+    "true",
+    "yes",
+}
+
+
+def prepare_multiproc_dir(path: str) -> None:
+    """Create ``path`` and drop sample files left by a previous run."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path, exist_ok=True)
+
+
+def aggregated_registry(path: str | None = None) -> CollectorRegistry:
+    """Return a registry merging the samples of every worker."""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=path)
+    return registry
+
+
+def on_starting(server) -> None:
+    prepare_multiproc_dir(multiproc_dir)
+
+
+def when_ready(server) -> None:
+    if metrics_enabled and metrics_port:
+        start_http_server(metrics_port, registry=aggregated_registry())
+
+
+def child_exit(server, worker) -> None:
+    # Drops the live gauge files of the worker; counters and histograms
+    # stay so totals do not go backwards when a worker is replaced
+    multiprocess.mark_process_dead(worker.pid, multiproc_dir)
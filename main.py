@@ -1,14 +1,23 @@
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_limiter import FastAPILimiter
 import redis.asyncio as redis
 from contextlib import asynccontextmanager
 from prometheus_fastapi_instrumentator import Instrumentator
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse
 import sentry_sdk
 
+from events.outbox import relay as outbox_relay
+from events.rabbitmq import close_connection, publisher as event_publisher
 from routers import auth as auth_router
+from models.user import UserRole
+from services import jwt as jwt_service
+from services import social as social_service
 from utils import configure_logging, alert_if_needed, SecurityHeadersMiddleware
+from utils import profiler
+from utils.alerts import aggregator as alert_aggregator
+from utils.query_stats import QueryStatsMiddleware
+from utils.request_timing import SlowRequestMiddleware
 from utils.rate_limit import user_rate_limit_key
 from utils.settings import settings
 
@@ -23,13 +32,30 @@ if sentry_dsn:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize rate limiter with Redis connection."""
+    """Initialize rate limiter, event publisher and outbox relay."""
     redis_client = redis.from_url(
         settings.redis_url, encoding="utf-8", decode_responses=True
     )
     # Use custom key builder that includes user identifier for rate limiting
     await FastAPILimiter.init(redis_client, identifier=user_rate_limit_key)
-    yield
+    # Error windows and alert dedup are shared by all workers through Redis
+    alert_aggregator.redis = redis_client
+    await event_publisher.start()
+    try:
+        if settings.outbox_relay_enabled:
+            await outbox_relay.start()
+        yield
+    finally:
+        try:
+            await outbox_relay.stop()
+        finally:
+            try:
+                await event_publisher.stop()
+            finally:
+                await close_connection()
+                social_service.close_transports()
+                await social_service.aclose_transports()
+                await alert_aggregator.close()
 
 
 app = FastAPI(title="BeeConect Auth Service", lifespan=lifespan)
@@ -39,6 +65,19 @@ enable_metrics = settings.enable_metrics
 if enable_metrics:
     Instrumentator().instrument(app).expose(app)
 
+# Log slow requests with DB/Redis/bcrypt/JWT attribution. Added before
+# QueryStatsMiddleware so it runs inside it and shares its SQL statistics.
+if settings.slow_request_threshold_ms > 0:
+    app.add_middleware(
+        SlowRequestMiddleware, threshold_ms=settings.slow_request_threshold_ms
+    )
+
+# Count SQL statements and database time per request
+if enable_metrics or settings.enable_server_timing:
+    app.add_middleware(
+        QueryStatsMiddleware, server_timing=settings.enable_server_timing
+    )
+
 # Enable CORS if origins are provided via environment variable
 if settings.allowed_origins:
     app.add_middleware(
@@ -54,6 +93,40 @@ if is_production:
 
 
 
+def require_superadmin(token: str = Depends(auth_router.oauth2_scheme)) -> dict:
+    """Allow only superadmin JWTs through."""
+    try:
+        payload = jwt_service.decode_token(token)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("role") != UserRole.SUPERADMIN.value:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return payload
+
+
+# On-demand CPU profile of the worker serving the request; off by default
+if settings.enable_profiler:
+    app.add_middleware(profiler.ProfilerRouteMiddleware)
+
+    @app.get("/debug/profile", include_in_schema=False)
+    async def debug_profile(
+        seconds: float = Query(10.0, gt=0, le=settings.profiler_max_seconds),
+        interval: float = Query(0.005, ge=0.001, le=1.0),
+        output: str = Query(
+            "collapsed", alias="format", pattern="^(collapsed|speedscope)$"
+        ),
+        route: str | None = Query(None, description="Sample only while it runs"),
+        _admin: dict = Depends(require_superadmin),
+    ):
+        try:
+            sampler = await profiler.profile(seconds, interval=interval, route=route)
+        except profiler.ProfileInProgress as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+        if output == "speedscope":
+            return JSONResponse(sampler.speedscope())
+        return PlainTextResponse(sampler.collapsed())
+
+
 @app.exception_handler(Exception)
 async def handle_exceptions(request: Request, exc: Exception):
     await alert_if_needed(exc)
@@ -3,6 +3,7 @@ from .login_attempts import LoginAttempt
 from .email_verification import EmailVerification
 from .twofa_tokens import TwoFAToken
 from .password_reset_token import PasswordResetToken
+from .event_outbox import EventOutbox
 
 __all__ = [
     "User",
@@ -11,4 +12,5 @@ __all__ = [
     "EmailVerification",
     "TwoFAToken",
     "PasswordResetToken",
+    "EventOutbox",
 ]
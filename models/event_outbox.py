@@ -0,0 +1,22 @@
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Index, LargeBinary, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from database import Base
+
+
+class EventOutbox(Base):
+    __tablename__ = "event_outbox"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    routing_key = Column(String(255), nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+    content_type = Column(String(100), nullable=False, default="application/json")
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_event_outbox_sent_at_created_at", "sent_at", "created_at"),
+    )
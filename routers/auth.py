@@ -7,8 +7,15 @@ import logging
 import pyotp
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
-from fastapi_limiter.depends import RateLimiter
-from utils.rate_limit import user_rate_limit_key
+from starlette.concurrency import run_in_threadpool
+from utils.rate_limit import (
+    MultiRuleRateLimiter,
+    RateLimitRule,
+    TieredRateLimiter,
+    client_ip_key,
+    email_key,
+    user_rate_limit_key,
+)
 from sqlalchemy.orm import Session
 
 from database import SessionLocal
@@ -39,9 +46,11 @@ from utils import (
     password_reset_requested_counter,
 )
 from utils.errors import ErrorCode
-from events.rabbitmq import emit_event
+from utils.stage_timing import StageTimer
+from events import outbox
 from schemas.event import (
     EmailVerificationSentEvent,
+    PasswordResetRequestedEvent,
     TwoFARequestedEvent,
     UserLoggedInEvent,
     UserRegisteredEvent,
@@ -52,6 +61,19 @@ logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/v1/auth/login")
 
+# Credential endpoints are limited per IP, per email and per IP+email at once
+login_rate_limiter = MultiRuleRateLimiter(
+    "login",
+    RateLimitRule("ip", times=20, seconds=60, key=client_ip_key),
+    RateLimitRule("email", times=10, seconds=60, key=email_key),
+    RateLimitRule("ip_email", times=5, seconds=60, key=user_rate_limit_key),
+)
+password_reset_rate_limiter = MultiRuleRateLimiter(
+    "request-reset",
+    RateLimitRule("ip", times=10, seconds=300, key=client_ip_key),
+    RateLimitRule("email", times=3, seconds=300, key=email_key),
+)
+
 
 def get_db():
     db = SessionLocal()
@@ -67,14 +89,17 @@ def get_db():
     summary="Register new user",
     description="Create a new user account and send email verification.",
     # Limit registration attempts per user identifier/IP
-    dependencies=[Depends(RateLimiter(times=5, seconds=60, identifier=user_rate_limit_key))],
+    dependencies=[Depends(TieredRateLimiter(times=5, seconds=60, identifier=user_rate_limit_key))],
 )
 def register(
     user_in: UserCreate,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
 ):
-    if db.query(User).filter_by(email=user_in.email).first():
+    timer = StageTimer("register")
+    existing = db.query(User).filter_by(email=user_in.email).first()
+    timer.mark("user_lookup")
+    if existing:
         register_failed_counter.inc()
         logger.warning(
             "register_failed",
@@ -88,6 +113,7 @@ def register(
             },
         )
     hashed = hash_password(user_in.password)
+    timer.mark("password_hash")
     user = User(
         email=user_in.email,
         hashed_password=hashed,
@@ -96,23 +122,26 @@ def register(
         role=user_in.role,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
-
-    # Increment registrations counter by provider
-    user_registration_counter.labels(provider="local").inc()
-
-    auth_service.create_email_verification(db, user)
-    background_tasks.add_task(
-        emit_event,
+    db.flush()
+    timer.mark("user_insert")
+    outbox.add_event(
+        db,
         "user.registered",
-        UserRegisteredEvent(user_id=user.id, email=user.email).model_dump(),
+        UserRegisteredEvent(user_id=user.id, email=user.email),
     )
-    background_tasks.add_task(
-        emit_event,
+    outbox.add_event(
+        db,
         "user.email_verification_sent",
-        EmailVerificationSentEvent(user_id=user.id, email=user.email).model_dump(),
+        EmailVerificationSentEvent(user_id=user.id, email=user.email),
     )
+    # Commits the user, the verification token and both events together
+    auth_service.create_email_verification(db, user)
+    timer.mark("commit")
+
+    # Increment registrations counter by provider
+    user_registration_counter.labels(provider="local").inc()
+
+    background_tasks.add_task(outbox.relay.wake)
     return UserRead(
         id=user.id,
         email=user.email,
@@ -126,8 +155,8 @@ def register(
     "/login",
     summary="User login",
     description="Authenticate user credentials and issue JWT.",
-    # Apply per-user/IP rate limiting on login attempts
-    dependencies=[Depends(RateLimiter(times=5, seconds=60, identifier=user_rate_limit_key))],
+    # Apply per-IP, per-email and per-user/IP rate limiting on login attempts
+    dependencies=[Depends(login_rate_limiter)],
 )
 def login(
     request: Request,
@@ -136,10 +165,13 @@ def login(
     db: Session = Depends(get_db),
 ):
     start_time = time.perf_counter()
+    timer = StageTimer("login")
     try:
         user = db.query(User).filter_by(email=credentials.email).first()
+        timer.mark("user_lookup")
 
         failed_attempts = auth_service.failed_attempts_count(db, credentials.email)
+        timer.mark("failure_count")
         if failed_attempts >= settings.login_attempt_threshold:
             auth_service.record_login_attempt(
                 db,
@@ -148,6 +180,7 @@ def login(
                 False,
                 credentials.email,
             )
+            timer.mark("record_attempt")
             raise HTTPException(
                 status_code=429,
                 detail={
@@ -156,9 +189,11 @@ def login(
                 },
             )
 
-        if not user or not verify_password(
+        password_ok = user is not None and verify_password(
             credentials.password, user.hashed_password
-        ):
+        )
+        timer.mark("password_verify")
+        if not password_ok:
             auth_service.record_login_attempt(
                 db,
                 user.id if user else None,
@@ -166,7 +201,9 @@ def login(
                 False,
                 credentials.email,
             )
+            timer.mark("record_attempt")
             failed_attempts = auth_service.failed_attempts_count(db, credentials.email)
+            timer.mark("failure_count")
             if failed_attempts >= settings.login_attempt_threshold:
                 raise HTTPException(
                     status_code=429,
@@ -183,6 +220,18 @@ def login(
                 },
             )
 
+        requires_twofa = bool(user.totp_secret or user.phone_number)
+        if user.is_email_verified and not requires_twofa:
+            # Committed together with the successful login attempt below
+            outbox.add_event(
+                db,
+                "user.logged_in",
+                UserLoggedInEvent(
+                    user_id=user.id,
+                    email=user.email,
+                    provider=user.provider or "local",
+                ),
+            )
         auth_service.record_login_attempt(
             db,
             user.id,
@@ -190,6 +239,7 @@ def login(
             True,
             credentials.email,
         )
+        timer.mark("record_attempt")
 
         if not user.is_email_verified:
             raise HTTPException(
@@ -197,17 +247,19 @@ def login(
                 detail={"code": ErrorCode.EMAIL_NOT_VERIFIED, "message": "Email not verified"},
             )
 
-        if user.totp_secret or user.phone_number:
-            token = auth_service.create_twofa_token(db, user)
-            background_tasks.add_task(
-                emit_event,
+        if requires_twofa:
+            outbox.add_event(
+                db,
                 "user.2fa_requested",
                 TwoFARequestedEvent(
                     user_id=user.id,
                     email=user.email,
                     provider=user.provider or "local",
-                ).model_dump(),
+                ),
             )
+            token = auth_service.create_twofa_token(db, user)
+            timer.mark("twofa_token")
+            background_tasks.add_task(outbox.relay.wake)
             return {"message": "2fa_required", "twofa_token": token.token}
 
         jwt_token = jwt_service.create_token(
@@ -216,15 +268,8 @@ def login(
             role=user.role.value,
             provider=user.provider or "local",
         )
-        background_tasks.add_task(
-            emit_event,
-            "user.logged_in",
-            UserLoggedInEvent(
-                user_id=user.id,
-                email=user.email,
-                provider=user.provider or "local",
-            ).model_dump(),
-        )
+        timer.mark("jwt_sign")
+        background_tasks.add_task(outbox.relay.wake)
         login_success_counter.inc()
         logger.info(
             "login_successful",
@@ -260,14 +305,21 @@ def social_login(provider: str):
     summary="OAuth callback",
     description="Handle provider callback, create or update user and issue JWT.",
 )
-def social_callback(
+async def social_callback(
     payload: SocialLogin,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
 ):
-    """Exchange provider code for user info and return JWT."""
+    """Exchange provider code for user info and return JWT.
+
+    The provider round trips are awaited on the event loop; only the
+    database and token store work is handed to the threadpool.
+    """
+    timer = StageTimer("social_callback")
     try:
-        info = social_service.fetch_user_info(payload.provider, payload.token)
+        info = await social_service.fetch_user_info_async(
+            payload.provider, payload.token
+        )
     except Exception as exc:  # pragma: no cover - network errors
         raise HTTPException(
             status_code=400,
@@ -277,14 +329,27 @@ def social_callback(
             },
         ) from exc
 
-    email = info.get("email")
-    if not email:
+    timer.mark("provider_fetch")
+    if not info.get("email"):
         raise HTTPException(
             status_code=400,
             detail={"code": ErrorCode.EMAIL_NOT_AVAILABLE, "message": "Email not available"},
         )
 
+    jwt_token = await run_in_threadpool(
+        _complete_social_login, db, payload.provider, info, timer
+    )
+    background_tasks.add_task(outbox.relay.wake)
+    return {"access_token": jwt_token, "token_type": "bearer"}
+
+
+def _complete_social_login(
+    db: Session, provider: str, info: dict, timer: StageTimer
+) -> str:
+    """Create or update the social user, record the login and issue a JWT."""
+    email = info["email"]
     user = db.query(User).filter_by(email=email).first()
+    timer.mark("user_lookup")
     if not user:
         user = User(
             email=email,
@@ -293,18 +358,30 @@ def social_callback(
             avatar_url=info.get("avatar_url"),
             social_id=info.get("social_id"),
             is_social=True,
-            provider=payload.provider,
+            provider=provider,
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
-        user_registration_counter.labels(provider=payload.provider).inc()
+        db.flush()
+        created = True
     else:
         user.full_name = user.full_name or info.get("full_name")
         user.avatar_url = info.get("avatar_url")
         user.social_id = info.get("social_id")
-        user.provider = payload.provider
-        db.commit()
+        user.provider = provider
+        created = False
+    outbox.add_event(
+        db,
+        "user.logged_in",
+        UserLoggedInEvent(
+            user_id=user.id,
+            email=user.email,
+            provider=user.provider,
+        ),
+    )
+    db.commit()
+    timer.mark("user_upsert")
+    if created:
+        user_registration_counter.labels(provider=provider).inc()
 
     jwt_token = jwt_service.create_token(
         user_id=str(user.id),
@@ -312,16 +389,8 @@ def social_callback(
         role=user.role.value,
         provider=user.provider,
     )
-    background_tasks.add_task(
-        emit_event,
-        "user.logged_in",
-        UserLoggedInEvent(
-            user_id=user.id,
-            email=user.email,
-            provider=user.provider,
-        ).model_dump(),
-    )
-    return {"access_token": jwt_token, "token_type": "bearer"}
+    timer.mark("jwt_sign")
+    return jwt_token
 
 
 @router.get(
@@ -352,13 +421,14 @@ def verify_email(token: str, db: Session = Depends(get_db)):
     "/verify-2fa",
     summary="Verify 2FA token",
     description="Validate two-factor authentication token and return JWT.",
-    dependencies=[Depends(RateLimiter(times=5, seconds=60, identifier=user_rate_limit_key))],
+    dependencies=[Depends(TieredRateLimiter(times=5, seconds=60, identifier=user_rate_limit_key))],
 )
 def verify_twofa(
     payload: TwoFAVerify,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
 ):
+    timer = StageTimer("verify_twofa")
     twofa_token = payload.twofa_token.strip()
     token = (
         db.query(TwoFAToken)
@@ -366,15 +436,19 @@ def verify_twofa(
         .filter(TwoFAToken.expires_at > datetime.now(timezone.utc))
         .first()
     )
+    timer.mark("token_lookup")
     if not token:
         raise HTTPException(
             status_code=400,
             detail={"code": ErrorCode.INVALID_TOKEN, "message": "Invalid token"},
         )
     user = db.get(User, token.user_id)
+    timer.mark("user_lookup")
     if user.totp_secret:
         totp_code = payload.totp_code.strip() if payload.totp_code else None
-        if not totp_code or not auth_service.verify_totp(user, totp_code):
+        totp_ok = bool(totp_code) and auth_service.verify_totp(user, totp_code)
+        timer.mark("totp_verify")
+        if not totp_ok:
             raise HTTPException(
                 status_code=400,
                 detail={"code": ErrorCode.INVALID_TOKEN, "message": "Invalid token"},
@@ -385,17 +459,20 @@ def verify_twofa(
         role=user.role.value,
         provider=user.provider or "local",
     )
+    timer.mark("jwt_sign")
     token.is_used = True
-    db.commit()
-    background_tasks.add_task(
-        emit_event,
+    outbox.add_event(
+        db,
         "user.logged_in",
         UserLoggedInEvent(
             user_id=user.id,
             email=user.email,
             provider=user.provider or "local",
-        ).model_dump(),
+        ),
     )
+    db.commit()
+    timer.mark("commit")
+    background_tasks.add_task(outbox.relay.wake)
     login_success_counter.inc()
     return {"access_token": jwt_token, "token_type": "bearer"}
 
@@ -404,7 +481,7 @@ def verify_twofa(
     "/request-reset",
     summary="Request password reset",
     description="Generate a password reset token and emit an event.",
-    dependencies=[Depends(RateLimiter(times=3, seconds=300, identifier=user_rate_limit_key))],
+    dependencies=[Depends(password_reset_rate_limiter)],
 )
 def request_password_reset(
     payload: PasswordResetRequest,
@@ -417,18 +494,17 @@ def request_password_reset(
             status_code=404,
             detail={"code": ErrorCode.USER_NOT_FOUND, "message": "User not found"},
         )
-    token = auth_service.create_password_reset_token(db, user)
-    background_tasks.add_task(
-        emit_event,
+    token_value = auth_service.generate_password_reset_token()
+    outbox.add_event(
+        db,
         "user.password_reset_requested",
-        {
-            "event_id": uuid.uuid4(),
-            "timestamp": datetime.now(timezone.utc),
-            "user_id": user.id,
-            "email": user.email,
-            "token": token.token,
-        },
+        PasswordResetRequestedEvent(
+            user_id=user.id, email=user.email, token=token_value
+        ),
     )
+    # Commits the token together with its event
+    auth_service.create_password_reset_token(db, user, token_value)
+    background_tasks.add_task(outbox.relay.wake)
     password_reset_requested_counter.inc()
     return {"message": "reset_requested"}
 
@@ -437,7 +513,7 @@ def request_password_reset(
     "/reset-password",
     summary="Reset password",
     description="Validate password reset token and set new password.",
-    dependencies=[Depends(RateLimiter(times=5, seconds=60, identifier=user_rate_limit_key))],
+    dependencies=[Depends(TieredRateLimiter(times=5, seconds=60, identifier=user_rate_limit_key))],
 )
 def reset_password(
     payload: PasswordReset,
@@ -462,7 +538,7 @@ def reset_password(
     summary="Validate JWT token",
     description="Check if a JWT is valid and return payload information.",
     # Higher rate limit for token validation endpoint
-    dependencies=[Depends(RateLimiter(times=100, seconds=60, identifier=user_rate_limit_key))],
+    dependencies=[Depends(TieredRateLimiter(times=100, seconds=60, identifier=user_rate_limit_key))],
 )
 def validate(token: str = Depends(oauth2_scheme)):
     """Validate a JWT and return standardized response."""
@@ -10,6 +10,7 @@ from pydantic import BaseModel, EmailStr, Field
 class BaseEvent(BaseModel):
     """Base fields shared by all events."""
 
+    schema_version: int = 1
     event_id: uuid.UUID = Field(default_factory=uuid.uuid4)
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     user_id: uuid.UUID
@@ -32,3 +33,8 @@ class TwoFARequestedEvent(BaseEvent):
 class EmailVerificationSentEvent(BaseEvent):
     """Emitted when a verification email is sent to the user."""
 
+
+class PasswordResetRequestedEvent(BaseEvent):
+    """Emitted when a user requests a password reset token."""
+
+    token: str
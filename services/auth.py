@@ -40,7 +40,6 @@ def create_email_verification(db: Session, user: User) -> EmailVerification:
     record = EmailVerification(user_id=user.id, token=token, expires_at=expires)
     db.add(record)
     db.commit()
-    db.refresh(record)
     return record
 
 
@@ -81,7 +80,6 @@ def create_twofa_token(db: Session, user: User) -> TwoFAToken:
     record = TwoFAToken(user_id=user.id, token=token, expires_at=expires)
     db.add(record)
     db.commit()
-    db.refresh(record)
     twofa_token_generated_counter.inc()
     return record
 
@@ -99,10 +97,15 @@ def verify_totp(user: User, code: str) -> bool:
     return totp.verify(code, valid_window=1)
 
 
+def generate_password_reset_token() -> str:
+    """Return a new random password reset token value."""
+    return secrets.token_urlsafe(32)
+
+
 def create_password_reset_token(
-    db: Session, user: User
+    db: Session, user: User, token: str | None = None
 ) -> PasswordResetToken:
-    token = secrets.token_urlsafe(32)
+    token = token or generate_password_reset_token()
     expires = datetime.now(timezone.utc) + timedelta(
         minutes=PASSWORD_RESET_EXPIRATION_MINUTES
     )
@@ -111,7 +114,6 @@ def create_password_reset_token(
     )
     db.add(record)
     db.commit()
-    db.refresh(record)
     return record
 
 
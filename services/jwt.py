@@ -18,6 +18,7 @@ from typing import Any, Dict
 from jose import JWTError, jwt
 
 from utils import token_store
+from utils.request_timing import timed
 from utils.settings import settings
 
 JWT_ALGORITHM = settings.jwt_algorithm
@@ -41,6 +42,16 @@ else:
     PUBLIC_KEY = SECRET_KEY
 
 
+@timed("jwt")
+def _sign(payload: Dict[str, Any]) -> str:
+    return jwt.encode(payload, PRIVATE_KEY, algorithm=JWT_ALGORITHM)
+
+
+@timed("jwt")
+def _verify(token: str) -> Dict[str, Any]:
+    return jwt.decode(token, PUBLIC_KEY, algorithms=[JWT_ALGORITHM])
+
+
 def create_token(
     *,
     user_id: str,
@@ -61,7 +72,7 @@ def create_token(
         "iat": int(now.timestamp()),
         "exp": int(expire.timestamp()),
     }
-    token = jwt.encode(payload, PRIVATE_KEY, algorithm=JWT_ALGORITHM)
+    token = _sign(payload)
     try:
         token_store.store(token, payload["exp"], payload)
     except Exception:  # pragma: no cover - caching failures shouldn't break
@@ -121,7 +132,7 @@ def decode_token(token: str) -> Dict[str, Any]:
             raise ValueError("Token revoked")
         return cached
     try:
-        payload = jwt.decode(token, PUBLIC_KEY, algorithms=[JWT_ALGORITHM])
+        payload = _verify(token)
     except JWTError as exc:  # pragma: no cover
         raise ValueError("Invalid token") from exc
     if token_store.is_revoked(token):
@@ -133,6 +144,20 @@ def decode_token(token: str) -> Dict[str, Any]:
     return payload
 
 
+def decode_token_claims(token: str) -> Dict[str, Any]:
+    """Verify a JWT's signature and expiry locally and return its claims.
+
+    Unlike ``decode_token`` this skips the Redis cache and the revocation
+    check, which suits hot paths such as rate limiting that only need to
+    attribute a request to its subject.
+    """
+
+    try:
+        return _verify(token)
+    except JWTError as exc:
+        raise ValueError("Invalid token") from exc
+
+
 def revoke_refresh_token(token: str) -> None:
     """Mark a refresh token as revoked in the store."""
 
@@ -0,0 +1,194 @@
+"""Local verification of OpenID Connect ``id_token`` values.
+
+The provider's discovery document and signing keys (JWKS) are cached for
+the lifetime announced in their ``Cache-Control: max-age`` header. Once
+that lifetime has passed the cached keys keep serving requests while a
+background thread refreshes them, so only the very first login (or a
+token signed with a key we have not seen yet) waits for the provider.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict
+
+import httpx
+from jose import jwt
+from jose.exceptions import JWTError
+
+logger = logging.getLogger(__name__)
+
+_MAX_AGE_RE = re.compile(r"(?:^|[,\s])max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+def cache_max_age(headers: httpx.Headers, default: float) -> float:
+    """Return the ``max-age`` of ``Cache-Control`` or ``default``."""
+    cache_control = headers.get("Cache-Control", "")
+    if "no-cache" in cache_control.lower() or "no-store" in cache_control.lower():
+        return 0.0
+    match = _MAX_AGE_RE.search(cache_control)
+    return float(match.group(1)) if match else default
+
+
+class JWKSCache:
+    """Cache the discovery document and signing keys of one OIDC provider.
+
+    ``transport`` returns the httpx transport to fetch through; it is called
+    per refresh so the provider's pooled transport can be swapped in tests.
+    Refreshes forced by an unknown ``kid`` are limited to one per
+    ``min_refresh_interval`` seconds so forged tokens cannot hammer the
+    provider.
+    """
+
+    def __init__(
+        self,
+        discovery_url: str,
+        *,
+        transport: Callable[[], httpx.BaseTransport],
+        timeout: Callable[[], httpx.Timeout] | None = None,
+        default_max_age: float = 3600.0,
+        min_refresh_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.discovery_url = discovery_url
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self._transport = transport
+        self._timeout = timeout
+        self._clock = clock
+        self._issuer: str | None = None
+        self._jwks_uri: str | None = None
+        self._discovery_expires = 0.0
+        self._keys: Dict[str, dict] = {}
+        self._keys_expire = 0.0
+        self._last_refresh = float("-inf")
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    @property
+    def issuer(self) -> str | None:
+        return self._issuer
+
+    def cached_key(self, kid: str | None) -> dict | None:
+        """Return the cached key ``kid`` without waiting on the network.
+
+        Expired keys are still returned; a background refresh is started
+        so the next lookups see the new key set.
+        """
+        key = self._keys.get(kid)
+        if key is not None and self._clock() >= self._keys_expire:
+            self._refresh_in_background()
+        return key
+
+    def get_key(self, kid: str | None) -> dict | None:
+        """Return key ``kid``, fetching the key set if it is not cached."""
+        key = self.cached_key(kid)
+        if key is not None:
+            return key
+        with self._lock:
+            key = self._keys.get(kid)
+            if key is not None:
+                return key
+            if self._keys and (
+                self._clock() - self._last_refresh < self.min_refresh_interval
+            ):
+                return None
+            self._refresh_locked()
+            return self._keys.get(kid)
+
+    def refresh(self) -> None:
+        """Fetch the discovery document (if stale) and the key set."""
+        with self._lock:
+            self._refresh_locked()
+
+    def _refresh_locked(self) -> None:
+        self._last_refresh = self._clock()
+        with httpx.Client(
+            transport=_Unclosable(self._transport()),
+            timeout=self._timeout() if self._timeout else httpx.Timeout(10.0),
+        ) as client:
+            now = self._clock()
+            if self._jwks_uri is None or now >= self._discovery_expires:
+                response = client.get(self.discovery_url)
+                response.raise_for_status()
+                document = response.json()
+                self._issuer = document["issuer"]
+                self._jwks_uri = document["jwks_uri"]
+                self._discovery_expires = now + cache_max_age(
+                    response.headers, self.default_max_age
+                )
+            response = client.get(self._jwks_uri)
+            response.raise_for_status()
+            keys = {key["kid"]: key for key in response.json()["keys"] if "kid" in key}
+            self._keys = keys
+            self._keys_expire = self._clock() + cache_max_age(
+                response.headers, self.default_max_age
+            )
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(
+            target=self._background_refresh, name="jwks-refresh", daemon=True
+        ).start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            logger.warning(
+                "Failed to refresh JWKS from %s", self.discovery_url, exc_info=True
+            )
+        finally:
+            self._refreshing = False
+
+
+class _Unclosable(httpx.BaseTransport):
+    """Let a short-lived client use a pooled transport without closing it."""
+
+    def __init__(self, transport: httpx.BaseTransport) -> None:
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._transport.handle_request(request)
+
+    def close(self) -> None:
+        pass
+
+
+def token_kid(id_token: str) -> str | None:
+    """Return the ``kid`` header of ``id_token`` without verifying it."""
+    return jwt.get_unverified_header(id_token).get("kid")
+
+
+def verify_id_token(
+    id_token: str,
+    keys: JWKSCache,
+    *,
+    audience: str,
+    access_token: str | None = None,
+    extra_issuers: tuple[str, ...] = (),
+) -> Dict[str, Any]:
+    """Verify ``id_token`` and return its claims.
+
+    Checks the signature against the provider keys plus ``iss`` (the
+    discovery issuer or one of ``extra_issuers``), ``aud``, ``exp`` and,
+    when the token carries one, ``at_hash``. Raises ``JWTError`` when the
+    token is not valid.
+    """
+    key = keys.get_key(token_kid(id_token))
+    if key is None or keys.issuer is None:
+        raise JWTError("Unknown id_token signing key")
+    return jwt.decode(
+        id_token,
+        key,
+        algorithms=["RS256"],
+        audience=audience,
+        issuer=(keys.issuer, *extra_issuers),
+        access_token=access_token,
+    )
@@ -1,43 +1,170 @@
+"""OAuth login against Google and Facebook.
+
+Each provider has one long-lived ``httpx`` transport, i.e. one connection
+pool with HTTP keep-alive, shared by every OAuth client created for it. A
+social callback therefore reuses open TLS connections for the token
+exchange and the userinfo request instead of dialing the provider again.
+Clients are created per call because authlib keeps the fetched token on
+the client; they are cheap once the transport exists.
+
+``fetch_user_info_async`` does the same over ``AsyncOAuth2Client`` and
+async transports, so the callback endpoint does not hold a threadpool slot
+while it waits for the provider.
+
+Google returns a signed ``id_token`` with the code exchange. It is verified
+locally against the cached provider keys (see ``services.oidc``), which
+saves the userinfo round trip; the userinfo endpoint is only used when the
+token response carries no ``id_token``.
+"""
+
+import threading
 from typing import Dict
-from authlib.integrations.httpx_client import OAuth2Client
 
+import httpx
+from authlib.integrations.httpx_client import AsyncOAuth2Client, OAuth2Client
+from starlette.concurrency import run_in_threadpool
+
+from services import oidc
 from utils.settings import settings
 
 GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
 GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
 GOOGLE_USERINFO_URL = "https://openidconnect.googleapis.com/v1/userinfo"
+GOOGLE_DISCOVERY_URL = "https://accounts.google.com/.well-known/openid-configuration"
+# Google documents both forms of its issuer
+GOOGLE_EXTRA_ISSUERS = ("accounts.google.com",)
 
 FACEBOOK_AUTH_URL = "https://www.facebook.com/v18.0/dialog/oauth"
 FACEBOOK_TOKEN_URL = "https://graph.facebook.com/v18.0/oauth/access_token"
 FACEBOOK_USERINFO_URL = "https://graph.facebook.com/me"
 
+PROVIDERS = ("google", "facebook")
 
-def _google_client() -> OAuth2Client:
-    return OAuth2Client(
-        settings.google_client_id,
-        settings.google_client_secret,
-        scope="openid email profile",
-        redirect_uri=settings.google_redirect_uri,
-    )
+_transports: Dict[str, httpx.BaseTransport] = {}
+_transports_lock = threading.Lock()
+_async_transports: Dict[str, httpx.AsyncBaseTransport] = {}
 
 
-def _facebook_client() -> OAuth2Client:
-    return OAuth2Client(
-        settings.facebook_client_id,
-        settings.facebook_client_secret,
-        scope="email public_profile",
-        redirect_uri=settings.facebook_redirect_uri,
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.oauth_timeout, connect=settings.oauth_connect_timeout)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.oauth_max_connections,
+        max_keepalive_connections=settings.oauth_max_connections,
+        keepalive_expiry=settings.oauth_keepalive_expiry,
     )
 
 
-def get_client(provider: str) -> OAuth2Client:
+def get_transport(provider: str) -> httpx.BaseTransport:
+    """Return the pooled transport shared by all clients of ``provider``."""
+    if provider not in PROVIDERS:
+        raise ValueError("Unsupported provider")
+    transport = _transports.get(provider)
+    if transport is None:
+        with _transports_lock:
+            transport = _transports.get(provider)
+            if transport is None:
+                transport = httpx.HTTPTransport(limits=_limits())
+                _transports[provider] = transport
+    return transport
+
+
+def set_transport(provider: str, transport: httpx.BaseTransport) -> None:
+    """Route ``provider`` requests through ``transport``, e.g. a local stub."""
+    if provider not in PROVIDERS:
+        raise ValueError("Unsupported provider")
+    with _transports_lock:
+        previous = _transports.pop(provider, None)
+        _transports[provider] = transport
+    if previous is not None:
+        previous.close()
+
+
+def close_transports() -> None:
+    """Close every pooled provider connection."""
+    with _transports_lock:
+        transports = list(_transports.values())
+        _transports.clear()
+    for transport in transports:
+        transport.close()
+
+
+def get_async_transport(provider: str) -> httpx.AsyncBaseTransport:
+    """Return the pooled async transport shared by ``provider`` clients."""
+    if provider not in PROVIDERS:
+        raise ValueError("Unsupported provider")
+    transport = _async_transports.get(provider)
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(limits=_limits())
+        _async_transports[provider] = transport
+    return transport
+
+
+def set_async_transport(provider: str, transport: httpx.AsyncBaseTransport) -> None:
+    """Route async ``provider`` requests through ``transport``."""
+    if provider not in PROVIDERS:
+        raise ValueError("Unsupported provider")
+    _async_transports[provider] = transport
+
+
+async def aclose_transports() -> None:
+    """Close every pooled async provider connection."""
+    transports = list(_async_transports.values())
+    _async_transports.clear()
+    for transport in transports:
+        await transport.aclose()
+
+
+google_keys = oidc.JWKSCache(
+    GOOGLE_DISCOVERY_URL,
+    transport=lambda: get_transport("google"),
+    timeout=_timeout,
+    default_max_age=settings.oidc_jwks_default_max_age,
+    min_refresh_interval=settings.oidc_jwks_min_refresh_interval,
+)
+
+
+def _client_kwargs(provider: str) -> dict:
     if provider == "google":
-        return _google_client()
+        return {
+            "client_id": settings.google_client_id,
+            "client_secret": settings.google_client_secret,
+            "scope": "openid email profile",
+            "redirect_uri": settings.google_redirect_uri,
+        }
     if provider == "facebook":
-        return _facebook_client()
+        return {
+            "client_id": settings.facebook_client_id,
+            "client_secret": settings.facebook_client_secret,
+            "scope": "email public_profile",
+            "redirect_uri": settings.facebook_redirect_uri,
+        }
     raise ValueError("Unsupported provider")
 
 
+def get_client(provider: str) -> OAuth2Client:
+    """Return an OAuth client for ``provider`` on its pooled transport.
+
+    Do not close the returned client: that would close the shared pool.
+    """
+    return OAuth2Client(
+        **_client_kwargs(provider),
+        transport=get_transport(provider),
+        timeout=_timeout(),
+    )
+
+
+def get_async_client(provider: str) -> AsyncOAuth2Client:
+    """Async counterpart of ``get_client``; do not close the client either."""
+    return AsyncOAuth2Client(
+        **_client_kwargs(provider),
+        transport=get_async_transport(provider),
+        timeout=_timeout(),
+    )
+
+
 def generate_login_url(provider: str) -> str:
     client = get_client(provider)
     if provider == "google":
@@ -48,33 +175,68 @@ def generate_login_url(provider: str) -> str:
     return url
 
 
-def fetch_user_info(provider: str, code: str) -> Dict[str, str]:
-    client = get_client(provider)
+def _token_url(provider: str) -> str:
+    if provider == "google":
+        return GOOGLE_TOKEN_URL
+    if provider == "facebook":
+        return FACEBOOK_TOKEN_URL
+    raise ValueError("Unsupported provider")
+
+
+def _userinfo_request(provider: str) -> tuple[str, dict | None]:
+    if provider == "google":
+        return GOOGLE_USERINFO_URL, None
+    return FACEBOOK_USERINFO_URL, {"fields": "id,name,email,picture.type(large)"}
+
+
+def _parse_user_info(provider: str, data: dict) -> Dict[str, str]:
     if provider == "google":
-        token = client.fetch_token(GOOGLE_TOKEN_URL, code=code)
-        resp = client.get(GOOGLE_USERINFO_URL, token=token)
-        resp.raise_for_status()
-        data = resp.json()
         return {
             "email": data.get("email"),
             "social_id": data.get("sub"),
             "avatar_url": data.get("picture"),
             "full_name": data.get("name"),
         }
-    if provider == "facebook":
-        token = client.fetch_token(FACEBOOK_TOKEN_URL, code=code)
-        resp = client.get(
-            FACEBOOK_USERINFO_URL,
-            params={"fields": "id,name,email,picture.type(large)"},
-            token=token,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        picture = data.get("picture", {}).get("data", {}).get("url")
-        return {
-            "email": data.get("email"),
-            "social_id": data.get("id"),
-            "avatar_url": picture,
-            "full_name": data.get("name"),
-        }
-    raise ValueError("Unsupported provider")
+    picture = data.get("picture", {}).get("data", {}).get("url")
+    return {
+        "email": data.get("email"),
+        "social_id": data.get("id"),
+        "avatar_url": picture,
+        "full_name": data.get("name"),
+    }
+
+
+def _user_info_from_id_token(token: dict) -> Dict[str, str]:
+    claims = oidc.verify_id_token(
+        token["id_token"],
+        google_keys,
+        audience=settings.google_client_id,
+        access_token=token.get("access_token"),
+        extra_issuers=GOOGLE_EXTRA_ISSUERS,
+    )
+    return _parse_user_info("google", claims)
+
+
+def fetch_user_info(provider: str, code: str) -> Dict[str, str]:
+    client = get_client(provider)
+    token = client.fetch_token(_token_url(provider), code=code)
+    if provider == "google" and token.get("id_token"):
+        return _user_info_from_id_token(token)
+    url, params = _userinfo_request(provider)
+    resp = client.get(url, params=params)
+    resp.raise_for_status()
+    return _parse_user_info(provider, resp.json())
+
+
+async def fetch_user_info_async(provider: str, code: str) -> Dict[str, str]:
+    client = get_async_client(provider)
+    token = await client.fetch_token(_token_url(provider), code=code)
+    if provider == "google" and token.get("id_token"):
+        if google_keys.cached_key(oidc.token_kid(token["id_token"])) is None:
+            # Cold cache or rotated key: fetch the key set off the event loop
+            return await run_in_threadpool(_user_info_from_id_token, token)
+        return _user_info_from_id_token(token)
+    url, params = _userinfo_request(provider)
+    resp = await client.get(url, params=params)
+    resp.raise_for_status()
+    return _parse_user_info(provider, resp.json())
@@ -1,5 +1,7 @@
+import json
 import os
 import sys
+from contextlib import contextmanager
 
 import pytest
 from sqlalchemy import create_engine
@@ -7,16 +9,28 @@ from sqlalchemy.orm import sessionmaker
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from database import Base
+from models import EventOutbox
+from utils.query_stats import track_queries
+from utils.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def disable_outbox_relay(monkeypatch):
+    """Keep app lifespans in tests from polling the production database."""
+    monkeypatch.setattr(settings, "outbox_relay_enabled", False)
 
 
 @pytest.fixture(scope="function")
 def session():
     """Create a new database session for a test."""
-    engine = create_engine("sqlite:///:memory:")
+    # Async endpoints run their database work in the threadpool
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}
+    )
     Base.metadata.create_all(engine)
     connection = engine.connect()
     transaction = connection.begin()
-    SessionLocal = sessionmaker(bind=connection)
+    SessionLocal = sessionmaker(bind=connection, expire_on_commit=False)
     db = SessionLocal()
     try:
         yield db
@@ -25,3 +39,35 @@ def session():
         transaction.rollback()
         connection.close()
         engine.dispose()
+
+
+@pytest.fixture
+def query_budget():
+    """Assert that a block executes at most ``max_statements`` SQL statements.
+
+    Usage::
+
+        with query_budget(4):
+            login(...)
+    """
+
+    @contextmanager
+    def budget(max_statements: int):
+        with track_queries() as stats:
+            yield stats
+        assert stats.count <= max_statements, (
+            f"executed {stats.count} SQL statements, budget is {max_statements}"
+        )
+
+    return budget
+
+
+@pytest.fixture
+def outbox_events(session):
+    """Return ``(routing_key, payload)`` for every event staged in the outbox."""
+
+    def events():
+        rows = session.query(EventOutbox).order_by(EventOutbox.created_at).all()
+        return [(row.routing_key, json.loads(row.payload)) for row in rows]
+
+    return events
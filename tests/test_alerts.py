@@ -1,46 +1,144 @@
 import asyncio
-import importlib
+import json
 
+import httpx
 import pytest
+from fakeredis.aioredis import FakeRedis
 
-from utils.settings import settings
-from utils.metrics import error_counter
+from utils import alerts
+from utils.alerts import AlertAggregator, exception_fingerprint
 
 
-def _load_alerts(monkeypatch, threshold: int):
-    monkeypatch.setattr(settings, "alertmanager_url", "http://alertmanager")
-    monkeypatch.setattr(settings, "error_alert_threshold", threshold)
-    import utils.alerts as alerts_mod
-    return importlib.reload(alerts_mod)
+class AlertmanagerStub:
+    def __init__(self, status: int = 200) -> None:
+        self.status = status
+        self.batches: list[list[dict]] = []
+        self.transport = httpx.MockTransport(self.handle)
 
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == alerts.ALERTS_PATH
+        self.batches.append(json.loads(request.content))
+        return httpx.Response(self.status)
 
-def test_alert_triggered_at_threshold(monkeypatch):
-    alerts = _load_alerts(monkeypatch, threshold=3)
-    calls = []
 
-    def fake_urlopen(*args, **kwargs):
-        calls.append(1)
+def raise_and_catch(message: str = "boom") -> Exception:
+    try:
+        raise RuntimeError(message)
+    except RuntimeError as exc:
+        return exc
 
-    monkeypatch.setattr(alerts.urlrequest, "urlopen", fake_urlopen)
-    error_counter._value.set(0)
 
-    for _ in range(alerts.ERROR_ALERT_THRESHOLD):
-        asyncio.run(alerts.alert_if_needed(Exception("boom")))
+def raise_value_error() -> Exception:
+    try:
+        raise ValueError("other")
+    except ValueError as exc:
+        return exc
 
-    assert len(calls) == 1
 
+def make_aggregator(stub: AlertmanagerStub, **kwargs) -> AlertAggregator:
+    kwargs.setdefault("threshold", 3)
+    return AlertAggregator(
+        "http://alertmanager", transport=stub.transport, flush_interval=0.01, **kwargs
+    )
 
-def test_no_alert_before_threshold(monkeypatch):
-    alerts = _load_alerts(monkeypatch, threshold=3)
-    calls = []
 
-    def fake_urlopen(*args, **kwargs):
-        calls.append(1)
+def test_fingerprint_ignores_message_but_not_type():
+    assert exception_fingerprint(raise_and_catch("a")) == exception_fingerprint(
+        raise_and_catch("b")
+    )
+    assert exception_fingerprint(raise_and_catch()) != exception_fingerprint(
+        raise_value_error()
+    )
 
-    monkeypatch.setattr(alerts.urlrequest, "urlopen", fake_urlopen)
-    error_counter._value.set(0)
 
-    for _ in range(alerts.ERROR_ALERT_THRESHOLD - 1):
-        asyncio.run(alerts.alert_if_needed(Exception("boom")))
+def test_no_alert_before_threshold():
+    stub = AlertmanagerStub()
+    aggregator = make_aggregator(stub)
 
-    assert len(calls) == 0
+    async def scenario():
+        for _ in range(2):
+            await aggregator.record(raise_and_catch())
+        await aggregator.close()
+
+    asyncio.run(scenario())
+
+    assert stub.batches == []
+
+
+def test_repeated_errors_alert_once_in_one_batch():
+    stub = AlertmanagerStub()
+    aggregator = make_aggregator(stub)
+
+    async def scenario():
+        for _ in range(10):
+            await aggregator.record(raise_and_catch())
+        await aggregator.record(raise_value_error())
+        await asyncio.sleep(0.05)
+        await aggregator.close()
+
+    asyncio.run(scenario())
+
+    assert len(stub.batches) == 1
+    assert sorted(a["labels"]["exception"] for a in stub.batches[0]) == [
+        "RuntimeError",
+        "ValueError",
+    ]
+
+
+def test_window_and_dedup_are_shared_between_workers():
+    stub = AlertmanagerStub()
+    redis = FakeRedis(decode_responses=True)
+    workers = [make_aggregator(stub, redis=redis) for _ in range(3)]
+
+    async def scenario():
+        # One error per worker reaches the shared threshold of 3
+        for worker in workers:
+            await worker.record(raise_and_catch())
+        for worker in workers:
+            await worker.record(raise_and_catch())
+        for worker in workers:
+            await worker.close()
+
+    asyncio.run(scenario())
+
+    alerted = [alert for batch in stub.batches for alert in batch]
+    assert len(alerted) == 1
+    assert alerted[0]["annotations"]["description"].startswith("3 errors")
+
+
+def test_new_window_starts_counting_again():
+    stub = AlertmanagerStub()
+    now = [0.0]
+    aggregator = make_aggregator(stub, window=60, dedup_ttl=0, clock=lambda: now[0])
+
+    async def scenario():
+        for _ in range(2):
+            await aggregator.record(raise_and_catch())
+        now[0] = 61.0
+        results = [await aggregator.record(raise_and_catch()) for _ in range(3)]
+        await aggregator.close()
+        return results
+
+    assert asyncio.run(scenario()) == [False, False, True]
+
+
+def test_failed_post_does_not_raise():
+    stub = AlertmanagerStub(status=500)
+    aggregator = make_aggregator(stub, threshold=1)
+
+    async def scenario():
+        await aggregator.record(raise_and_catch())
+        await aggregator.close()
+
+    asyncio.run(scenario())
+
+    assert len(stub.batches) == 1
+    assert aggregator.pending == 0
+
+
+@pytest.mark.parametrize("url", [None, ""])
+def test_disabled_without_alertmanager_url(url):
+    aggregator = AlertAggregator(url, threshold=1)
+
+    assert asyncio.run(aggregator.record(raise_and_catch())) is False
+    assert aggregator.pending == 0
@@ -1,5 +1,5 @@
 import asyncio
-from unittest.mock import ANY, patch
+from unittest.mock import ANY
 
 import pytest
 import time
@@ -33,16 +33,13 @@ def create_verified_user(session) -> User:
     return user
 
 
-def test_login_success_records_attempt_and_returns_jwt(session):
+def test_login_success_records_attempt_and_returns_jwt(session, outbox_events):
     user = create_verified_user(session)
     req = DummyRequest()
     creds = UserLogin(email=user.email, password="Secret123!")
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event", emit_mock
-    ):
-        result = login(req, creds, bg, db=session)
-        asyncio.run(bg())
+    result = login(req, creds, bg, db=session)
+    asyncio.run(bg())
     assert "access_token" in result
 
     payload = jwt_service.decode_token(result["access_token"])
@@ -55,29 +52,29 @@ def test_login_success_records_attempt_and_returns_jwt(session):
     assert attempt is not None
     assert attempt.success is True
     assert attempt.email_attempted == user.email
-    emit_mock.assert_called_once_with(
-        "user.logged_in",
-        {
-            "event_id": ANY,
-            "timestamp": ANY,
-            "user_id": user.id,
-            "email": user.email,
-            "provider": "local",
-        },
-    )
-
-
-def test_login_invalid_password_records_attempt(session):
+    assert outbox_events() == [
+        (
+            "user.logged_in",
+            {
+                "schema_version": 1,
+                "event_id": ANY,
+                "timestamp": ANY,
+                "user_id": str(user.id),
+                "email": user.email,
+                "provider": "local",
+            },
+        ),
+    ]
+
+
+def test_login_invalid_password_records_attempt(session, outbox_events):
     user = create_verified_user(session)
     req = DummyRequest()
     creds = UserLogin(email=user.email, password="Wrong123!")
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event", emit_mock
-    ):
-        with pytest.raises(HTTPException) as exc:
-            login(req, creds, bg, db=session)
-        asyncio.run(bg())
+    with pytest.raises(HTTPException) as exc:
+        login(req, creds, bg, db=session)
+    asyncio.run(bg())
     assert exc.value.status_code == 400
     assert exc.value.detail == {
         "code": ErrorCode.INVALID_CREDENTIALS,
@@ -86,19 +83,16 @@ def test_login_invalid_password_records_attempt(session):
     attempt = session.query(LoginAttempt).filter_by(user_id=user.id).first()
     assert attempt.success is False
     assert attempt.email_attempted == user.email
-    emit_mock.assert_not_called()
+    assert outbox_events() == []
 
 
-def test_login_unknown_email_records_attempt(session):
+def test_login_unknown_email_records_attempt(session, outbox_events):
     req = DummyRequest()
     creds = UserLogin(email="unknown@example.com", password="Secret123!")
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event", emit_mock
-    ):
-        with pytest.raises(HTTPException) as exc:
-            login(req, creds, bg, db=session)
-        asyncio.run(bg())
+    with pytest.raises(HTTPException) as exc:
+        login(req, creds, bg, db=session)
+    asyncio.run(bg())
     assert exc.value.status_code == 400
     assert exc.value.detail == {
         "code": ErrorCode.INVALID_CREDENTIALS,
@@ -111,10 +105,10 @@ def test_login_unknown_email_records_attempt(session):
     )
     assert attempt.user_id is None
     assert attempt.success is False
-    emit_mock.assert_not_called()
+    assert outbox_events() == []
 
 
-def test_login_lockout_after_failed_attempts(session, monkeypatch):
+def test_login_lockout_after_failed_attempts(session, monkeypatch, outbox_events):
     monkeypatch.setattr(settings, "login_attempt_threshold", 2)
     monkeypatch.setattr(settings, "login_attempt_window_seconds", 60)
 
@@ -122,24 +116,21 @@ def test_login_lockout_after_failed_attempts(session, monkeypatch):
     req = DummyRequest()
     wrong_creds = UserLogin(email=user.email, password="Bad123!")
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event", emit_mock
-    ):
-        for _ in range(2):
-            with pytest.raises(HTTPException):
-                login(req, wrong_creds, bg, db=session)
-        with pytest.raises(HTTPException) as exc:
-            login(req, UserLogin(email=user.email, password="Secret123!"), bg, db=session)
-        asyncio.run(bg())
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            login(req, wrong_creds, bg, db=session)
+    with pytest.raises(HTTPException) as exc:
+        login(req, UserLogin(email=user.email, password="Secret123!"), bg, db=session)
+    asyncio.run(bg())
     assert exc.value.status_code == 429
     assert exc.value.detail == {
         "code": ErrorCode.TOO_MANY_FAILED_ATTEMPTS,
         "message": "Too many failed login attempts. Please try again later.",
     }
-    emit_mock.assert_not_called()
+    assert outbox_events() == []
 
 
-def test_login_unlocks_after_timeout(session, monkeypatch):
+def test_login_unlocks_after_timeout(session, monkeypatch, outbox_events):
     monkeypatch.setattr(settings, "login_attempt_threshold", 1)
     monkeypatch.setattr(settings, "login_attempt_window_seconds", 1)
 
@@ -147,13 +138,10 @@ def test_login_unlocks_after_timeout(session, monkeypatch):
     req = DummyRequest()
     wrong_creds = UserLogin(email=user.email, password="Bad123!")
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event", emit_mock
-    ):
-        with pytest.raises(HTTPException):
-            login(req, wrong_creds, bg, db=session)
-        time.sleep(1.1)
-        result = login(req, UserLogin(email=user.email, password="Secret123!"), bg, db=session)
-        asyncio.run(bg())
+    with pytest.raises(HTTPException):
+        login(req, wrong_creds, bg, db=session)
+    time.sleep(1.1)
+    result = login(req, UserLogin(email=user.email, password="Secret123!"), bg, db=session)
+    asyncio.run(bg())
     assert "access_token" in result
-    emit_mock.assert_called()
+    assert outbox_events()
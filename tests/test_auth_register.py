@@ -1,5 +1,5 @@
 import asyncio
-from unittest.mock import ANY, call, patch
+from unittest.mock import ANY
 
 import pytest
 from fastapi import HTTPException
@@ -11,7 +11,7 @@ from routers.auth import register
 from schemas.user import UserCreate
 
 
-def test_register_success_creates_user_and_verification(session):
+def test_register_success_creates_user_and_verification(session, outbox_events):
     payload = UserCreate(
         email="new@example.com",
         password="Strong1!",
@@ -19,36 +19,33 @@ def test_register_success_creates_user_and_verification(session):
         phone_number="+40721111222",
     )
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event", emit_mock
-    ):
-        response = register(payload, bg, db=session)
-        asyncio.run(bg())
+    response = register(payload, bg, db=session)
+    asyncio.run(bg())
 
-    emit_mock.assert_has_calls(
-        [
-            call(
-                "user.registered",
-                {
-                    "event_id": ANY,
-                    "timestamp": ANY,
-                    "user_id": response.id,
-                    "email": payload.email,
-                    "provider": None,
-                },
-            ),
-            call(
-                "user.email_verification_sent",
-                {
-                    "event_id": ANY,
-                    "timestamp": ANY,
-                    "user_id": response.id,
-                    "email": payload.email,
-                    "provider": None,
-                },
-            ),
-        ]
-    )
+    assert outbox_events() == [
+        (
+            "user.registered",
+            {
+                "schema_version": 1,
+                "event_id": ANY,
+                "timestamp": ANY,
+                "user_id": str(response.id),
+                "email": payload.email,
+                "provider": None,
+            },
+        ),
+        (
+            "user.email_verification_sent",
+            {
+                "schema_version": 1,
+                "event_id": ANY,
+                "timestamp": ANY,
+                "user_id": str(response.id),
+                "email": payload.email,
+                "provider": None,
+            },
+        ),
+    ]
 
     user = session.query(User).filter_by(email="new@example.com").first()
     assert user is not None
@@ -58,7 +55,7 @@ def test_register_success_creates_user_and_verification(session):
     assert response.full_name == payload.full_name
 
 
-def test_register_duplicate_email_fails(session):
+def test_register_duplicate_email_fails(session, outbox_events):
     user = User(email="dupe@example.com", hashed_password="hash")
     session.add(user)
     session.commit()
@@ -68,15 +65,12 @@ def test_register_duplicate_email_fails(session):
         password="Strong1!",
     )
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event", emit_mock
-    ):
-        with pytest.raises(HTTPException) as exc:
-            register(payload, bg, db=session)
-        asyncio.run(bg())
+    with pytest.raises(HTTPException) as exc:
+        register(payload, bg, db=session)
+    asyncio.run(bg())
     assert exc.value.status_code == 400
     assert exc.value.detail == {
         "code": ErrorCode.EMAIL_ALREADY_REGISTERED,
         "message": "Email already registered",
     }
-    emit_mock.assert_not_called()
+    assert outbox_events() == []
@@ -0,0 +1,125 @@
+import random
+
+from benchmarks.compare import (
+    ERRORS,
+    IMPROVEMENT,
+    MISSING,
+    NEW,
+    REGRESSION,
+    UNCHANGED,
+    bootstrap_ratio,
+    compare,
+    format_table,
+    main,
+)
+from benchmarks.results import summarize, write_results
+
+
+def noisy(center: float, count: int = 200, seed: int = 1) -> list[float]:
+    rng = random.Random(seed)
+    return [center * rng.uniform(0.9, 1.1) for _ in range(count)]
+
+
+def document(**samples) -> dict:
+    return {
+        "meta": {"suite": "unit"},
+        "benchmarks": {name: summarize(values) for name, values in samples.items()},
+    }
+
+
+def statuses(comparisons) -> dict:
+    return {item.name: item.status for item in comparisons}
+
+
+def test_bootstrap_interval_brackets_the_true_ratio():
+    low, high = bootstrap_ratio(noisy(1.0, seed=1), noisy(1.2, seed=2))
+    assert low < 1.2 < high
+    assert low > 1.1
+
+
+def test_compare_classifies_each_benchmark():
+    baseline = document(
+        login=noisy(0.010, seed=1),
+        validate=noisy(0.001, seed=2),
+        me=noisy(0.002, seed=3),
+        logout=noisy(0.003, seed=4),
+    )
+    current = document(
+        login=noisy(0.013, seed=5),
+        validate=noisy(0.0007, seed=6),
+        me=noisy(0.002, seed=7),
+        refresh=noisy(0.001, seed=8),
+    )
+
+    result = statuses(compare(baseline, current))
+
+    assert result == {
+        "login": REGRESSION,
+        "validate": IMPROVEMENT,
+        "me": UNCHANGED,
+        "logout": MISSING,
+        "refresh": NEW,
+    }
+
+
+def test_slowdown_within_threshold_is_not_a_regression():
+    baseline = document(login=noisy(0.010, seed=1))
+    current = document(login=noisy(0.0103, seed=2))
+
+    assert statuses(compare(baseline, current, threshold=0.05)) == {
+        "login": UNCHANGED
+    }
+
+
+def test_noisy_samples_do_not_flag_a_small_shift():
+    rng = random.Random(3)
+    baseline = document(login=[rng.uniform(0.005, 0.02) for _ in range(20)])
+    samples = baseline["benchmarks"]["login"]["samples"]
+    current = document(login=[value * 1.08 for value in samples])
+
+    assert statuses(compare(baseline, current, threshold=0.0)) == {
+        "login": UNCHANGED
+    }
+
+
+def test_errors_fail_the_gate():
+    baseline = document(login=noisy(0.010))
+    current = document(login=noisy(0.010))
+    current["benchmarks"]["login"]["errors"] = 3
+
+    assert statuses(compare(baseline, current)) == {"login": ERRORS}
+
+
+def test_compare_is_deterministic_for_a_seed():
+    baseline = document(login=noisy(0.010, count=30, seed=1))
+    current = document(login=noisy(0.0106, count=30, seed=2))
+
+    first = compare(baseline, current, seed=7)
+    second = compare(baseline, current, seed=7)
+
+    assert (first[0].low, first[0].high) == (second[0].low, second[0].high)
+
+
+def test_format_table_lists_changes():
+    comparisons = compare(
+        document(login=noisy(0.010, seed=1)), document(login=noisy(0.02, seed=2))
+    )
+
+    table = format_table(comparisons)
+
+    assert table.splitlines()[0].startswith("benchmark")
+    assert "login" in table and "REGRESSION" in table
+    assert f"{(comparisons[0].ratio - 1) * 100:+.1f}%" in table
+
+
+def test_main_exit_status(tmp_path, capsys):
+    baseline_path = tmp_path / "baseline.json"
+    same_path = tmp_path / "same.json"
+    slower_path = tmp_path / "slower.json"
+    write_results(baseline_path, "unit", {"login": summarize(noisy(0.010, seed=1))})
+    write_results(same_path, "unit", {"login": summarize(noisy(0.010, seed=2))})
+    write_results(slower_path, "unit", {"login": summarize(noisy(0.015, seed=3))})
+
+    assert main([str(baseline_path), str(same_path)]) == 0
+    assert main([str(baseline_path), str(slower_path)]) == 1
+    assert "failed the gate: login" in capsys.readouterr().out
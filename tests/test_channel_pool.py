@@ -0,0 +1,99 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from events.channel_pool import ChannelPool
+from events.publisher import EventPublisher
+
+
+def _connection(channels):
+    connection = AsyncMock()
+    connection.is_closed = False
+    connection.channel = AsyncMock(side_effect=channels)
+    return connection
+
+
+def _channel():
+    channel = AsyncMock()
+    channel.is_closed = False
+    exchange = AsyncMock()
+    exchange.channel = channel
+    channel.declare_exchange.return_value = exchange
+    return channel
+
+
+def test_pool_hands_out_channels_round_robin():
+    channels = [_channel(), _channel()]
+    connection = _connection(channels)
+    pool = ChannelPool("amqp://test", size=2)
+
+    async def run():
+        return [await pool.get_exchange() for _ in range(4)]
+
+    with patch("aio_pika.connect_robust", return_value=connection) as connect_mock:
+        exchanges = asyncio.run(run())
+
+    connect_mock.assert_awaited_once()
+    assert connection.channel.await_count == 2
+    assert exchanges[0] is exchanges[2]
+    assert exchanges[1] is exchanges[3]
+    assert exchanges[0] is not exchanges[1]
+    assert pool.open_channels == 2
+
+
+def test_closed_channel_is_replaced_without_reconnecting():
+    first, second, replacement = _channel(), _channel(), _channel()
+    connection = _connection([first, second, replacement])
+    pool = ChannelPool("amqp://test", size=2)
+
+    async def run():
+        await pool.get_exchange()
+        await pool.get_exchange()
+        first.is_closed = True
+        await pool.reset()
+        return await pool.get_exchange()
+
+    with patch("aio_pika.connect_robust", return_value=connection) as connect_mock:
+        exchange = asyncio.run(run())
+
+    assert exchange.channel is replacement
+    connect_mock.assert_awaited_once()
+    connection.close.assert_not_awaited()
+    second.close.assert_not_awaited()
+
+
+def test_reset_reconnects_after_connection_closed():
+    connection = _connection([_channel()])
+    reconnected = _connection([_channel()])
+    pool = ChannelPool("amqp://test", size=1)
+
+    async def run():
+        await pool.get_exchange()
+        connection.is_closed = True
+        await pool.reset()
+        return await pool.get_exchange()
+
+    with patch(
+        "aio_pika.connect_robust", side_effect=[connection, reconnected]
+    ) as connect_mock:
+        asyncio.run(run())
+
+    assert connect_mock.await_count == 2
+    reconnected.channel.assert_awaited_once()
+
+
+def test_publisher_spreads_batch_across_channels():
+    channels = [_channel(), _channel()]
+    pool = ChannelPool("amqp://test", size=2)
+    publisher = EventPublisher(pool.get_exchange, pool.reset, channels=2)
+
+    async def run():
+        await publisher.start()
+        for i in range(4):
+            publisher.enqueue("user.test", f"{i}".encode())
+        await publisher.stop()
+
+    with patch("aio_pika.connect_robust", return_value=_connection(channels)):
+        asyncio.run(run())
+
+    exchanges = [channel.declare_exchange.return_value for channel in channels]
+    assert [e.publish.await_count for e in exchanges] == [2, 2]
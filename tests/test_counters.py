@@ -1,5 +1,4 @@
 import asyncio
-from unittest.mock import patch
 
 
 import fakeredis
@@ -44,17 +43,13 @@ def test_login_success_counter_increment(session):
     req = DummyRequest()
     creds = UserLogin(email=user.email, password="Secret123!")
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event",
-        emit_mock,
-    ):
-        login(req, creds, bg, db=session)
-        asyncio.run(bg())
+    login(req, creds, bg, db=session)
+    asyncio.run(bg())
 
     assert login_success_counter._value.get() == 1
 
 
-def test_register_failed_counter_increment(session):
+def test_register_failed_counter_increment(session, outbox_events):
     setup_cache()
     register_failed_counter._value.set(0)
     user = User(email="dupe@example.com", hashed_password="hash")
@@ -63,16 +58,12 @@ def test_register_failed_counter_increment(session):
 
     payload = UserCreate(email="dupe@example.com", password="Strong1!")
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event",
-        emit_mock,
-    ):
-        with pytest.raises(HTTPException):
-            register(payload, bg, db=session)
-        asyncio.run(bg())
+    with pytest.raises(HTTPException):
+        register(payload, bg, db=session)
+    asyncio.run(bg())
 
     assert register_failed_counter._value.get() == 1
-    emit_mock.assert_not_called()
+    assert outbox_events() == []
 
 
 def test_user_registration_counter_increment(session):
@@ -80,12 +71,8 @@ def test_user_registration_counter_increment(session):
     user_registration_counter.labels(provider="local")._value.set(0)
     payload = UserCreate(email="met@example.com", password="Strong1!")
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event",
-        emit_mock,
-    ):
-        register(payload, bg, db=session)
-        asyncio.run(bg())
+    register(payload, bg, db=session)
+    asyncio.run(bg())
 
     assert (
         user_registration_counter.labels(provider="local")._value.get() == 1
@@ -109,12 +96,8 @@ def test_authentication_latency_observed(session):
     req = DummyRequest()
     creds = UserLogin(email=user.email, password="Secret123!")
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event",
-        emit_mock,
-    ):
-        login(req, creds, bg, db=session)
-        asyncio.run(bg())
+    login(req, creds, bg, db=session)
+    asyncio.run(bg())
 
     assert authentication_latency._sum.get() > 0
 
@@ -0,0 +1,145 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from events import rabbitmq
+from events.publisher import EventPublisher
+from utils.metrics import event_confirm_failures_counter, event_dropped_counter
+
+
+def _publisher(exchange, **kwargs) -> EventPublisher:
+    async def get_exchange():
+        return exchange
+
+    return EventPublisher(get_exchange, AsyncMock(), retry_delay=0, **kwargs)
+
+
+def test_publisher_drains_queue_in_batches():
+    exchange = AsyncMock()
+    publisher = _publisher(exchange, batch_size=10)
+
+    async def run():
+        await publisher.start()
+        for i in range(25):
+            assert publisher.enqueue("user.test", f"{i}".encode())
+        await publisher.stop()
+
+    asyncio.run(run())
+    assert exchange.publish.await_count == 25
+    bodies = [c.args[0].body for c in exchange.publish.call_args_list]
+    assert bodies == [f"{i}".encode() for i in range(25)]
+    assert not publisher.running
+
+
+def test_publisher_drops_when_queue_full():
+    exchange = AsyncMock()
+    publisher = _publisher(exchange, max_queue_size=1)
+    event_dropped_counter._value.set(0)
+
+    async def run():
+        await publisher.start()
+        first = publisher.enqueue("user.a", b"1")
+        second = publisher.enqueue("user.b", b"2")
+        await publisher.stop()
+        return first, second
+
+    assert asyncio.run(run()) == (True, False)
+    assert event_dropped_counter._value.get() == 1
+    assert exchange.publish.await_count == 1
+
+
+def test_publisher_requeues_failed_publishes():
+    exchange = AsyncMock()
+    exchange.publish = AsyncMock(side_effect=[Exception("nack"), None])
+    publisher = _publisher(exchange)
+    event_confirm_failures_counter._value.set(0)
+
+    async def run():
+        await publisher.start()
+        publisher.enqueue("user.retry", b"{}")
+        await publisher.stop()
+
+    asyncio.run(run())
+    assert exchange.publish.await_count == 2
+    assert event_confirm_failures_counter._value.get() == 1
+
+
+def test_emit_event_enqueues_when_publisher_running():
+    async def run():
+        with patch.object(rabbitmq.publisher, "enqueue") as enqueue_mock:
+            await rabbitmq.publisher.start()
+            try:
+                await rabbitmq.emit_event("user.test", {"k": "v"})
+            finally:
+                await rabbitmq.publisher.stop()
+        return enqueue_mock
+
+    enqueue_mock = asyncio.run(run())
+    enqueue_mock.assert_called_once_with(
+        "user.test", b'{"k":"v"}', None, content_type="application/json"
+    )
+
+
+def test_publisher_nack_does_not_reset_connection():
+    exchange = AsyncMock()
+    exchange.channel.is_closed = False
+    exchange.publish = AsyncMock(side_effect=[Exception("nack"), None, None])
+    reset = AsyncMock()
+
+    async def get_exchange():
+        return exchange
+
+    publisher = EventPublisher(get_exchange, reset, retry_delay=0)
+
+    async def run():
+        await publisher.start()
+        publisher.enqueue("user.a", b"1")
+        publisher.enqueue("user.b", b"2")
+        await publisher.stop()
+
+    asyncio.run(run())
+    assert exchange.publish.await_count == 3
+    reset.assert_not_awaited()
+
+
+def test_publisher_resets_connection_when_exchange_unavailable():
+    exchange = AsyncMock()
+    reset = AsyncMock()
+    calls = []
+
+    async def get_exchange():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("down")
+        return exchange
+
+    publisher = EventPublisher(get_exchange, reset, retry_delay=0)
+
+    async def run():
+        await publisher.start()
+        publisher.enqueue("user.a", b"1")
+        await publisher.stop()
+
+    asyncio.run(run())
+    reset.assert_awaited_once()
+    assert exchange.publish.await_count == 1
+
+
+def test_stop_counts_unpublished_events_as_dropped():
+    exchange = AsyncMock()
+
+    async def slow_publish(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    exchange.publish = slow_publish
+    publisher = _publisher(exchange, batch_size=1)
+    event_dropped_counter._value.set(0)
+
+    async def run():
+        await publisher.start()
+        for i in range(3):
+            publisher.enqueue("user.slow", b"x")
+        await asyncio.sleep(0)
+        await publisher.stop(timeout=0.05)
+
+    asyncio.run(run())
+    assert event_dropped_counter._value.get() == 2
@@ -0,0 +1,207 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from events import rabbitmq
+from events.publisher import EventPublisher, PendingEvent
+from events.spool import EventSpool
+from utils.metrics import event_spool_dropped_counter
+
+
+def _event(i: int) -> PendingEvent:
+    return PendingEvent(f"user.e{i}", f"body-{i}".encode())
+
+
+def _recording_publish(results=None):
+    published = []
+
+    async def publish(batch):
+        outcome = []
+        for event in batch:
+            ok = results.pop(0) if results else True
+            if ok:
+                published.append((event.routing_key, event.body))
+            outcome.append(ok)
+        return outcome
+
+    return publish, published
+
+
+def test_spool_replays_events_in_order(tmp_path):
+    spool = EventSpool(str(tmp_path), segment_bytes=64)
+    for i in range(5):
+        assert spool.append(_event(i))
+    spool.flush()
+    assert spool.pending == 5
+    assert len(list(tmp_path.rglob("*.spool"))) > 1
+
+    publish, published = _recording_publish()
+    assert asyncio.run(spool.replay(publish, batch_size=2)) == 5
+    assert published == [(f"user.e{i}", f"body-{i}".encode()) for i in range(5)]
+    assert spool.pending == 0
+    assert list(tmp_path.rglob("*.spool")) == []
+
+
+def test_spool_survives_restart(tmp_path):
+    spool = EventSpool(str(tmp_path))
+    spool.append(_event(1))
+    spool.close()
+
+    reopened = EventSpool(str(tmp_path))
+    assert reopened.pending == 1
+    publish, published = _recording_publish()
+    asyncio.run(reopened.replay(publish))
+    assert published == [("user.e1", b"body-1")]
+
+
+def test_spool_rejects_events_over_size_cap(tmp_path):
+    event_spool_dropped_counter._value.set(0)
+    spool = EventSpool(str(tmp_path), max_bytes=60)
+    assert spool.append(_event(1))
+    assert not spool.append(_event(2))
+    assert event_spool_dropped_counter._value.get() == 1
+    assert spool.pending == 1
+
+
+def test_spool_keeps_unconfirmed_events_after_failed_replay(tmp_path):
+    spool = EventSpool(str(tmp_path))
+    for i in range(3):
+        spool.append(_event(i))
+
+    publish, published = _recording_publish(results=[True, False, True])
+    assert asyncio.run(spool.replay(publish, batch_size=3)) == 2
+    assert spool.pending == 1
+
+    publish, published = _recording_publish()
+    asyncio.run(spool.replay(publish))
+    assert published == [("user.e1", b"body-1")]
+
+
+def test_spool_stops_at_corrupt_tail(tmp_path):
+    spool = EventSpool(str(tmp_path))
+    spool.append(_event(1))
+    spool.close()
+    segment = next(tmp_path.rglob("*.spool"))
+    with open(segment, "ab") as fh:
+        fh.write(b"\x00\x01partial")
+
+    reopened = EventSpool(str(tmp_path))
+    assert reopened.pending == 1
+
+
+def test_publisher_spools_undeliverable_events_and_replays(tmp_path):
+    spool = EventSpool(str(tmp_path))
+    exchange = AsyncMock()
+    broker_up = False
+
+    async def get_exchange():
+        if not broker_up:
+            raise ConnectionError("down")
+        return exchange
+
+    publisher = EventPublisher(
+        get_exchange, AsyncMock(), retry_delay=0, max_attempts=1, spool=spool
+    )
+
+    async def run():
+        nonlocal broker_up
+        await publisher.start()
+        publisher.enqueue("user.spooled", b"1")
+        await asyncio.sleep(0.05)
+        assert spool.pending == 1
+        broker_up = True
+        publisher.enqueue("user.live", b"2")
+        await asyncio.sleep(0.05)
+        await publisher.stop()
+
+    asyncio.run(run())
+    keys = [c.kwargs["routing_key"] for c in exchange.publish.call_args_list]
+    assert sorted(keys) == ["user.live", "user.spooled"]
+    assert spool.pending == 0
+
+
+def test_emit_event_spools_after_retries_are_exhausted(tmp_path, monkeypatch):
+    spool = EventSpool(str(tmp_path))
+    monkeypatch.setattr(rabbitmq.publisher, "spool", spool)
+    monkeypatch.setattr(rabbitmq.publisher._scheduler, "base_delay", 0)
+    monkeypatch.setattr(rabbitmq.publisher._scheduler, "max_attempts", 2)
+
+    async def run():
+        await rabbitmq.emit_event("user.down", {"k": "v"})
+        for _ in range(100):
+            if spool.pending:
+                break
+            await asyncio.sleep(0.01)
+
+    with (
+        patch.object(
+            rabbitmq.publisher,
+            "_get_exchange",
+            AsyncMock(side_effect=ConnectionError),
+        ),
+        patch.object(rabbitmq.publisher, "_reset_connection", AsyncMock()),
+    ):
+        asyncio.run(run())
+
+    assert spool.pending == 1
+
+
+def test_spools_sharing_a_directory_keep_their_own_segments(tmp_path):
+    first = EventSpool(str(tmp_path))
+    second = EventSpool(str(tmp_path))
+    assert first.directory != second.directory
+    first.append(_event(1))
+    second.append(_event(2))
+
+    publish, published = _recording_publish()
+    assert asyncio.run(first.replay(publish)) == 1
+    assert published == [("user.e1", b"body-1")]
+    assert first.pending == 0
+
+    # Appends after the other worker's replay land in a live segment
+    second.append(_event(3))
+    second.close()
+    first.close()
+
+    reopened = EventSpool(str(tmp_path))
+    assert reopened.pending == 2
+    publish, published = _recording_publish()
+    assert asyncio.run(reopened.replay(publish)) == 2
+    assert published == [("user.e2", b"body-2"), ("user.e3", b"body-3")]
+    assert list(tmp_path.rglob("*.spool")) == []
+
+
+def test_live_spool_does_not_adopt_locked_directory(tmp_path):
+    first = EventSpool(str(tmp_path))
+    first.append(_event(1))
+    first.flush()
+
+    second = EventSpool(str(tmp_path))
+    publish, published = _recording_publish()
+    assert asyncio.run(second.replay(publish)) == 0
+    assert published == []
+    assert first.pending == 1
+
+
+def test_spool_adopts_segments_of_exited_worker(tmp_path):
+    live = EventSpool(str(tmp_path))
+    exited = EventSpool(str(tmp_path))
+    exited.append(_event(1))
+    exited.close()
+    assert live.pending == 0
+
+    publish, published = _recording_publish()
+    assert asyncio.run(live.replay(publish)) == 1
+    assert published == [("user.e1", b"body-1")]
+    assert not exited.directory.exists()
+
+
+def test_spool_adopts_segments_from_spool_root(tmp_path):
+    legacy = EventSpool(str(tmp_path))
+    legacy.append(_event(1))
+    legacy.close()
+    segment = next(tmp_path.rglob("*.spool"))
+    segment.rename(tmp_path / segment.name)
+
+    spool = EventSpool(str(tmp_path))
+    assert spool.pending == 1
+    assert list(tmp_path.glob("*.spool")) == []
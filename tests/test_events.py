@@ -1,22 +1,24 @@
 import asyncio
 import json
-from unittest.mock import AsyncMock, Mock, patch
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
 
 import pytest
 import aio_pika
 
 from events import rabbitmq
+from events.channel_pool import ChannelPool
+from events import serialization
+from events.serialization import serialize_event
+from schemas.event import UserLoggedInEvent, UserRegisteredEvent
+from utils.metrics import event_dead_lettered_counter, event_dropped_counter
+from utils.settings import settings
 
 
 @pytest.fixture(autouse=True)
-def reset_state():
-    rabbitmq._connection = None
-    rabbitmq._channel = None
-    rabbitmq._exchange = None
-    yield
-    rabbitmq._connection = None
-    rabbitmq._channel = None
-    rabbitmq._exchange = None
+def reset_state(monkeypatch):
+    monkeypatch.setattr(rabbitmq, "_pool", ChannelPool(rabbitmq.RABBITMQ_URL, 2))
 
 
 def test_emit_event_publishes_message():
@@ -60,7 +62,7 @@ def test_connection_is_reused():
         assert exchange.publish.await_count == 2
 
 
-def test_emit_event_retries_and_logs():
+def _failing_connection(publish_side_effect):
     connection = AsyncMock()
     channel = AsyncMock()
     exchange = AsyncMock()
@@ -68,23 +70,57 @@ def test_emit_event_retries_and_logs():
     channel.declare_exchange.return_value = exchange
     connection.is_closed = False
     channel.is_closed = False
-    exchange.is_closed = False
-    exchange.publish = AsyncMock(side_effect=[Exception("err1"), Exception("err2"), None])
+    exchange.publish = AsyncMock(side_effect=publish_side_effect)
+    return connection, exchange
+
+
+async def _wait_for(predicate, timeout=1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate() and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
 
-    logger_mock = Mock()
 
-    with (
-        patch("aio_pika.connect_robust", return_value=connection),
-        patch("events.rabbitmq.logger", logger_mock),
-        patch("events.rabbitmq.asyncio.sleep", new=AsyncMock()),
-    ):
-        asyncio.run(rabbitmq.emit_event("user.retry", {"k": "v"}, retries=3, delay=0))
+def test_emit_event_returns_and_redelivers_in_background(monkeypatch):
+    connection, exchange = _failing_connection(
+        [Exception("err1"), Exception("err2"), None]
+    )
+    monkeypatch.setattr(rabbitmq.publisher._scheduler, "base_delay", 0)
+    monkeypatch.setattr(rabbitmq.publisher._scheduler, "max_attempts", 5)
+
+    async def run():
+        await rabbitmq.emit_event("user.retry", {"k": "v"})
+        # emit_event returns after the first attempt
+        assert exchange.publish.await_count == 1
+        await _wait_for(lambda: exchange.publish.await_count == 3)
+
+    with patch("aio_pika.connect_robust", return_value=connection):
+        asyncio.run(run())
 
     assert exchange.publish.await_count == 3
-    assert logger_mock.exception.call_count == 2
 
 
-def test_emit_event_raises_after_max_retries():
+def test_emit_event_dead_letters_after_max_attempts(monkeypatch):
+    connection, exchange = _failing_connection(Exception("err"))
+    monkeypatch.setattr(rabbitmq.publisher._scheduler, "base_delay", 0)
+    monkeypatch.setattr(rabbitmq.publisher._scheduler, "max_attempts", 2)
+    monkeypatch.setattr(rabbitmq.publisher, "spool", None)
+    dead_lettered = event_dead_lettered_counter.labels(reason="attempts")
+    dead_lettered._value.set(0)
+    event_dropped_counter._value.set(0)
+
+    async def run():
+        await rabbitmq.emit_event("user.retry", {"k": "v"})
+        await _wait_for(lambda: event_dropped_counter._value.get() == 1)
+
+    with patch("aio_pika.connect_robust", return_value=connection):
+        asyncio.run(run())
+
+    assert exchange.publish.await_count == 2
+    assert dead_lettered._value.get() == 1
+    assert event_dropped_counter._value.get() == 1
+
+
+def test_emit_event_accepts_event_models():
     connection = AsyncMock()
     channel = AsyncMock()
     exchange = AsyncMock()
@@ -93,17 +129,56 @@ def test_emit_event_raises_after_max_retries():
     connection.is_closed = False
     channel.is_closed = False
     exchange.is_closed = False
-    exchange.publish = AsyncMock(side_effect=Exception("err"))
+    user_id = uuid.uuid4()
+    event = UserRegisteredEvent(user_id=user_id, email="user@example.com")
 
-    logger_mock = Mock()
+    with patch("aio_pika.connect_robust", return_value=connection):
+        asyncio.run(rabbitmq.emit_event("user.registered", event))
 
-    with (
-        patch("aio_pika.connect_robust", return_value=connection),
-        patch("events.rabbitmq.logger", logger_mock),
-        patch("events.rabbitmq.asyncio.sleep", new=AsyncMock()),
-    ):
-        with pytest.raises(Exception):
-            asyncio.run(rabbitmq.emit_event("user.retry", {"k": "v"}, retries=2, delay=0))
+    message = exchange.publish.call_args.args[0]
+    payload = json.loads(message.body)
+    assert payload["user_id"] == str(user_id)
+    assert payload["event_id"] == str(event.event_id)
+    assert message.content_type == "application/json"
 
-    assert exchange.publish.await_count == 2
-    assert logger_mock.exception.call_count == 2
+
+def test_serialize_event_encodes_uuid_and_datetime_in_dicts():
+    user_id = uuid.uuid4()
+    now = datetime.now(timezone.utc)
+
+    body = serialize_event({"user_id": user_id, "timestamp": now})
+
+    payload = json.loads(body)
+    assert payload["user_id"] == str(user_id)
+    assert datetime.fromisoformat(payload["timestamp"]) == now
+
+
+def test_msgpack_routing_keys_publish_msgpack(monkeypatch):
+    msgpack = pytest.importorskip("msgpack")
+    monkeypatch.setattr(settings, "event_msgpack_routing_keys", {"user.logged_in"})
+    connection, exchange = _failing_connection(None)
+    user_id = uuid.uuid4()
+
+    with patch("aio_pika.connect_robust", return_value=connection):
+        asyncio.run(
+            rabbitmq.emit_event("user.logged_in", UserLoggedInEvent(user_id=user_id))
+        )
+        asyncio.run(
+            rabbitmq.emit_event("user.registered", UserRegisteredEvent(user_id=user_id))
+        )
+
+    packed, plain = [c.args[0] for c in exchange.publish.call_args_list]
+    assert packed.content_type == "application/msgpack"
+    payload = msgpack.unpackb(packed.body)
+    assert payload["user_id"] == str(user_id)
+    assert payload["schema_version"] == 1
+    assert plain.content_type == "application/json"
+    assert json.loads(plain.body)["user_id"] == str(user_id)
+
+
+def test_msgpack_encoding_requires_msgpack(monkeypatch):
+    monkeypatch.setattr(serialization, "msgpack", None)
+    with pytest.raises(RuntimeError):
+        serialization.serialize_event(
+            {"k": "v"}, serialization.MSGPACK_CONTENT_TYPE
+        )
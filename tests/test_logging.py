@@ -1,10 +1,23 @@
 import importlib
 import json
 import logging
+import queue
+import sys
+
+from prometheus_client import REGISTRY
+
+from utils.logging import (
+    BoundedQueueHandler,
+    JSONFormatter,
+    SamplingFilter,
+    stop_logging,
+)
 from utils.settings import settings
 
 
 def test_json_logging_enabled(monkeypatch, capsys):
+    root = logging.getLogger()
+    monkeypatch.setattr(root, "handlers", list(root.handlers))
     monkeypatch.setattr(settings, "environment", "production")
     import main as main_mod
     main_mod = importlib.reload(main_mod)
@@ -20,6 +33,8 @@ def test_json_logging_enabled(monkeypatch, capsys):
     logging.getLogger().info(
         "json test", extra={"user_id": "42", "endpoint": "/test"}
     )
+    # Records are written by the listener thread; stopping it drains the queue
+    stop_logging()
     captured = capsys.readouterr()
     output = captured.out.strip() or captured.err.strip()
     log = json.loads(output)
@@ -28,3 +43,57 @@ def test_json_logging_enabled(monkeypatch, capsys):
     assert log["user_id"] == "42"
     assert log["endpoint"] == "/test"
 
+
+
+def dropped(reason: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "bee_auth_log_records_dropped_total", {"reason": reason}
+    )
+    return value or 0.0
+
+
+def make_record(msg: str, level: int = logging.INFO, args=()) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, msg, args, None)
+
+
+def test_sampling_keeps_configured_fraction_of_info_records():
+    values = iter([0.5, 0.05, 0.5])
+    sampler = SamplingFilter({"event_published": 0.1}, rand=lambda: next(values))
+    before = dropped("sampled")
+
+    kept = [sampler.filter(make_record("event_published")) for _ in range(3)]
+
+    assert kept == [False, True, False]
+    assert dropped("sampled") == before + 2
+    assert sampler.filter(make_record("login_successful"))
+    assert sampler.filter(make_record("event_published", level=logging.WARNING))
+
+
+def test_full_queue_drops_records_without_blocking():
+    log_queue = queue.Queue(maxsize=1)
+    handler = BoundedQueueHandler(log_queue)
+    before = dropped("queue_full")
+
+    handler.handle(make_record("first %s", args=("a",)))
+    handler.handle(make_record("second"))
+
+    assert log_queue.qsize() == 1
+    assert dropped("queue_full") == before + 1
+    assert log_queue.get_nowait().getMessage() == "first a"
+
+
+def test_exception_is_rendered_before_queueing():
+    log_queue = queue.Queue()
+    handler = BoundedQueueHandler(log_queue)
+    try:
+        raise RuntimeError("broken")
+    except RuntimeError:
+        record = logging.LogRecord(
+            "test", logging.ERROR, __file__, 1, "failed", (), sys.exc_info()
+        )
+    handler.handle(record)
+
+    log = json.loads(JSONFormatter().format(log_queue.get_nowait()))
+
+    assert log["message"] == "failed"
+    assert "RuntimeError: broken" in log["exception"]
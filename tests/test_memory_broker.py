@@ -0,0 +1,72 @@
+import asyncio
+
+import aio_pika
+import pytest
+
+from events.channel_pool import ChannelPool
+from events.memory_broker import MemoryBroker
+from events.publisher import EventPublisher
+
+
+def _publisher(broker: MemoryBroker, **kwargs) -> tuple[EventPublisher, ChannelPool]:
+    pool = ChannelPool("memory://", 2, connect=broker.connect)
+    publisher = EventPublisher(
+        pool.get_exchange, pool.reset, channels=2, retry_delay=0, **kwargs
+    )
+    return publisher, pool
+
+
+def test_memory_exchange_records_messages_after_latency():
+    broker = MemoryBroker(latency=0.02)
+    pool = ChannelPool("memory://", 1, connect=broker.connect)
+
+    async def run():
+        exchange = await pool.get_exchange()
+        start = asyncio.get_running_loop().time()
+        await exchange.publish(aio_pika.Message(body=b"1"), routing_key="user.a")
+        return asyncio.get_running_loop().time() - start
+
+    assert asyncio.run(run()) >= 0.02
+    assert [(m.exchange, m.routing_key) for m in broker.published] == [
+        ("bee.auth.events", "user.a")
+    ]
+
+
+def test_memory_exchange_injects_faults():
+    broker = MemoryBroker()
+    broker.fail_next(1, "nack")
+    broker.fail_next(1, "close")
+    pool = ChannelPool("memory://", 1, connect=broker.connect)
+
+    async def run():
+        exchange = await pool.get_exchange()
+        with pytest.raises(aio_pika.exceptions.DeliveryError):
+            await exchange.publish(aio_pika.Message(body=b"1"), routing_key="k")
+        with pytest.raises(aio_pika.exceptions.ChannelInvalidStateError):
+            await exchange.publish(aio_pika.Message(body=b"2"), routing_key="k")
+        assert exchange.channel.is_closed
+        await pool.reset()
+        replacement = await pool.get_exchange()
+        await replacement.publish(aio_pika.Message(body=b"3"), routing_key="k")
+        return replacement
+
+    replacement = asyncio.run(run())
+    assert not replacement.channel.is_closed
+    assert len(broker.connections) == 1
+    assert [m.message.body for m in broker.published] == [b"3"]
+
+
+def test_publisher_delivers_every_event_through_faults():
+    broker = MemoryBroker(nack_rate=0.2, close_rate=0.05, seed=7)
+    publisher, pool = _publisher(broker, max_attempts=20)
+
+    async def run():
+        await publisher.start()
+        for i in range(200):
+            publisher.enqueue("user.test", f"{i}".encode())
+        await publisher.stop()
+        await pool.close()
+
+    asyncio.run(run())
+    bodies = sorted(int(m.message.body) for m in broker.published)
+    assert bodies == list(range(200))
@@ -1,10 +1,11 @@
 from datetime import datetime, timedelta, timezone
 
 import pytest
-from sqlalchemy import inspect
+from sqlalchemy import event, inspect
 from sqlalchemy.exc import IntegrityError
 
 from models import EmailVerification, LoginAttempt, TwoFAToken, User
+from services import auth as auth_service
 
 
 def test_user_email_uniqueness(session):
@@ -98,3 +99,27 @@ def test_login_attempt_indexes(session):
     index_names = {idx["name"] for idx in inspector.get_indexes("login_attempts")}
     assert "ix_login_attempts_user_id_created_at" in index_names
     assert "ix_login_attempts_email_created_at" in index_names
+
+
+def test_created_records_are_not_reselected_after_commit(session):
+    user = User(email="noselect@example.com", hashed_password="hash")
+    session.add(user)
+    session.commit()
+
+    statements = []
+
+    def before_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = session.get_bind().engine
+    event.listen(engine, "before_cursor_execute", before_execute)
+    try:
+        record = auth_service.create_email_verification(session, user)
+        assert record.id is not None
+        assert record.created_at is not None
+        assert user.id == record.user_id
+    finally:
+        event.remove(engine, "before_cursor_execute", before_execute)
+
+    assert not inspect(record).expired_attributes
+    assert not [s for s in statements if s.lstrip().upper().startswith("SELECT")]
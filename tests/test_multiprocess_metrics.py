@@ -0,0 +1,71 @@
+import os
+import runpy
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def gunicorn_conf(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path / "prom"))
+    conf = runpy.run_path(str(ROOT / "gunicorn.conf.py"))
+    conf["on_starting"](None)
+    return SimpleNamespace(**conf)
+
+
+def run_worker(directory: str, code: str) -> int:
+    """Record metrics in a separate process, like a gunicorn worker would."""
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory)
+    script = "import os\nfrom utils import metrics\n" + code + "\nprint(os.getpid())"
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return int(result.stdout.strip().splitlines()[-1])
+
+
+def test_on_starting_clears_previous_run(tmp_path, monkeypatch):
+    directory = tmp_path / "prom"
+    directory.mkdir()
+    (directory / "counter_123.db").write_bytes(b"stale")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(directory))
+
+    conf = runpy.run_path(str(ROOT / "gunicorn.conf.py"))
+    conf["on_starting"](None)
+
+    assert directory.is_dir()
+    assert list(directory.iterdir()) == []
+
+
+def test_counters_are_summed_across_workers(gunicorn_conf):
+    directory = gunicorn_conf.multiproc_dir
+    run_worker(directory, "metrics.login_success_counter.inc()")
+    run_worker(directory, "metrics.login_success_counter.inc(2)")
+
+    registry = gunicorn_conf.aggregated_registry()
+
+    assert registry.get_sample_value("bee_auth_logins_total") == 3
+
+
+def test_exited_worker_gauges_are_dropped(gunicorn_conf):
+    directory = gunicorn_conf.multiproc_dir
+    first = run_worker(directory, "metrics.event_queue_depth.set(3)")
+    run_worker(directory, "metrics.event_queue_depth.set(4)")
+    assert gunicorn_conf.aggregated_registry().get_sample_value(
+        "bee_auth_event_queue_depth"
+    ) == 7
+
+    gunicorn_conf.child_exit(None, SimpleNamespace(pid=first))
+
+    assert gunicorn_conf.aggregated_registry().get_sample_value(
+        "bee_auth_event_queue_depth"
+    ) == 4
@@ -0,0 +1,174 @@
+import time
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from jose.exceptions import JWTError
+
+from services import oidc
+
+ISSUER = "https://issuer.example"
+DISCOVERY_URL = f"{ISSUER}/.well-known/openid-configuration"
+JWKS_URL = f"{ISSUER}/certs"
+
+
+def make_key(kid: str) -> tuple[bytes, dict]:
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    public["kid"] = kid
+    return pem, public
+
+
+class KeyServer:
+    """Serve a discovery document and JWKS, counting the requests."""
+
+    def __init__(self, keys: list[dict], max_age: int | None = 300) -> None:
+        self.keys = keys
+        self.max_age = max_age
+        self.hits: list[str] = []
+        self.transport = httpx.MockTransport(self.handle)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        self.hits.append(url)
+        headers = {}
+        if self.max_age is not None:
+            headers["Cache-Control"] = f"public, max-age={self.max_age}"
+        if url == DISCOVERY_URL:
+            body = {"issuer": ISSUER, "jwks_uri": JWKS_URL}
+        else:
+            body = {"keys": self.keys}
+        return httpx.Response(200, json=body, headers=headers)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def sign(pem: bytes, kid: str, **overrides) -> str:
+    claims = {
+        "iss": ISSUER,
+        "aud": "client-id",
+        "sub": "user-1",
+        "email": "user@example.com",
+        "exp": int(time.time()) + 300,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, pem, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture(scope="module")
+def signing_key():
+    return make_key("k1")
+
+
+def cache_for(server: KeyServer, clock=None) -> oidc.JWKSCache:
+    return oidc.JWKSCache(
+        DISCOVERY_URL,
+        transport=lambda: server.transport,
+        clock=clock or FakeClock(),
+    )
+
+
+def test_cache_max_age_parsing():
+    headers = httpx.Headers({"Cache-Control": "public, max-age=120, must-revalidate"})
+    assert oidc.cache_max_age(headers, 5) == 120
+    assert oidc.cache_max_age(httpx.Headers({"Cache-Control": "no-store"}), 5) == 0
+    assert oidc.cache_max_age(httpx.Headers({}), 5) == 5
+
+
+def test_verifies_token_and_caches_keys(signing_key):
+    pem, public = signing_key
+    server = KeyServer([public])
+    keys = cache_for(server)
+
+    for _ in range(3):
+        claims = oidc.verify_id_token(sign(pem, "k1"), keys, audience="client-id")
+
+    assert claims["email"] == "user@example.com"
+    assert server.hits == [DISCOVERY_URL, JWKS_URL]
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"aud": "someone-else"},
+        {"iss": "https://evil.example"},
+        {"exp": int(time.time()) - 10},
+    ],
+)
+def test_rejects_invalid_claims(signing_key, overrides):
+    pem, public = signing_key
+    keys = cache_for(KeyServer([public]))
+
+    with pytest.raises(JWTError):
+        oidc.verify_id_token(sign(pem, "k1", **overrides), keys, audience="client-id")
+
+
+def test_extra_issuers_are_accepted(signing_key):
+    pem, public = signing_key
+    keys = cache_for(KeyServer([public]))
+    token = sign(pem, "k1", iss="issuer.example")
+
+    claims = oidc.verify_id_token(
+        token, keys, audience="client-id", extra_issuers=("issuer.example",)
+    )
+
+    assert claims["iss"] == "issuer.example"
+
+
+def test_rejects_token_signed_by_other_key(signing_key):
+    _, public = signing_key
+    other_pem, _ = make_key("k1")
+    keys = cache_for(KeyServer([public]))
+
+    with pytest.raises(JWTError):
+        oidc.verify_id_token(sign(other_pem, "k1"), keys, audience="client-id")
+
+
+def test_unknown_kid_refetches_at_most_once_per_interval(signing_key):
+    pem, public = signing_key
+    server = KeyServer([public])
+    clock = FakeClock()
+    keys = cache_for(server, clock)
+    keys.refresh()
+
+    for _ in range(3):
+        with pytest.raises(JWTError):
+            oidc.verify_id_token(sign(pem, "rotated"), keys, audience="client-id")
+    assert server.hits.count(JWKS_URL) == 1
+
+    rotated = dict(public, kid="rotated")
+    server.keys = [public, rotated]
+    clock.now += keys.min_refresh_interval
+    claims = oidc.verify_id_token(sign(pem, "rotated"), keys, audience="client-id")
+
+    assert claims["sub"] == "user-1"
+    assert server.hits.count(JWKS_URL) == 2
+
+
+def test_expired_keys_are_served_while_refreshing_in_background(signing_key):
+    pem, public = signing_key
+    server = KeyServer([public], max_age=60)
+    clock = FakeClock()
+    keys = cache_for(server, clock)
+    keys.refresh()
+
+    clock.now += 61
+    assert keys.cached_key("k1") == public
+
+    deadline = time.monotonic() + 5
+    while server.hits.count(JWKS_URL) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.hits.count(JWKS_URL) == 2
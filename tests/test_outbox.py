@@ -0,0 +1,148 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+from events import outbox
+from events.publisher import EventPublisher
+from models import EventOutbox
+from schemas.event import UserLoggedInEvent, UserRegisteredEvent
+from utils.settings import settings
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, expire_on_commit=False)
+    engine.dispose()
+
+
+def _relay(session_factory, get_exchange, reset=None):
+    publisher = EventPublisher(get_exchange, reset or AsyncMock())
+    return outbox.OutboxRelay(session_factory, publisher, batch_size=10)
+
+
+def _stage(session_factory, count: int) -> list[uuid.UUID]:
+    db = session_factory()
+    user_ids = []
+    for _ in range(count):
+        user_id = uuid.uuid4()
+        outbox.add_event(
+            db, "user.registered", UserRegisteredEvent(user_id=user_id)
+        )
+        user_ids.append(user_id)
+    db.commit()
+    db.close()
+    return user_ids
+
+
+def _unsent(session_factory) -> int:
+    db = session_factory()
+    try:
+        return db.query(EventOutbox).filter(EventOutbox.sent_at.is_(None)).count()
+    finally:
+        db.close()
+
+
+def test_add_event_stages_row_without_committing(session):
+    user_id = uuid.uuid4()
+    record = outbox.add_event(
+        session, "user.registered", UserRegisteredEvent(user_id=user_id)
+    )
+    assert record in session.new
+    session.rollback()
+    assert session.query(EventOutbox).count() == 0
+
+    outbox.add_event(session, "user.registered", UserRegisteredEvent(user_id=user_id))
+    session.commit()
+    row = session.query(EventOutbox).one()
+    assert row.routing_key == "user.registered"
+    assert row.content_type == "application/json"
+    assert row.sent_at is None
+    assert json.loads(row.payload)["user_id"] == str(user_id)
+
+
+def test_relay_batch_publishes_and_marks_sent(session_factory):
+    user_ids = _stage(session_factory, 3)
+    exchange = AsyncMock()
+
+    async def get_exchange():
+        return exchange
+
+    relay = _relay(session_factory, get_exchange)
+    assert asyncio.run(relay.relay_batch()) == 3
+
+    assert exchange.publish.await_count == 3
+    published = [json.loads(c.args[0].body) for c in exchange.publish.call_args_list]
+    assert [p["user_id"] for p in published] == [str(u) for u in user_ids]
+    assert _unsent(session_factory) == 0
+    assert asyncio.run(relay.relay_batch()) == 0
+
+
+def test_relay_batch_keeps_failed_rows_unsent(session_factory):
+    _stage(session_factory, 3)
+    exchange = AsyncMock()
+    exchange.publish = AsyncMock(side_effect=[None, Exception("nack"), None])
+
+    async def get_exchange():
+        return exchange
+
+    relay = _relay(session_factory, get_exchange)
+    assert asyncio.run(relay.relay_batch()) == 2
+    assert _unsent(session_factory) == 1
+
+
+def test_relay_batch_leaves_rows_when_exchange_unavailable(session_factory):
+    _stage(session_factory, 2)
+    reset = AsyncMock()
+
+    async def get_exchange():
+        raise ConnectionError("broker down")
+
+    relay = _relay(session_factory, get_exchange, reset)
+    assert asyncio.run(relay.relay_batch()) == 0
+    assert _unsent(session_factory) == 2
+    reset.assert_awaited_once()
+
+
+def test_purge_sent_removes_old_rows(session_factory):
+    _stage(session_factory, 3)
+    db = session_factory()
+    rows = db.query(EventOutbox).order_by(EventOutbox.created_at).all()
+    now = datetime.now(timezone.utc)
+    rows[0].sent_at = now - timedelta(days=2)
+    rows[1].sent_at = now
+    db.commit()
+    db.close()
+
+    relay = _relay(session_factory, AsyncMock())
+    assert relay.purge_sent() == 1
+
+    db = session_factory()
+    assert db.query(EventOutbox).count() == 2
+    db.close()
+
+
+def test_add_event_uses_configured_content_type(session, monkeypatch):
+    msgpack = pytest.importorskip("msgpack")
+    monkeypatch.setattr(settings, "event_msgpack_routing_keys", {"user.logged_in"})
+    user_id = uuid.uuid4()
+
+    record = outbox.add_event(
+        session, "user.logged_in", UserLoggedInEvent(user_id=user_id)
+    )
+
+    assert record.content_type == "application/msgpack"
+    assert msgpack.unpackb(record.payload)["user_id"] == str(user_id)
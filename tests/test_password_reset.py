@@ -1,5 +1,5 @@
 import asyncio
-from unittest.mock import ANY, patch
+from unittest.mock import ANY
 
 import pytest
 from fastapi import BackgroundTasks
@@ -24,29 +24,30 @@ def create_user(session) -> User:
     return user
 
 
-def test_request_password_reset_creates_token_and_emits_event(session):
+def test_request_password_reset_creates_token_and_emits_event(session, outbox_events):
     user = create_user(session)
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event", emit_mock
-    ):
-        response = request_password_reset(
-            PasswordResetRequest(email=user.email), bg, db=session
-        )
-        asyncio.run(bg())
+    response = request_password_reset(
+        PasswordResetRequest(email=user.email), bg, db=session
+    )
+    asyncio.run(bg())
     assert response == {"message": "reset_requested"}
     token = session.query(PasswordResetToken).filter_by(user_id=user.id).first()
     assert token is not None
-    emit_mock.assert_called_once_with(
-        "user.password_reset_requested",
-        {
-            "event_id": ANY,
-            "timestamp": ANY,
-            "user_id": user.id,
-            "email": user.email,
-            "token": token.token,
-        },
-    )
+    assert outbox_events() == [
+        (
+            "user.password_reset_requested",
+            {
+                "schema_version": 1,
+                "event_id": ANY,
+                "timestamp": ANY,
+                "user_id": str(user.id),
+                "email": user.email,
+                "provider": None,
+                "token": token.token,
+            },
+        ),
+    ]
 
 
 def test_reset_password_updates_hash_and_marks_token_used(session):
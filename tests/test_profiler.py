@@ -0,0 +1,144 @@
+import asyncio
+import importlib
+import threading
+import time
+
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+
+from services import jwt as jwt_service
+from utils import profiler, token_store
+from utils.settings import settings
+
+
+def busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def run_busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+    thread.start()
+    return stop, thread
+
+
+def test_sampler_records_busy_thread_stacks():
+    stop, thread = run_busy_thread()
+    sampler = profiler.StackSampler(0.001)
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    stop.set()
+    thread.join()
+
+    collapsed = sampler.collapsed()
+    busy = [line for line in collapsed.splitlines() if line.startswith("busy;")]
+    assert busy
+    assert "busy_loop (tests/test_profiler.py:" in busy[0]
+    assert int(busy[0].rsplit(" ", 1)[1]) > 0
+
+    profile = sampler.speedscope()
+    frames = profile["shared"]["frames"]
+    (sampled,) = profile["profiles"]
+    assert sampled["type"] == "sampled"
+    assert len(sampled["samples"]) == len(sampled["weights"]) == len(sampler.samples)
+    assert any(frame["name"] == "busy_loop" for frame in frames)
+
+
+def test_route_filter_only_samples_matching_requests():
+    async def app(scope, receive, send):
+        await asyncio.sleep(0.05)
+
+    middleware = profiler.ProfilerRouteMiddleware(app)
+
+    async def scenario():
+        task = asyncio.create_task(
+            profiler.profile(0.2, interval=0.001, route="/v1/auth/items/{item_id}")
+        )
+        await asyncio.sleep(0.02)
+        await middleware({"type": "http", "path": "/other"}, None, None)
+        idle = profiler._route_filter.in_flight
+        await middleware({"type": "http", "path": "/v1/auth/items/7"}, None, None)
+        return idle, await task
+
+    idle, sampler = asyncio.run(scenario())
+
+    assert idle == 0
+    # Sampled only during the ~50ms of the matching request
+    assert 0 < sampler.sample_count < 150
+    assert profiler._route_filter is None
+
+
+def test_concurrent_profiles_are_rejected():
+    async def scenario():
+        first = asyncio.create_task(profiler.profile(0.05))
+        await asyncio.sleep(0)
+        with pytest.raises(profiler.ProfileInProgress):
+            await profiler.profile(0.05)
+        await first
+
+    asyncio.run(scenario())
+
+
+def _get_app(monkeypatch, enabled: bool):
+    monkeypatch.setattr(settings, "enable_profiler", enabled)
+    import main as main_mod
+
+    main_mod = importlib.reload(main_mod)
+
+    async def dummy_init(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(main_mod.FastAPILimiter, "init", dummy_init)
+    monkeypatch.setattr(main_mod.redis, "from_url", lambda *a, **k: None)
+    monkeypatch.setattr(
+        token_store, "_redis_client", fakeredis.FakeRedis(decode_responses=True)
+    )
+    return main_mod.app
+
+
+def _token(role: str) -> str:
+    return jwt_service.create_token(
+        user_id="u1", email="admin@example.com", role=role, provider="local"
+    )
+
+
+def test_profile_route_disabled_by_default(monkeypatch):
+    app = _get_app(monkeypatch, False)
+    with TestClient(app) as client:
+        response = client.get(
+            "/debug/profile",
+            headers={"Authorization": f"Bearer {_token('superadmin')}"},
+        )
+    assert response.status_code == 404
+
+
+def test_profile_route_requires_superadmin(monkeypatch):
+    app = _get_app(monkeypatch, True)
+    with TestClient(app) as client:
+        anonymous = client.get("/debug/profile")
+        client_role = client.get(
+            "/debug/profile",
+            headers={"Authorization": f"Bearer {_token('client')}"},
+        )
+    assert anonymous.status_code == 401
+    assert client_role.status_code == 403
+
+
+@pytest.mark.parametrize("output", ["collapsed", "speedscope"])
+def test_profile_route_returns_profile(monkeypatch, output):
+    app = _get_app(monkeypatch, True)
+    with TestClient(app) as client:
+        response = client.get(
+            "/debug/profile",
+            params={"seconds": 0.05, "interval": 0.001, "format": output},
+            headers={"Authorization": f"Bearer {_token('superadmin')}"},
+        )
+    assert response.status_code == 200
+    if output == "speedscope":
+        assert response.json()["profiles"][0]["type"] == "sampled"
+    else:
+        assert response.headers["content-type"].startswith("text/plain")
+        assert response.text.strip()
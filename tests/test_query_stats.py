@@ -0,0 +1,98 @@
+import importlib
+
+from fastapi import BackgroundTasks
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import routers.auth as auth_mod
+from database import Base
+from models import User
+from routers.auth import login
+from schemas.user import UserLogin
+from utils import hash_password
+from utils.metrics import db_statements_per_request
+from utils.query_stats import track_queries
+from utils.settings import settings
+
+
+class DummyRequest:
+    def __init__(self) -> None:
+        self.client = type("client", (), {"host": "127.0.0.1"})()
+        self.headers = {"user-agent": "pytest"}
+
+
+def _get_app(monkeypatch, session):
+    monkeypatch.setattr(settings, "enable_metrics", True)
+    monkeypatch.setattr(settings, "enable_server_timing", True)
+    import main as main_mod
+    main_mod = importlib.reload(main_mod)
+
+    async def dummy_init(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(main_mod.FastAPILimiter, "init", dummy_init)
+    monkeypatch.setattr(main_mod.redis, "from_url", lambda *a, **k: None)
+
+    def override_db():
+        yield session
+
+    main_mod.app.dependency_overrides[auth_mod.get_db] = override_db
+    return main_mod.app
+
+
+def test_track_queries_counts_statements(session):
+    with track_queries() as stats:
+        session.query(User).count()
+        session.query(User).first()
+    assert stats.count == 2
+    assert stats.duration > 0
+
+
+def test_login_query_budget(session, query_budget):
+    user = User(
+        email="budget@example.com",
+        hashed_password=hash_password("Secret123!"),
+        is_email_verified=True,
+    )
+    session.add(user)
+    session.commit()
+
+    creds = UserLogin(email=user.email, password="Secret123!")
+    # user lookup, failed-attempt count, login attempt and outbox inserts
+    with query_budget(4):
+        login(DummyRequest(), creds, BackgroundTasks(), db=session)
+
+
+def test_middleware_observes_route_and_sets_server_timing(monkeypatch):
+    engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+    connection = engine.connect()
+    session = sessionmaker(bind=connection)()
+    app = _get_app(monkeypatch, session)
+    route = "/v1/auth/verify-email"
+    before = db_statements_per_request.labels(route=route)._sum.get()
+
+    with TestClient(app) as client:
+        resp = client.get(route, params={"token": "missing"})
+
+    assert resp.status_code == 400
+    assert resp.headers["Server-Timing"].startswith("db;dur=")
+    assert '1 queries' in resp.headers["Server-Timing"]
+    assert db_statements_per_request.labels(route=route)._sum.get() == before + 1
+    session.close()
+    connection.close()
+    engine.dispose()
+
+
+def test_track_queries_records_failed_statements(session):
+    with track_queries() as stats:
+        try:
+            session.execute(text("SELECT * FROM missing_table"))
+        except OperationalError:
+            pass
+    assert stats.count == 1
+    assert stats.duration > 0
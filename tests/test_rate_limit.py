@@ -1,8 +1,22 @@
 import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException, Response
+from fastapi_limiter import FastAPILimiter, http_default_callback
 from starlette.requests import Request
 
-from utils.rate_limit import user_rate_limit_key
+from utils.metrics import rate_limit_rejections_counter
+from utils.rate_limit import (
+    MultiRuleRateLimiter,
+    RateLimitRule,
+    TieredRateLimiter,
+    client_ip_key,
+    email_key,
+    user_rate_limit_key,
+)
 from services import jwt as jwt_service
+from utils import token_store
 
 
 async def _receive_json(body: bytes):
@@ -17,6 +31,7 @@ def _make_request(headers=None, body=b"{}", method="GET"):
         "method": method,
         "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
         "client": ("127.0.0.1", 12345),
+        "state": {},
     }
     async def receive():
         return await _receive_json(body)
@@ -38,3 +53,155 @@ def test_identifier_from_body():
     req = _make_request(method="POST", body=body)
     key = asyncio.run(user_rate_limit_key(req))
     assert key.startswith("body@example.com:")
+
+
+def test_identifier_does_not_touch_token_store(monkeypatch):
+    token = jwt_service.create_token(
+        user_id="abc", email="t@example.com", role="client", provider="local"
+    )
+
+    def fail(*args, **kwargs):
+        raise AssertionError("rate limit key must not hit Redis")
+
+    monkeypatch.setattr(token_store, "get", fail)
+    monkeypatch.setattr(token_store, "is_revoked", fail)
+    req = _make_request(headers={"Authorization": f"Bearer {token}"})
+    assert asyncio.run(user_rate_limit_key(req)).startswith("abc:")
+
+
+def test_identifier_is_cached_per_request():
+    req = _make_request(method="POST", body=b'{"email": "once@example.com"}')
+
+    async def derive_twice():
+        first = await user_rate_limit_key(req)
+        req._json = {"email": "other@example.com"}
+        return first, await user_rate_limit_key(req)
+
+    first, second = asyncio.run(derive_twice())
+    assert first == second == "once@example.com:127.0.0.1"
+
+
+@pytest.fixture
+def limiter_redis(monkeypatch):
+    monkeypatch.setattr(FastAPILimiter, "redis", object())
+    monkeypatch.setattr(FastAPILimiter, "prefix", "test")
+    monkeypatch.setattr(FastAPILimiter, "http_callback", http_default_callback)
+
+
+def _limited(limiter, request, times=1):
+    async def call():
+        statuses = []
+        for _ in range(times):
+            try:
+                await limiter(request, Response())
+                statuses.append(200)
+            except HTTPException as exc:
+                statuses.append(exc.status_code)
+        return statuses
+
+    return asyncio.run(call())
+
+
+def test_tiered_limiter_rejects_locally_without_redis(limiter_redis, monkeypatch):
+    limiter = TieredRateLimiter(times=2, seconds=60, identifier=user_rate_limit_key)
+    check = AsyncMock(return_value=0)
+    monkeypatch.setattr(limiter, "_check", check)
+    local = rate_limit_rejections_counter.labels(tier="local")
+    local._value.set(0)
+
+    assert _limited(limiter, _make_request(), times=4) == [200, 200, 429, 429]
+    assert check.await_count == 2
+    assert local._value.get() == 2
+
+
+def test_tiered_limiter_remembers_global_rejections(limiter_redis, monkeypatch):
+    limiter = TieredRateLimiter(times=5, seconds=60, identifier=user_rate_limit_key)
+    check = AsyncMock(return_value=30_000)
+    monkeypatch.setattr(limiter, "_check", check)
+    global_ = rate_limit_rejections_counter.labels(tier="global")
+    global_._value.set(0)
+
+    assert _limited(limiter, _make_request(), times=3) == [429, 429, 429]
+    assert check.await_count == 1
+    assert global_._value.get() == 1
+
+
+def test_tiered_limiter_bucket_refills(limiter_redis, monkeypatch):
+    limiter = TieredRateLimiter(times=1, seconds=1, identifier=user_rate_limit_key)
+    monkeypatch.setattr(limiter, "_check", AsyncMock(return_value=0))
+    clock = [100.0]
+    monkeypatch.setattr("utils.rate_limit.time.monotonic", lambda: clock[0])
+
+    assert _limited(limiter, _make_request(), times=2) == [200, 429]
+    clock[0] += 1.0
+    assert _limited(limiter, _make_request()) == [200]
+
+
+@pytest.fixture
+def lua_redis(monkeypatch):
+    pytest.importorskip("lupa")
+    from fakeredis.aioredis import FakeRedis
+
+    monkeypatch.setattr(FastAPILimiter, "redis", FakeRedis())
+    monkeypatch.setattr(FastAPILimiter, "prefix", "test")
+    monkeypatch.setattr(FastAPILimiter, "http_callback", http_default_callback)
+    monkeypatch.setattr(MultiRuleRateLimiter, "_lua_sha", None)
+
+
+def _login_request(email: str):
+    return _make_request(method="POST", body=f'{{"email": "{email}"}}'.encode())
+
+
+def _call_rules(limiter, requests):
+    async def call():
+        results = []
+        for request in requests:
+            try:
+                await limiter(request, Response())
+                results.append(None)
+            except HTTPException as exc:
+                results.append(exc.headers["Retry-After"])
+        return results
+
+    return asyncio.run(call())
+
+
+def test_multi_rule_limiter_returns_tightest_retry_after(lua_redis):
+    limiter = MultiRuleRateLimiter(
+        "login",
+        RateLimitRule("ip", times=1, seconds=60, key=client_ip_key),
+        RateLimitRule("email", times=1, seconds=10, key=email_key),
+    )
+    results = _call_rules(
+        limiter, [_login_request("a@example.com"), _login_request("a@example.com")]
+    )
+    assert results == [None, "60"]
+
+
+def test_multi_rule_limiter_does_not_count_rejected_requests(lua_redis):
+    limiter = MultiRuleRateLimiter(
+        "login",
+        RateLimitRule("ip", times=2, seconds=60, key=client_ip_key),
+        RateLimitRule("email", times=1, seconds=60, key=email_key),
+    )
+    results = _call_rules(
+        limiter,
+        [
+            _login_request("a@example.com"),
+            _login_request("a@example.com"),
+            _login_request("b@example.com"),
+            _login_request("c@example.com"),
+        ],
+    )
+    # the rejected second request does not use up the per-IP allowance
+    assert results[:3] == [None, "60", None]
+    assert results[3] == "60"
+
+
+def test_multi_rule_limiter_reloads_flushed_script(lua_redis):
+    limiter = MultiRuleRateLimiter(
+        "login", RateLimitRule("ip", times=5, seconds=60, key=client_ip_key)
+    )
+    assert _call_rules(limiter, [_make_request()]) == [None]
+    asyncio.run(FastAPILimiter.redis.script_flush())
+    assert _call_rules(limiter, [_make_request()]) == [None]
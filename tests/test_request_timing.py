@@ -0,0 +1,94 @@
+import logging
+
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from services import jwt as jwt_service
+from utils import hash_password, token_store
+from utils.query_stats import QueryStatsMiddleware, install_query_hooks
+from utils.request_timing import RequestTimings, SlowRequestMiddleware, timed
+
+
+@pytest.fixture
+def app(monkeypatch):
+    install_query_hooks()
+    monkeypatch.setattr(
+        token_store, "_redis_client", fakeredis.FakeRedis(decode_responses=True)
+    )
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+
+    @app.get("/work/{item_id}")
+    def work(item_id: int):
+        hash_password("Secret123!")
+        jwt_service.create_token(
+            user_id=str(item_id), email="t@example.com", role="client", provider="local"
+        )
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return {"ok": True}
+
+    yield app
+    engine.dispose()
+
+
+def slow_records(caplog):
+    return [r for r in caplog.records if r.getMessage() == "slow_request"]
+
+
+def test_slow_request_logs_breakdown(app, caplog):
+    app.add_middleware(SlowRequestMiddleware, threshold_ms=0)
+
+    with caplog.at_level(logging.WARNING, logger="utils.request_timing"):
+        response = TestClient(app).get("/work/7")
+
+    assert response.status_code == 200
+    (record,) = slow_records(caplog)
+    assert record.endpoint == "/work/{item_id}"
+    assert record.method == "GET"
+    assert record.status == 200
+    timings = record.timings
+    assert timings["bcrypt_calls"] == 1
+    assert timings["bcrypt_ms"] > 0
+    assert timings["jwt_calls"] == 1
+    # create_token caches the new token in Redis
+    assert timings["redis_calls"] == 1
+    assert timings["db_queries"] == 1
+    assert record.duration_ms >= timings["bcrypt_ms"]
+
+
+def test_fast_request_is_not_logged(app, caplog):
+    app.add_middleware(SlowRequestMiddleware, threshold_ms=60_000)
+
+    with caplog.at_level(logging.WARNING, logger="utils.request_timing"):
+        TestClient(app).get("/work/7")
+
+    assert slow_records(caplog) == []
+
+
+def test_shares_sql_statistics_with_query_stats_middleware(app, caplog):
+    app.add_middleware(SlowRequestMiddleware, threshold_ms=0)
+    app.add_middleware(QueryStatsMiddleware, server_timing=True)
+
+    with caplog.at_level(logging.WARNING, logger="utils.request_timing"):
+        response = TestClient(app).get("/work/7")
+
+    (record,) = slow_records(caplog)
+    assert record.timings["db_queries"] == 1
+    assert '"1 queries"' in response.headers["Server-Timing"]
+
+
+def test_timed_is_a_passthrough_outside_requests():
+    calls = []
+
+    @timed("redis")
+    def fetch(value):
+        calls.append(value)
+        return value * 2
+
+    assert fetch(2) == 4
+    assert calls == [2]
+    assert RequestTimings().redis_calls == 0
@@ -0,0 +1,82 @@
+import asyncio
+
+from events.publisher import PendingEvent
+from events.retry import RetryScheduler
+from utils.metrics import event_dead_lettered_counter
+
+
+def _scheduler(redelivered, dead, **kwargs):
+    kwargs.setdefault("base_delay", 0.01)
+    return RetryScheduler(redelivered.extend, dead.append, **kwargs)
+
+
+def _failed(key: str, attempts: int = 1) -> PendingEvent:
+    event = PendingEvent(key, b"{}")
+    event.attempts = attempts
+    return event
+
+
+def test_backoff_grows_exponentially_with_bounded_jitter():
+    scheduler = RetryScheduler(
+        list, list, base_delay=1.0, max_delay=10.0, jitter=lambda: 1.0
+    )
+    assert [scheduler.backoff(n) for n in range(1, 6)] == [1, 2, 4, 8, 10]
+
+    scheduler._jitter = lambda: 0.0
+    assert scheduler.backoff(3) == 2.0
+
+
+def test_redelivers_due_events_in_order_with_one_timer():
+    redelivered, dead = [], []
+    scheduler = _scheduler(redelivered, dead, jitter=lambda: 0.0)
+
+    async def run():
+        late = _failed("user.late", attempts=3)
+        early = _failed("user.early", attempts=1)
+        scheduler.schedule(late)
+        scheduler.schedule(early)
+        assert len(scheduler) == 2
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert [e.routing_key for e in redelivered] == ["user.early", "user.late"]
+    assert len(scheduler) == 0
+    assert dead == []
+
+
+def test_dead_letters_after_max_attempts_and_max_age():
+    redelivered, dead = [], []
+    scheduler = _scheduler(redelivered, dead, max_attempts=3, max_age=60)
+    exhausted = event_dead_lettered_counter.labels(reason="attempts")
+    expired = event_dead_lettered_counter.labels(reason="max_age")
+    exhausted._value.set(0)
+    expired._value.set(0)
+
+    async def run():
+        assert not scheduler.schedule(_failed("user.exhausted", attempts=3))
+        old = _failed("user.old")
+        old.enqueued_at -= 120
+        assert not scheduler.schedule(old)
+
+    asyncio.run(run())
+    assert [e.routing_key for e in dead] == ["user.exhausted", "user.old"]
+    assert exhausted._value.get() == 1
+    assert expired._value.get() == 1
+    assert redelivered == []
+
+
+def test_drain_returns_pending_events_and_cancels_timer():
+    redelivered, dead = [], []
+    scheduler = _scheduler(redelivered, dead, base_delay=10, jitter=lambda: 0.0)
+
+    async def run():
+        scheduler.schedule(_failed("user.a"))
+        scheduler.schedule(_failed("user.b"))
+        drained = scheduler.drain()
+        await asyncio.sleep(0)
+        return drained
+
+    drained = asyncio.run(run())
+    assert [e.routing_key for e in drained] == ["user.a", "user.b"]
+    assert scheduler.next_due() is None
+    assert redelivered == []
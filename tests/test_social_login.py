@@ -1,5 +1,5 @@
 import asyncio
-from unittest.mock import ANY, patch
+from unittest.mock import ANY, AsyncMock, patch
 
 from fastapi import BackgroundTasks
 from utils.settings import settings
@@ -17,19 +17,19 @@ def test_social_login_url_generation(monkeypatch):
     assert "accounts.google.com" in response["login_url"]
 
 
-def test_social_callback_creates_user_and_returns_jwt(session):
+def test_social_callback_creates_user_and_returns_jwt(session, outbox_events):
     payload = SocialLogin(provider="google", token="dummy")
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event", emit_mock
-    ), patch("services.social.fetch_user_info") as fetch_mock:
-        fetch_mock.return_value = {
-            "email": "social@example.com",
-            "social_id": "123",
-            "avatar_url": "http://avatar",
-            "full_name": "Social User",
-        }
-        result = social_callback(payload, bg, db=session)
+    info = {
+        "email": "social@example.com",
+        "social_id": "123",
+        "avatar_url": "http://avatar",
+        "full_name": "Social User",
+    }
+    with patch(
+        "services.social.fetch_user_info_async", AsyncMock(return_value=info)
+    ):
+        result = asyncio.run(social_callback(payload, bg, db=session))
         asyncio.run(bg())
     assert "access_token" in result
     user = session.query(User).filter_by(provider="google").first()
@@ -38,13 +38,16 @@ def test_social_callback_creates_user_and_returns_jwt(session):
     assert decoded["sub"] == str(user.id)
     assert decoded["email"] == user.email
     assert decoded["provider"] == "google"
-    emit_mock.assert_called_once_with(
-        "user.logged_in",
-        {
-            "event_id": ANY,
-            "timestamp": ANY,
-            "user_id": user.id,
-            "email": user.email,
-            "provider": "google",
-        },
-    )
+    assert outbox_events() == [
+        (
+            "user.logged_in",
+            {
+                "schema_version": 1,
+                "event_id": ANY,
+                "timestamp": ANY,
+                "user_id": str(user.id),
+                "email": user.email,
+                "provider": "google",
+            },
+        ),
+    ]
@@ -0,0 +1,242 @@
+import asyncio
+import time
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from services import oidc
+from services import social as social_service
+from utils.settings import settings
+
+
+class StubProvider:
+    """Local OAuth provider answering token and userinfo requests."""
+
+    def __init__(self, userinfo: dict, id_token: str | None = None) -> None:
+        self.userinfo = userinfo
+        self.id_token = id_token
+        self.jwks: list[dict] = []
+        self.requests: list[httpx.Request] = []
+        self.transport = httpx.MockTransport(self.handle)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.method == "POST":
+            form = parse_qs(request.content.decode())
+            if form.get("code") != ["good-code"]:
+                return httpx.Response(400, json={"error": "invalid_grant"})
+            token = {
+                "access_token": "stub-access",
+                "token_type": "Bearer",
+                "expires_in": 3600,
+            }
+            if self.id_token:
+                token["id_token"] = self.id_token
+            return httpx.Response(200, json=token)
+        if str(request.url) == social_service.GOOGLE_DISCOVERY_URL:
+            return httpx.Response(
+                200,
+                json={"issuer": "https://accounts.google.com", "jwks_uri": JWKS_URL},
+            )
+        if str(request.url) == JWKS_URL:
+            return httpx.Response(
+                200, json={"keys": self.jwks}, headers={"Cache-Control": "max-age=600"}
+            )
+        if request.headers.get("Authorization") != "Bearer stub-access":
+            return httpx.Response(401)
+        return httpx.Response(200, json=self.userinfo)
+
+
+JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+
+
+def google_id_token(**overrides) -> tuple[str, dict]:
+    """Return an id_token signed by a fresh key and that key's public JWK."""
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    public["kid"] = "g-key"
+    claims = {
+        "iss": "https://accounts.google.com",
+        "aud": "id",
+        "sub": "g-1",
+        "email": "g@example.com",
+        "name": "G",
+        "picture": "http://p",
+        "exp": int(time.time()) + 300,
+    }
+    claims.update(overrides)
+    token = jwt.encode(
+        claims,
+        pem,
+        algorithm="RS256",
+        headers={"kid": "g-key"},
+        access_token="stub-access",
+    )
+    return token, public
+
+
+@pytest.fixture(autouse=True)
+def provider_settings(monkeypatch):
+    monkeypatch.setattr(settings, "google_client_id", "id")
+    monkeypatch.setattr(settings, "google_client_secret", "secret")
+    monkeypatch.setattr(settings, "google_redirect_uri", "http://localhost")
+    monkeypatch.setattr(settings, "facebook_client_id", "id")
+    monkeypatch.setattr(settings, "facebook_client_secret", "secret")
+    monkeypatch.setattr(settings, "facebook_redirect_uri", "http://localhost")
+    monkeypatch.setattr(
+        social_service,
+        "google_keys",
+        oidc.JWKSCache(
+            social_service.GOOGLE_DISCOVERY_URL,
+            transport=lambda: social_service.get_transport("google"),
+        ),
+    )
+    yield
+    social_service.close_transports()
+    asyncio.run(social_service.aclose_transports())
+
+
+def test_google_user_info_from_stub_provider():
+    stub = StubProvider(
+        {"sub": "g-1", "email": "g@example.com", "name": "G", "picture": "http://p"}
+    )
+    social_service.set_transport("google", stub.transport)
+
+    info = social_service.fetch_user_info("google", "good-code")
+
+    assert info == {
+        "email": "g@example.com",
+        "social_id": "g-1",
+        "avatar_url": "http://p",
+        "full_name": "G",
+    }
+    assert [str(r.url) for r in stub.requests] == [
+        social_service.GOOGLE_TOKEN_URL,
+        social_service.GOOGLE_USERINFO_URL,
+    ]
+
+
+def test_facebook_user_info_from_stub_provider():
+    stub = StubProvider(
+        {
+            "id": "f-1",
+            "email": "f@example.com",
+            "name": "F",
+            "picture": {"data": {"url": "http://fp"}},
+        }
+    )
+    social_service.set_transport("facebook", stub.transport)
+
+    info = social_service.fetch_user_info("facebook", "good-code")
+
+    assert info["social_id"] == "f-1"
+    assert info["avatar_url"] == "http://fp"
+    assert stub.requests[1].url.params["fields"].startswith("id,name,email")
+
+
+def test_failed_code_exchange_raises():
+    stub = StubProvider({})
+    social_service.set_transport("google", stub.transport)
+
+    with pytest.raises(Exception):
+        social_service.fetch_user_info("google", "bad-code")
+    assert len(stub.requests) == 1
+
+
+def test_clients_share_one_pooled_transport_per_provider():
+    google = social_service.get_transport("google")
+    assert social_service.get_transport("google") is google
+    assert social_service.get_transport("facebook") is not google
+    assert social_service.get_client("google")._transport is google
+    assert social_service.get_client("google").timeout.connect == (
+        settings.oauth_connect_timeout
+    )
+    pool = google._pool
+    assert pool._max_connections == settings.oauth_max_connections
+    assert pool._keepalive_expiry == settings.oauth_keepalive_expiry
+
+
+def test_async_user_info_matches_sync_parsing():
+    stub = StubProvider(
+        {"sub": "g-1", "email": "g@example.com", "name": "G", "picture": "http://p"}
+    )
+    social_service.set_async_transport("google", stub.transport)
+
+    info = asyncio.run(social_service.fetch_user_info_async("google", "good-code"))
+
+    assert info == {
+        "email": "g@example.com",
+        "social_id": "g-1",
+        "avatar_url": "http://p",
+        "full_name": "G",
+    }
+    assert [r.method for r in stub.requests] == ["POST", "GET"]
+
+
+def test_async_failed_code_exchange_raises():
+    stub = StubProvider({})
+    social_service.set_async_transport("facebook", stub.transport)
+
+    with pytest.raises(Exception):
+        asyncio.run(social_service.fetch_user_info_async("facebook", "bad-code"))
+    assert len(stub.requests) == 1
+
+
+def test_async_clients_share_one_pooled_transport_per_provider():
+    google = social_service.get_async_transport("google")
+    assert social_service.get_async_transport("google") is google
+    assert social_service.get_async_client("google")._transport is google
+    assert google._pool._max_connections == settings.oauth_max_connections
+
+
+def test_google_id_token_skips_userinfo_request():
+    token, public = google_id_token()
+    stub = StubProvider({}, id_token=token)
+    stub.jwks = [public]
+    social_service.set_transport("google", stub.transport)
+
+    info = social_service.fetch_user_info("google", "good-code")
+    info_again = social_service.fetch_user_info("google", "good-code")
+
+    assert info == info_again == {
+        "email": "g@example.com",
+        "social_id": "g-1",
+        "avatar_url": "http://p",
+        "full_name": "G",
+    }
+    assert social_service.GOOGLE_USERINFO_URL not in [str(r.url) for r in stub.requests]
+    # Discovery and keys are fetched once, then only the code exchange remains
+    assert [r.method for r in stub.requests] == ["POST", "GET", "GET", "POST"]
+
+
+def test_async_google_id_token_skips_userinfo_request():
+    token, public = google_id_token()
+    stub = StubProvider({}, id_token=token)
+    stub.jwks = [public]
+    social_service.set_transport("google", stub.transport)
+    social_service.set_async_transport("google", stub.transport)
+
+    info = asyncio.run(social_service.fetch_user_info_async("google", "good-code"))
+
+    assert info["social_id"] == "g-1"
+    assert social_service.GOOGLE_USERINFO_URL not in [str(r.url) for r in stub.requests]
+
+
+def test_google_id_token_for_other_client_is_rejected():
+    token, public = google_id_token(aud="another-client")
+    stub = StubProvider({"sub": "g-1", "email": "g@example.com"}, id_token=token)
+    stub.jwks = [public]
+    social_service.set_transport("google", stub.transport)
+
+    with pytest.raises(Exception):
+        social_service.fetch_user_info("google", "good-code")
+    assert social_service.GOOGLE_USERINFO_URL not in [str(r.url) for r in stub.requests]
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from prometheus_client import REGISTRY
+
+from models import User
+from routers.auth import login
+from schemas.user import UserLogin
+from utils import hash_password
+from utils.stage_timing import StageTimer
+
+
+class DummyRequest:
+    def __init__(self) -> None:
+        self.client = type("client", (), {"host": "127.0.0.1"})()
+        self.headers = {"user-agent": "pytest"}
+
+
+def stage_count(endpoint: str, stage: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "bee_auth_stage_duration_seconds_count",
+        {"endpoint": endpoint, "stage": stage},
+    )
+    return value or 0.0
+
+
+def test_mark_observes_time_since_previous_mark():
+    before = stage_count("unit", "first"), stage_count("unit", "second")
+    timer = StageTimer("unit")
+    timer.mark("first")
+    timer.mark("second")
+    timer.mark("second")
+
+    assert stage_count("unit", "first") == before[0] + 1
+    assert stage_count("unit", "second") == before[1] + 2
+
+
+def test_login_records_each_stage(session):
+    user = User(
+        email="stages@example.com",
+        hashed_password=hash_password("Secret123!"),
+        is_email_verified=True,
+    )
+    session.add(user)
+    session.commit()
+    stages = (
+        "user_lookup",
+        "failure_count",
+        "password_verify",
+        "record_attempt",
+        "jwt_sign",
+    )
+    before = {stage: stage_count("login", stage) for stage in stages}
+
+    bg = BackgroundTasks()
+    creds = UserLogin(email=user.email, password="Secret123!")
+    login(DummyRequest(), creds, bg, db=session)
+    asyncio.run(bg())
+
+    assert {stage: stage_count("login", stage) - before[stage] for stage in stages} == {
+        stage: 1 for stage in stages
+    }
+
+
+def test_failed_login_stops_at_the_failing_stage(session):
+    before_verify = stage_count("login", "password_verify")
+    before_jwt = stage_count("login", "jwt_sign")
+
+    with pytest.raises(HTTPException):
+        login(
+            DummyRequest(),
+            UserLogin(email="nobody@example.com", password="Secret123!"),
+            BackgroundTasks(),
+            db=session,
+        )
+
+    assert stage_count("login", "password_verify") == before_verify + 1
+    assert stage_count("login", "jwt_sign") == before_jwt
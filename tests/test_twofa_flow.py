@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta, timezone
 
 import asyncio
-from unittest.mock import ANY, patch
+from unittest.mock import ANY
 
 from fastapi import BackgroundTasks
 from routers.auth import login, verify_twofa
@@ -31,16 +31,13 @@ def create_verified_user(session):
     return user
 
 
-def test_login_returns_twofa_token(session):
+def test_login_returns_twofa_token(session, outbox_events):
     user = create_verified_user(session)
     req = DummyRequest()
     credentials = UserLogin(email=user.email, password="Secret123!")
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event", emit_mock
-    ):
-        response = login(req, credentials, bg, db=session)
-        asyncio.run(bg())
+    response = login(req, credentials, bg, db=session)
+    asyncio.run(bg())
     assert response["message"] == "2fa_required"
     token_value = response["twofa_token"]
     record = session.query(TwoFAToken).filter_by(token=token_value).first()
@@ -50,40 +47,43 @@ def test_login_returns_twofa_token(session):
     assert not record.is_used
     delta = record.expires_at.replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)
     assert timedelta(0) < delta <= timedelta(minutes=5)
-    emit_mock.assert_called_once_with(
-        "user.2fa_requested",
-        {
-            "event_id": ANY,
-            "timestamp": ANY,
-            "user_id": user.id,
-            "email": user.email,
-            "provider": "local",
-        },
-    )
+    assert outbox_events() == [
+        (
+            "user.2fa_requested",
+            {
+                "schema_version": 1,
+                "event_id": ANY,
+                "timestamp": ANY,
+                "user_id": str(user.id),
+                "email": user.email,
+                "provider": "local",
+            },
+        ),
+    ]
 
 
-def test_verify_twofa_marks_token_used_and_returns_jwt(session):
+def test_verify_twofa_marks_token_used_and_returns_jwt(session, outbox_events):
     user = create_verified_user(session)
     token = auth_service.create_twofa_token(session, user)
     assert len(token.token) == 12
     code = pyotp.TOTP(user.totp_secret).now()
     payload = TwoFAVerify(twofa_token=token.token, totp_code=code)
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event", emit_mock
-    ):
-        response = verify_twofa(payload, bg, db=session)
-        asyncio.run(bg())
+    response = verify_twofa(payload, bg, db=session)
+    asyncio.run(bg())
     assert "access_token" in response
     session.refresh(token)
     assert token.is_used is True
-    emit_mock.assert_called_once_with(
-        "user.logged_in",
-        {
-            "event_id": ANY,
-            "timestamp": ANY,
-            "user_id": user.id,
-            "email": user.email,
-            "provider": "local",
-        },
-    )
+    assert outbox_events() == [
+        (
+            "user.logged_in",
+            {
+                "schema_version": 1,
+                "event_id": ANY,
+                "timestamp": ANY,
+                "user_id": str(user.id),
+                "email": user.email,
+                "provider": "local",
+            },
+        ),
+    ]
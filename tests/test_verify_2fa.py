@@ -1,5 +1,5 @@
 import asyncio
-from unittest.mock import ANY, patch
+from unittest.mock import ANY
 
 import pytest
 from pydantic import ValidationError
@@ -32,45 +32,42 @@ def create_twofa_user(session) -> User:
     return user
 
 
-def test_login_returns_twofa_token(session):
+def test_login_returns_twofa_token(session, outbox_events):
     user = create_twofa_user(session)
     req = DummyRequest()
     creds = UserLogin(email=user.email, password="Secret123!")
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event", emit_mock
-    ):
-        result = login(req, creds, bg, db=session)
-        asyncio.run(bg())
+    result = login(req, creds, bg, db=session)
+    asyncio.run(bg())
     assert result["message"] == "2fa_required"
     token = session.query(TwoFAToken).filter_by(user_id=user.id).first()
     assert token is not None
     assert len(token.token) == 12
     assert result["twofa_token"] == token.token
-    emit_mock.assert_called_once_with(
-        "user.2fa_requested",
-        {
-            "event_id": ANY,
-            "timestamp": ANY,
-            "user_id": user.id,
-            "email": user.email,
-            "provider": "local",
-        },
-    )
+    assert outbox_events() == [
+        (
+            "user.2fa_requested",
+            {
+                "schema_version": 1,
+                "event_id": ANY,
+                "timestamp": ANY,
+                "user_id": str(user.id),
+                "email": user.email,
+                "provider": "local",
+            },
+        ),
+    ]
 
 
-def test_verify_twofa_returns_jwt_and_marks_used(session):
+def test_verify_twofa_returns_jwt_and_marks_used(session, outbox_events):
     user = create_twofa_user(session)
     token = auth_service.create_twofa_token(session, user)
     assert len(token.token) == 12
     code = pyotp.TOTP(user.totp_secret).now()
     payload = TwoFAVerify(twofa_token=token.token, totp_code=code)
     bg = BackgroundTasks()
-    with patch("events.rabbitmq.emit_event") as emit_mock, patch(
-        "routers.auth.emit_event", emit_mock
-    ):
-        response = verify_twofa(payload, bg, db=session)
-        asyncio.run(bg())
+    response = verify_twofa(payload, bg, db=session)
+    asyncio.run(bg())
     assert "access_token" in response
     jwt_payload = jwt_service.decode_token(response["access_token"])
     assert jwt_payload["sub"] == str(user.id)
@@ -78,16 +75,19 @@ def test_verify_twofa_returns_jwt_and_marks_used(session):
     assert jwt_payload["provider"] == "local"
     session.refresh(token)
     assert token.is_used is True
-    emit_mock.assert_called_once_with(
-        "user.logged_in",
-        {
-            "event_id": ANY,
-            "timestamp": ANY,
-            "user_id": user.id,
-            "email": user.email,
-            "provider": "local",
-        },
-    )
+    assert outbox_events() == [
+        (
+            "user.logged_in",
+            {
+                "schema_version": 1,
+                "event_id": ANY,
+                "timestamp": ANY,
+                "user_id": str(user.id),
+                "email": user.email,
+                "provider": "local",
+            },
+        ),
+    ]
 
 
 def test_verify_twofa_invalid_token(session):
@@ -1,42 +1,219 @@
+"""Error alerts sent to Alertmanager.
+
+Errors from every worker are counted in a fixed Redis window, so the
+threshold applies to the whole deployment rather than to each process.
+Once the window crosses ``ERROR_ALERT_THRESHOLD`` each distinct exception
+(identified by its fingerprint: type and innermost frames, not the
+message) is alerted at most once per ``ERROR_ALERT_DEDUP_SECONDS`` across
+workers. Alerts are queued and posted in batches by a background task on
+one shared ``httpx.AsyncClient``, so the request that failed never waits
+on Alertmanager. Without Redis the window and dedup fall back to this
+process.
+"""
+
+from __future__ import annotations
+
 import asyncio
-import json
-from urllib import request as urlrequest
-from urllib.parse import urljoin
+import hashlib
+import logging
+import time
+import traceback
+from typing import Any, Dict
+
+import httpx
 
 from .metrics import error_counter
 from .settings import settings
 
-ALERTMANAGER_URL = settings.alertmanager_url
-ERROR_ALERT_THRESHOLD = settings.error_alert_threshold
+logger = logging.getLogger(__name__)
 
+ALERTS_PATH = "/api/v1/alerts"
+WINDOW_PREFIX = "alerts:errors:"
+DEDUP_PREFIX = "alerts:fingerprint:"
 
-def _post_alert(payload: str) -> None:
-    if not ALERTMANAGER_URL:
-        return
-    req = urlrequest.Request(
-        urljoin(ALERTMANAGER_URL, "/api/v1/alerts"),
-        data=payload.encode(),
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    try:
-        urlrequest.urlopen(req, timeout=5)
-    except Exception:
-        pass
 
+def exception_fingerprint(exc: BaseException, frames: int = 3) -> str:
+    """Return a stable id for ``exc`` from its type and innermost frames."""
+    parts = [f"{type(exc).__module__}.{type(exc).__qualname__}"]
+    for frame in traceback.extract_tb(exc.__traceback__)[-frames:]:
+        parts.append(f"{frame.filename}:{frame.name}:{frame.lineno}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
 
-async def alert_if_needed(exc: Exception) -> None:
-    """Send alert to AlertManager when error count reaches threshold."""
-    error_counter.inc()
-    current = error_counter._value.get()
-    if ALERTMANAGER_URL and current % ERROR_ALERT_THRESHOLD == 0:
-        payload = json.dumps(
-            [
-                {
-                    "labels": {"alertname": "AuthServiceErrors"},
-                    "annotations": {"summary": str(exc)},
-                }
-            ]
-        )
-        await asyncio.to_thread(_post_alert, payload)
 
+class AlertAggregator:
+    """Count errors per window and post deduplicated alerts in batches."""
+
+    def __init__(
+        self,
+        url: str | None,
+        *,
+        threshold: int = 10,
+        window: float = 60.0,
+        dedup_ttl: float = 300.0,
+        flush_interval: float = 1.0,
+        max_batch: int = 50,
+        redis=None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        clock=time.time,
+    ) -> None:
+        self.url = url
+        self.threshold = threshold
+        self.window = window
+        self.dedup_ttl = dedup_ttl
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        # redis.asyncio client shared with the rate limiter, set on startup
+        self.redis = redis
+        self._transport = transport
+        self._clock = clock
+        self._client: httpx.AsyncClient | None = None
+        self._pending: Dict[str, dict] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._local_windows: Dict[int, int] = {}
+        self._local_seen: Dict[str, float] = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def record(self, exc: BaseException) -> bool:
+        """Count ``exc``; return ``True`` if it queued a new alert."""
+        error_counter.inc()
+        if not self.url:
+            return False
+        fingerprint = exception_fingerprint(exc)
+        count = await self._count_error()
+        if count < self.threshold or fingerprint in self._pending:
+            return False
+        if not await self._claim(fingerprint):
+            return False
+        self._pending[fingerprint] = self._alert(exc, fingerprint, count)
+        self._ensure_flusher()
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    async def flush(self) -> None:
+        """Post every queued alert now."""
+        while self._pending:
+            batch = list(self._pending.values())[: self.max_batch]
+            for alert in batch:
+                self._pending.pop(alert["labels"]["fingerprint"], None)
+            await self._post(batch)
+
+    async def close(self) -> None:
+        """Stop the flusher, send what is queued and close the HTTP client."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.flush()
+        finally:
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+
+    async def _count_error(self) -> int:
+        bucket = int(self._clock() // self.window)
+        if self.redis is not None:
+            key = f"{WINDOW_PREFIX}{bucket}"
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    pipe.incr(key)
+                    pipe.expire(key, int(self.window * 2))
+                    count, _ = await pipe.execute()
+                return int(count)
+            except Exception:
+                logger.warning("Alert window unavailable in Redis", exc_info=True)
+        for old in [b for b in self._local_windows if b < bucket]:
+            del self._local_windows[old]
+        count = self._local_windows.get(bucket, 0) + 1
+        self._local_windows[bucket] = count
+        return count
+
+    async def _claim(self, fingerprint: str) -> bool:
+        """Return ``True`` if no worker alerted ``fingerprint`` recently."""
+        if self.redis is not None:
+            try:
+                claimed = await self.redis.set(
+                    f"{DEDUP_PREFIX}{fingerprint}",
+                    1,
+                    nx=True,
+                    ex=max(1, int(self.dedup_ttl)),
+                )
+                return bool(claimed)
+            except Exception:
+                logger.warning("Alert dedup unavailable in Redis", exc_info=True)
+        now = self._clock()
+        if now - self._local_seen.get(fingerprint, float("-inf")) < self.dedup_ttl:
+            return False
+        self._local_seen[fingerprint] = now
+        return True
+
+    def _alert(self, exc: BaseException, fingerprint: str, count: int) -> dict:
+        return {
+            "labels": {
+                "alertname": "AuthServiceErrors",
+                "exception": type(exc).__name__,
+                "fingerprint": fingerprint,
+            },
+            "annotations": {
+                "summary": str(exc),
+                "description": f"{count} errors in the last {self.window:g}s",
+            },
+        }
+
+    def _ensure_flusher(self) -> None:
+        task = self._task
+        if (
+            task is None
+            or task.done()
+            or task.get_loop() is not asyncio.get_running_loop()
+        ):
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:  # pragma: no cover - _post logs its own errors
+                logger.warning("Failed to flush alerts", exc_info=True)
+            if not self._pending:
+                self._task = None
+                return
+
+    async def _post(self, batch: list[dict[str, Any]]) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.url, transport=self._transport, timeout=5.0
+            )
+        try:
+            response = await self._client.post(ALERTS_PATH, json=batch)
+            response.raise_for_status()
+        except Exception:
+            logger.warning("Failed to post %d alerts", len(batch), exc_info=True)
+
+
+aggregator = AlertAggregator(
+    settings.alertmanager_url,
+    threshold=settings.error_alert_threshold,
+    window=settings.error_alert_window_seconds,
+    dedup_ttl=settings.error_alert_dedup_seconds,
+    flush_interval=settings.error_alert_flush_interval,
+)
+
+
+async def alert_if_needed(exc: Exception) -> None:
+    """Count an unhandled error and queue an alert past the threshold."""
+    await aggregator.record(exc)
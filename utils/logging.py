@@ -1,29 +1,149 @@
+"""Structured JSON logging written from a background thread.
+
+``configure_logging`` installs a ``QueueHandler`` on the root logger: the
+calling thread or event loop only renders the message and puts the record
+on a bounded queue, and a ``QueueListener`` thread encodes it to JSON and
+writes it. When the queue is full the record is dropped and counted in
+``bee_auth_log_records_dropped_total`` instead of blocking the request.
+
+``LOG_SAMPLE_RATES`` keeps only a fraction of chatty info messages, e.g.
+``event_published=0.01``; warnings and errors are never sampled. Records
+are encoded with ``orjson`` when it is installed and pydantic-core
+otherwise.
+"""
+
+import atexit
+import copy
 import logging
-import json
+import queue
+import random
 from datetime import datetime, timezone
-from typing import Any, Dict
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict
+
+from pydantic_core import to_json
+
+from .metrics import log_records_dropped_counter
+from .settings import settings
+
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _dumps(value: Dict[str, Any]) -> str:
+    if orjson is not None:
+        return orjson.dumps(value, default=str).decode()
+    return to_json(value, fallback=str).decode()
 
 
 class JSONFormatter(logging.Formatter):
     """Format log records as JSON with optional contextual fields."""
 
     def format(self, record: logging.LogRecord) -> str:
+        # Records are formatted later on the listener thread, so stamp them
+        # with their creation time rather than the time of formatting
+        created = datetime.fromtimestamp(record.created, timezone.utc)
         log_record: Dict[str, Any] = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": created.isoformat(),
             "level": record.levelname,
             "message": record.getMessage(),
         }
-        for field in ("user_id", "ip", "endpoint"):
+        for field in (
+            "user_id",
+            "ip",
+            "endpoint",
+            "method",
+            "status",
+            "duration_ms",
+            "timings",
+        ):
             if hasattr(record, field):
                 log_record[field] = getattr(record, field)
-        return json.dumps(log_record)
+        if record.exc_text:
+            log_record["exception"] = record.exc_text
+        return _dumps(log_record)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of the info records of selected messages.
+
+    ``rates`` maps a message format string (``record.msg``) to the fraction
+    of its records to keep.
+    """
+
+    def __init__(
+        self, rates: Dict[str, float], rand: Callable[[], float] = random.random
+    ) -> None:
+        super().__init__()
+        self.rates = rates
+        self._rand = rand
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        rate = self.rates.get(record.msg)
+        if rate is None or self._rand() < rate:
+            return True
+        log_records_dropped_counter.labels(reason="sampled").inc()
+        return False
+
+
+class BoundedQueueHandler(QueueHandler):
+    """``QueueHandler`` that drops records instead of blocking when full."""
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render what depends on the caller (arguments, traceback) here and
+        # leave JSON encoding to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_counter.labels(reason="queue_full").inc()
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room instead of failing when the bounded queue is full
+        self.queue.put(self._sentinel)
+
+
+_listener: QueueListener | None = None
+
+
+def stop_logging() -> None:
+    """Write the queued records and stop the listener thread."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
 
 
 def configure_logging() -> None:
     """Configure root logger to output JSON formatted logs to stdout."""
-    handler = logging.StreamHandler()
-    handler.setFormatter(JSONFormatter())
+    global _listener
+    stop_logging()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JSONFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+    handler = BoundedQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(settings.log_sample_rates))
+    _listener = _Listener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
     root = logging.getLogger()
     root.setLevel(logging.INFO)
     root.handlers = [handler]
 
+
+atexit.register(stop_logging)
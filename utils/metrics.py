@@ -1,6 +1,10 @@
-"""Prometheus metrics for observability."""
+"""Prometheus metrics for observability.
 
-from prometheus_client import Counter, Histogram
+Under gunicorn the metrics run in multiprocess mode (see
+``gunicorn.conf.py``); gauges declare how worker values are merged.
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
 
 login_success_counter = Counter(
     "bee_auth_logins_total",
@@ -41,3 +45,113 @@ twofa_token_generated_counter = Counter(
     "bee_auth_twofa_tokens_generated_total",
     "Total number of generated 2FA tokens",
 )
+
+# SQL statements executed per request, labelled by route template
+db_statements_per_request = Histogram(
+    "bee_auth_db_statements_per_request",
+    "Number of SQL statements executed per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50),
+)
+
+# Total database time per request in seconds
+db_time_per_request = Histogram(
+    "bee_auth_db_time_per_request_seconds",
+    "Total time spent executing SQL statements per request",
+    ["route"],
+)
+
+# Events waiting in the in-memory publisher queue
+event_queue_depth = Gauge(
+    "bee_auth_event_queue_depth",
+    "Number of events waiting to be published",
+    multiprocess_mode="livesum",
+)
+
+# Time from enqueueing an event until the broker confirms it
+event_publish_latency = Histogram(
+    "bee_auth_event_publish_latency_seconds",
+    "Time from enqueue to broker confirm for published events",
+)
+
+# Publishes that were not confirmed by the broker
+event_confirm_failures_counter = Counter(
+    "bee_auth_event_confirm_failures_total",
+    "Total number of event publishes not confirmed by the broker",
+)
+
+# Events discarded because the queue was full or retries were exhausted
+event_dropped_counter = Counter(
+    "bee_auth_events_dropped_total",
+    "Total number of events dropped by the publisher",
+)
+
+# Events waiting in the retry scheduler
+event_retry_pending = Gauge(
+    "bee_auth_event_retry_pending",
+    "Number of events scheduled for redelivery",
+    multiprocess_mode="livesum",
+)
+
+# Events given up on by the retry scheduler, by reason
+event_dead_lettered_counter = Counter(
+    "bee_auth_events_dead_lettered_total",
+    "Total number of events that exhausted their retry policy",
+    ["reason"],
+)
+
+# Events written to the disk spool because they could not be delivered
+event_spooled_counter = Counter(
+    "bee_auth_events_spooled_total",
+    "Total number of events written to the disk spool",
+)
+
+# Current spool depth in bytes and events; each worker counts its own spool
+# subdirectory (including segments adopted from exited workers), so the
+# live workers' values add up to the total
+event_spool_bytes = Gauge(
+    "bee_auth_event_spool_bytes",
+    "Size of the event spool on disk in bytes",
+    multiprocess_mode="livesum",
+)
+
+event_spool_events = Gauge(
+    "bee_auth_event_spool_events",
+    "Number of events waiting in the disk spool",
+    multiprocess_mode="livesum",
+)
+
+# Events rejected because the spool reached its size cap
+event_spool_dropped_counter = Counter(
+    "bee_auth_event_spool_dropped_total",
+    "Total number of events rejected by a full spool",
+)
+
+# Outbox rows published by the relay
+outbox_published_counter = Counter(
+    "bee_auth_outbox_published_total",
+    "Total number of outbox events published by the relay",
+)
+
+# Rate limited requests, by the tier that rejected them (local or global)
+rate_limit_rejections_counter = Counter(
+    "bee_auth_rate_limit_rejections_total",
+    "Total number of requests rejected by the rate limiter",
+    ["tier"],
+)
+
+# Time spent in each step of the authentication endpoints
+auth_stage_latency = Histogram(
+    "bee_auth_stage_duration_seconds",
+    "Time spent in each stage of an authentication request",
+    ["endpoint", "stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+# Log records discarded before being written: the log queue was full or
+# the message was sampled out
+log_records_dropped_counter = Counter(
+    "bee_auth_log_records_dropped_total",
+    "Total number of log records that were not written",
+    ["reason"],
+)
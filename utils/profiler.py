@@ -0,0 +1,213 @@
+"""In-process statistical stack sampler for the debug profile endpoint.
+
+``StackSampler`` runs on a daemon thread and, every ``interval`` seconds,
+records the Python stack of every other thread in the worker through
+``sys._current_frames``. Identical stacks are counted once, so memory
+grows with the number of distinct stacks rather than with the duration.
+Results are exported as collapsed stacks (one ``frame;frame;frame count``
+line per stack, for flamegraph.pl and speedscope) or as a speedscope JSON
+profile.
+
+With a ``route`` filter, samples are only taken while at least one request
+matching that route template is in flight in this worker. Other requests
+running at the same time still show up in those samples; the filter
+narrows the window, it does not isolate a request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Tuple
+
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+Frame = Tuple[str, str, int]
+
+_ROOT = os.getcwd() + os.sep
+
+
+def _frame_info(code) -> Frame:
+    filename = code.co_filename
+    if filename.startswith(_ROOT):
+        filename = filename[len(_ROOT):]
+    return (code.co_name, filename, code.co_firstlineno)
+
+
+class StackSampler:
+    """Sample the stacks of all other threads at a fixed interval."""
+
+    def __init__(
+        self,
+        interval: float = 0.005,
+        *,
+        should_sample: Callable[[], bool] | None = None,
+    ) -> None:
+        self.interval = interval
+        self.should_sample = should_sample
+        self.samples: Counter[Tuple[Frame, ...]] = Counter()
+        self.sample_count = 0
+        self.duration = 0.0
+        self._frames: Dict[object, Frame] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if self.should_sample is not None and not self.should_sample():
+                continue
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    info = self._frames.get(code)
+                    if info is None:
+                        info = self._frames[code] = _frame_info(code)
+                    stack.append(info)
+                    frame = frame.f_back
+                stack.append((names.get(ident, f"thread-{ident}"), "", 0))
+                stack.reverse()
+                self.samples[tuple(stack)] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        """Return the samples in Brendan Gregg's collapsed stack format."""
+        lines = []
+        for stack, count in self.samples.most_common():
+            labels = [stack[0][0]] + [
+                f"{name} ({filename}:{line})" for name, filename, line in stack[1:]
+            ]
+            lines.append(f"{';'.join(labels)} {count}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def speedscope(self, name: str = "bee_auth profile") -> dict:
+        """Return the samples as a speedscope ``sampled`` profile."""
+        index: Dict[Frame, int] = {}
+        frames = []
+        samples = []
+        weights = []
+        for stack, count in self.samples.items():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    entry = {"name": frame[0]}
+                    if frame[1]:
+                        entry.update(file=frame[1], line=frame[2])
+                    frames.append(entry)
+                ids.append(index[frame])
+            samples.append(ids)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "bee_auth_service",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+
+class _RouteFilter:
+    """Count in-flight requests whose path matches a route template."""
+
+    def __init__(self, route: str) -> None:
+        self.route = route
+        self.regex = compile_path(route)[0]
+        self.in_flight = 0
+
+    def matches(self, scope: Scope) -> bool:
+        return self.regex.match(scope["path"]) is not None
+
+    def active(self) -> bool:
+        return self.in_flight > 0
+
+
+_profile_lock = threading.Lock()
+_route_filter: _RouteFilter | None = None
+
+
+class ProfileInProgress(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+async def profile(
+    seconds: float, *, interval: float = 0.005, route: str | None = None
+) -> StackSampler:
+    """Sample this worker for ``seconds`` and return the stopped sampler."""
+    global _route_filter
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfileInProgress("A profile is already running in this worker")
+    try:
+        route_filter = _RouteFilter(route) if route else None
+        sampler = StackSampler(
+            interval, should_sample=route_filter.active if route_filter else None
+        )
+        _route_filter = route_filter
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+            _route_filter = None
+        return sampler
+    finally:
+        _profile_lock.release()
+
+
+class ProfilerRouteMiddleware:
+    """Track requests matching the route filter of the running profile.
+
+    Costs one global lookup per request while no filtered profile runs.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route_filter = _route_filter
+        if (
+            route_filter is None
+            or scope["type"] != "http"
+            or not route_filter.matches(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+        route_filter.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_filter.in_flight -= 1
@@ -0,0 +1,107 @@
+"""Per-request SQL statement counting and timing."""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.middleware.base import (
+    BaseHTTPMiddleware,
+    RequestResponseEndpoint,
+)
+from starlette.requests import Request
+from starlette.types import ASGIApp
+
+from .metrics import db_statements_per_request, db_time_per_request
+
+
+class QueryStats:
+    """Number of statements and total database time for one unit of work."""
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current_stats.get() is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def _record(context) -> None:
+    stats = _current_stats.get()
+    start = getattr(context, "_query_start_time", None)
+    if stats is None or start is None:
+        return
+    del context._query_start_time
+    stats.count += 1
+    stats.duration += time.perf_counter() - start
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record(context)
+
+
+def _handle_error(exception_context) -> None:
+    # Failed statements never reach after_cursor_execute
+    if exception_context.execution_context is not None:
+        _record(exception_context.execution_context)
+
+
+def install_query_hooks() -> None:
+    """Register statement listeners on every SQLAlchemy engine."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect statements executed in the current context into ``QueryStats``."""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """Record SQL statement count and time for each request.
+
+    Values are observed in Prometheus histograms labelled by route template
+    and, when ``server_timing`` is enabled, returned in a ``Server-Timing``
+    response header.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = False) -> None:
+        super().__init__(app)
+        self.server_timing = server_timing
+
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ):
+        with track_queries() as stats:
+            response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            db_statements_per_request.labels(route=route.path).observe(stats.count)
+            db_time_per_request.labels(route=route.path).observe(stats.duration)
+        if self.server_timing:
+            response.headers.append(
+                "Server-Timing",
+                f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"',
+            )
+        return response
@@ -1,30 +1,286 @@
-from __future__ import annotations
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from math import ceil
+from typing import Any, Awaitable, Callable
+
+import redis as pyredis
+from fastapi import Request, Response
+from fastapi_limiter import FastAPILimiter
+from fastapi_limiter.depends import RateLimiter
+
+from services import jwt as jwt_service
+from utils.metrics import rate_limit_rejections_counter
+
+logger = logging.getLogger(__name__)
+
+
+def _subject_from_token(auth: str | None) -> str | None:
+    if not auth or not auth.startswith("Bearer "):
+        return None
+    try:
+        # Signature and expiry are checked locally; no Redis round trip
+        payload = jwt_service.decode_token_claims(auth.split(" ", 1)[1])
+    except ValueError:
+        return None
+    return payload.get("sub") or payload.get("email")
+
+
+async def _email_from_body(request: Request) -> str | None:
+    if request.method not in {"POST", "PUT", "PATCH"}:
+        return None
+    try:
+        # FastAPI parses the JSON body of endpoints with a body model before
+        # it resolves dependencies, and Starlette caches the result on the
+        # request, so this reuses it instead of parsing the body again.
+        data: Any = await request.json()
+    except Exception:  # pragma: no cover - body issues
+        return None
+    return data.get("email") if isinstance(data, dict) else None
 
-from fastapi import Request
 
 # This helper is used by FastAPI-Limiter to generate a rate limit key
 # that combines the authenticated user's identifier with the client IP.
+async def user_rate_limit_key(request: Request) -> str:
+    """Build a rate limit key using the user identifier and client IP.
 
-from services import jwt as jwt_service
+    The key is cached in the request state so several limiters on the same
+    route derive it only once.
+    """
+    state = request.scope.setdefault("state", {})
+    cached = state.get("rate_limit_key")
+    if cached is not None:
+        return cached
+    user_part = _subject_from_token(request.headers.get("Authorization"))
+    if user_part is None:
+        user_part = await _email_from_body(request)
+    forwarded = request.headers.get("X-Forwarded-For")
+    ip = forwarded.split(",")[0] if forwarded else request.client.host
+    key = f"{user_part or 'anon'}:{ip}"
+    state["rate_limit_key"] = key
+    return key
 
 
-async def user_rate_limit_key(request: Request) -> str:
-    """Build a rate limit key using the user identifier and client IP."""
-    user_part = None
-    auth = request.headers.get("Authorization")
-    if auth and auth.startswith("Bearer "):
-        token = auth.split(" ", 1)[1]
-        try:
-            payload = jwt_service.decode_token(token)
-            user_part = payload.get("sub") or payload.get("email")
-        except Exception:  # pragma: no cover - invalid token
-            user_part = None
-    if user_part is None and request.method in {"POST", "PUT", "PATCH"}:
+class _TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float) -> None:
+        self.tokens = tokens
+        self.updated = now
+
+
+class TieredRateLimiter(RateLimiter):
+    """``RateLimiter`` with an in-process token bucket in front of Redis.
+
+    Each worker keeps a token bucket per key that refills at the global rate
+    (``times`` per window). A request that finds its bucket empty is over
+    the limit on this worker alone, so it is rejected without a Redis round
+    trip. When Redis rejects a key, the remaining window is remembered
+    locally and later requests for that key are rejected until it expires.
+    Only requests that pass both local checks reach Redis, which stays the
+    authoritative limit across workers.
+    """
+
+    def __init__(
+        self,
+        times: int = 1,
+        milliseconds: int = 0,
+        seconds: int = 0,
+        minutes: int = 0,
+        hours: int = 0,
+        identifier: Callable | None = None,
+        callback: Callable | None = None,
+        *,
+        max_keys: int = 10000,
+    ) -> None:
+        super().__init__(
+            times=times,
+            milliseconds=milliseconds,
+            seconds=seconds,
+            minutes=minutes,
+            hours=hours,
+            identifier=identifier,
+            callback=callback,
+        )
+        self.max_keys = max_keys
+        self._rate = times / (self.milliseconds / 1000) if self.milliseconds else 0.0
+        self._buckets: OrderedDict[str, _TokenBucket] = OrderedDict()
+        self._blocked_until: dict[str, float] = {}
+
+    def reset(self) -> None:
+        """Forget all local state (used by tests)."""
+        self._buckets.clear()
+        self._blocked_until.clear()
+
+    def _take(self, key: str, now: float) -> float:
+        """Take a local token; return 0 or the milliseconds until one is free."""
+        blocked_until = self._blocked_until.get(key)
+        if blocked_until is not None:
+            if blocked_until > now:
+                return (blocked_until - now) * 1000
+            del self._blocked_until[key]
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _TokenBucket(self.times, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(
+                self.times, bucket.tokens + (now - bucket.updated) * self._rate
+            )
+            bucket.updated = now
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0
+        if not self._rate:
+            return self.milliseconds or 1000
+        return (1 - bucket.tokens) / self._rate * 1000
+
+    async def __call__(self, request: Request, response: Response):
+        if not FastAPILimiter.redis:
+            raise Exception("You must call FastAPILimiter.init in startup event of fastapi!")
+        identifier = self.identifier or FastAPILimiter.identifier
+        callback = self.callback or FastAPILimiter.http_callback
+        rate_key = await identifier(request)
+        route = request.scope.get("route")
+        path = route.path if route is not None else request.scope["path"]
+        key = f"{FastAPILimiter.prefix}:{rate_key}:{path}:{self.times}:{self.milliseconds}"
+
+        now = time.monotonic()
+        wait_ms = self._take(key, now)
+        if wait_ms:
+            rate_limit_rejections_counter.labels(tier="local").inc()
+            return await callback(request, response, ceil(wait_ms))
+
         try:
-            data = await request.json()
-            user_part = data.get("email")
-        except Exception:  # pragma: no cover - body issues
-            user_part = None
+            pexpire = await self._check(key)
+        except pyredis.exceptions.NoScriptError:
+            FastAPILimiter.lua_sha = await FastAPILimiter.redis.script_load(
+                FastAPILimiter.lua_script
+            )
+            pexpire = await self._check(key)
+        if pexpire != 0:
+            rate_limit_rejections_counter.labels(tier="global").inc()
+            # Sync with the global window: reject locally until it expires
+            if pexpire > 0:
+                self._blocked_until[key] = now + pexpire / 1000
+                if len(self._blocked_until) > self.max_keys:
+                    self._blocked_until.pop(next(iter(self._blocked_until)))
+            return await callback(request, response, pexpire)
+
+
+async def client_ip_key(request: Request) -> str:
+    """Rate limit key for the client IP alone."""
     forwarded = request.headers.get("X-Forwarded-For")
-    ip = forwarded.split(",")[0] if forwarded else request.client.host
-    return f"{user_part or 'anon'}:{ip}"
+    return forwarded.split(",")[0] if forwarded else request.client.host
+
+
+async def email_key(request: Request) -> str:
+    """Rate limit key for the email in the request body, across all IPs."""
+    return (await _email_from_body(request)) or "anon"
+
+
+# Sliding window check for several rules at once. KEYS holds one sorted set
+# per rule; ARGV holds a unique member followed by limit and window (ms) per
+# rule. The request is recorded only if every rule allows it, and the reply
+# is {retry_after_ms, 1-based index of the tightest rule} or {0, 0}.
+MULTI_RULE_LUA = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local retry_after = 0
+local tightest = 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 2])
+    local window = tonumber(ARGV[i * 2 + 1])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local count = redis.call('ZCARD', key)
+    if count >= limit then
+        local wait = window
+        local entry = redis.call('ZRANGE', key, count - limit, count - limit, 'WITHSCORES')
+        if entry[2] then
+            wait = tonumber(entry[2]) + window - now
+        end
+        if wait > retry_after then
+            retry_after = wait
+            tightest = i
+        end
+    end
+end
+if retry_after > 0 then
+    return {retry_after, tightest}
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[1])
+    redis.call('PEXPIRE', key, ARGV[i * 2 + 1])
+end
+return {0, 0}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """A named sliding-window limit of ``times`` requests per ``seconds``."""
+
+    name: str
+    times: int
+    seconds: int
+    key: Callable[[Request], Awaitable[str]]
+
+
+class MultiRuleRateLimiter:
+    """Dependency that checks several sliding-window rules in one Redis call.
+
+    All rules are evaluated atomically by a single Lua script, so a request
+    counts against every rule or none, and a rejection carries the longest
+    (tightest) ``Retry-After`` among the rules that are exceeded.
+    """
+
+    _lua_sha: str | None = None
+
+    def __init__(
+        self,
+        name: str,
+        *rules: RateLimitRule,
+        callback: Callable | None = None,
+    ) -> None:
+        if not rules:
+            raise ValueError("At least one rate limit rule is required")
+        self.name = name
+        self.rules = rules
+        self.callback = callback
+
+    async def _evaluate(self, keys: list[str], args: list[str]) -> list[int]:
+        redis = FastAPILimiter.redis
+        cls = type(self)
+        if cls._lua_sha is None:
+            cls._lua_sha = await redis.script_load(MULTI_RULE_LUA)
+        try:
+            return await redis.evalsha(cls._lua_sha, len(keys), *keys, *args)
+        except pyredis.exceptions.NoScriptError:
+            cls._lua_sha = await redis.script_load(MULTI_RULE_LUA)
+            return await redis.evalsha(cls._lua_sha, len(keys), *keys, *args)
+
+    async def __call__(self, request: Request, response: Response):
+        if not FastAPILimiter.redis:
+            raise Exception("You must call FastAPILimiter.init in startup event of fastapi!")
+        callback = self.callback or FastAPILimiter.http_callback
+        keys = []
+        args = [uuid.uuid4().hex]
+        for rule in self.rules:
+            keys.append(
+                f"{FastAPILimiter.prefix}:{self.name}:{rule.name}:{await rule.key(request)}"
+            )
+            args += [str(rule.times), str(rule.seconds * 1000)]
+        retry_after, tightest = await self._evaluate(keys, args)
+        if retry_after:
+            rate_limit_rejections_counter.labels(tier="global").inc()
+            logger.info(
+                "Rate limit rule '%s' exceeded",
+                self.rules[tightest - 1].name,
+                extra={"endpoint": request.scope["path"]},
+            )
+            return await callback(request, response, int(retry_after))
@@ -0,0 +1,162 @@
+"""Slow-request log with a breakdown of where the time went.
+
+Functions decorated with ``timed`` add their duration to the
+``RequestTimings`` of the current request: Redis calls in ``token_store``,
+bcrypt in ``utils.security`` and JWT signing/verification in
+``services.jwt``. SQL time comes from ``utils.query_stats``. Outside a
+request the decorator only does a context variable lookup.
+
+``SlowRequestMiddleware`` logs one ``slow_request`` line with the route and
+the breakdown when a request takes longer than ``SLOW_REQUEST_THRESHOLD_MS``.
+Faster requests only pay for two small slotted objects; the log record is
+built for slow requests alone.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import time
+from contextvars import ContextVar
+from typing import Callable, TypeVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .query_stats import QueryStats, _current_stats
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable)
+
+
+class RequestTimings:
+    """Calls and seconds spent in instrumented dependencies by one request."""
+
+    __slots__ = (
+        "redis_calls",
+        "redis_time",
+        "bcrypt_calls",
+        "bcrypt_time",
+        "jwt_calls",
+        "jwt_time",
+    )
+
+    def __init__(self) -> None:
+        self.redis_calls = 0
+        self.redis_time = 0.0
+        self.bcrypt_calls = 0
+        self.bcrypt_time = 0.0
+        self.jwt_calls = 0
+        self.jwt_time = 0.0
+
+
+_current_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def timed(kind: str) -> Callable[[F], F]:
+    """Add each call's duration to ``<kind>_calls``/``<kind>_time``."""
+    calls_attr = f"{kind}_calls"
+    time_attr = f"{kind}_time"
+
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            timings = _current_timings.get()
+            if timings is None:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                setattr(timings, calls_attr, getattr(timings, calls_attr) + 1)
+                setattr(
+                    timings,
+                    time_attr,
+                    getattr(timings, time_attr) + time.perf_counter() - start,
+                )
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+class SlowRequestMiddleware:
+    """Log requests slower than ``threshold_ms`` with a timing breakdown.
+
+    Reuses the SQL statistics of ``QueryStatsMiddleware`` when that
+    middleware wraps this one, so statements are counted once.
+    """
+
+    def __init__(self, app: ASGIApp, threshold_ms: float = 1000.0) -> None:
+        self.app = app
+        self.threshold = threshold_ms / 1000
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        timings_token = _current_timings.set(timings)
+        stats = _current_stats.get()
+        stats_token = None
+        if stats is None:
+            stats = QueryStats()
+            stats_token = _current_stats.set(stats)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            _current_timings.reset(timings_token)
+            if stats_token is not None:
+                _current_stats.reset(stats_token)
+            if duration >= self.threshold:
+                self._log(scope, status, duration, timings, stats)
+
+    @staticmethod
+    def _log(
+        scope: Scope,
+        status: int,
+        duration: float,
+        timings: RequestTimings,
+        stats: QueryStats,
+    ) -> None:
+        route = scope.get("route")
+        accounted = (
+            stats.duration + timings.redis_time + timings.bcrypt_time + timings.jwt_time
+        )
+        logger.warning(
+            "slow_request",
+            extra={
+                "endpoint": route.path if route is not None else scope["path"],
+                "method": scope["method"],
+                "status": status,
+                "duration_ms": _ms(duration),
+                "timings": {
+                    "db_ms": _ms(stats.duration),
+                    "db_queries": stats.count,
+                    "redis_ms": _ms(timings.redis_time),
+                    "redis_calls": timings.redis_calls,
+                    "bcrypt_ms": _ms(timings.bcrypt_time),
+                    "bcrypt_calls": timings.bcrypt_calls,
+                    "jwt_ms": _ms(timings.jwt_time),
+                    "jwt_calls": timings.jwt_calls,
+                    "other_ms": _ms(max(duration - accounted, 0.0)),
+                },
+            },
+        )
@@ -10,6 +10,7 @@ from starlette.requests import Request
 from starlette.types import ASGIApp
 
 
+from .request_timing import timed
 from .settings import settings
 
 warnings.filterwarnings("ignore", "'crypt' is deprecated", DeprecationWarning)
@@ -20,11 +21,13 @@ ALGORITHM = settings.jwt_algorithm
 TOKEN_EXPIRATION_SECONDS = settings.token_expiration_seconds
 
 
+@timed("bcrypt")
 def hash_password(password: str) -> str:
     """Hash a plain password using bcrypt."""
     return bcrypt.hash(password)
 
 
+@timed("bcrypt")
 def verify_password(password: str, hashed_password: str) -> bool:
     """Verify a password against its bcrypt hash."""
     return bcrypt.verify(password, hashed_password)
@@ -0,0 +1,45 @@
+"""Stage-by-stage latency of the authentication endpoints.
+
+``StageTimer.mark`` observes the time since the previous mark under the
+given stage, so a handler calls it once after each step. Histogram children
+are resolved once per ``(endpoint, stage)`` and reused, leaving a
+``perf_counter`` call and one observation per stage on the request path.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Dict
+
+from .metrics import auth_stage_latency
+
+_children: Dict[str, dict] = {}
+
+
+def _stage_children(endpoint: str) -> dict:
+    children = _children.get(endpoint)
+    if children is None:
+        children = _children.setdefault(endpoint, {})
+    return children
+
+
+class StageTimer:
+    """Record consecutive stages of one request for ``endpoint``."""
+
+    __slots__ = ("endpoint", "_children", "_last")
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint
+        self._children = _stage_children(endpoint)
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        """Attribute the time since the previous mark to ``stage``."""
+        now = time.perf_counter()
+        child = self._children.get(stage)
+        if child is None:
+            child = auth_stage_latency.labels(endpoint=self.endpoint, stage=stage)
+            self._children[stage] = child
+        child.observe(now - self._last)
+        self._last = now
+
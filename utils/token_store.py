@@ -5,6 +5,7 @@ from typing import Any, Optional
 
 import redis
 
+from .request_timing import timed
 from .settings import settings
 
 _redis_client: Optional[redis.Redis] = None
@@ -33,6 +34,7 @@ REVOKED_PREFIX = "revoked:"
 REFRESH_PREFIX = "refresh:"
 
 
+@timed("redis")
 def store(token: str, exp: int, payload: dict[str, Any]) -> None:
     client = _get_client()
     if not client:
@@ -43,6 +45,7 @@ def store(token: str, exp: int, payload: dict[str, Any]) -> None:
     client.setex(_hash(token), ttl, json.dumps(payload))
 
 
+@timed("redis")
 def get(token: str) -> Optional[dict[str, Any]]:
     client = _get_client()
     if not client:
@@ -56,6 +59,7 @@ def get(token: str) -> Optional[dict[str, Any]]:
     return None
 
 
+@timed("redis")
 def store_refresh(token: str, exp: int, payload: dict[str, Any]) -> None:
     client = _get_client()
     if not client:
@@ -66,6 +70,7 @@ def store_refresh(token: str, exp: int, payload: dict[str, Any]) -> None:
     client.setex(f"{REFRESH_PREFIX}{_hash(token)}", ttl, json.dumps(payload))
 
 
+@timed("redis")
 def get_refresh(token: str) -> Optional[dict[str, Any]]:
     client = _get_client()
     if not client:
@@ -79,6 +84,7 @@ def get_refresh(token: str) -> Optional[dict[str, Any]]:
     return None
 
 
+@timed("redis")
 def revoke(token: str, exp: int) -> None:
     client = _get_client()
     if not client:
@@ -89,6 +95,7 @@ def revoke(token: str, exp: int) -> None:
     client.setex(f"{REVOKED_PREFIX}{_hash(token)}", ttl or 1, "1")
 
 
+@timed("redis")
 def is_revoked(token: str) -> bool:
     client = _get_client()
     if not client:
@@ -96,6 +103,7 @@ def is_revoked(token: str) -> bool:
     return bool(client.exists(f"{REVOKED_PREFIX}{_hash(token)}"))
 
 
+@timed("redis")
 def revoke_refresh(token: str, exp: int) -> None:
     client = _get_client()
     if not client: